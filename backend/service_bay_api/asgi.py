@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'service_bay_api.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since the stream touches the ORM.
+from tickets.streams import STREAM_PATH, notification_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # The notification stream is long-lived, so it is served as a bare ASGI
+    # app instead of tying up Django's sync view machinery for its lifetime.
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        return await notification_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,114 @@
+"""
+Read-replica routing.
+
+Replicas are optional database aliases, listed in settings.DATABASE_REPLICAS
+(set up from DATABASE_REPLICA_URLS). When there are any, a GET, HEAD or
+OPTIONS request reads from one of them, picked per request; everything
+else, and every read outside a request (commands, the job worker, the
+notification stream), uses `default`. Writes always go to `default`.
+
+A replica may lag behind. So that users see their own changes, a request
+that writes pins its user to `default` for DATABASE_REPLICA_PIN_SECONDS:
+their reads in that window skip the replicas. Users are identified by the
+user id in their access token, before any database is touched. Pins are
+kept in the default cache, so they hold across worker processes once that
+cache is shared.
+
+Cached payloads computed from a replica are kept no longer than the pin
+window (see cache_timeout()), so a lagging read is never served for long.
+
+Locally, copy db.sqlite3 to another file and point DATABASE_REPLICA_URLS
+at it (sqlite:///replica.sqlite3) to try it out.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def read_alias():
+    """
+    The database this request reads from (None outside a request).
+    """
+    return _read_alias.get()
+
+
+def reading_from_replica():
+    alias = _read_alias.get()
+    return alias is not None and alias != PRIMARY
+
+
+def cache_timeout(timeout):
+    """
+    `timeout` for a cache entry computed in this request, shortened to the
+    pin window when its data came from a replica.
+    """
+    if reading_from_replica():
+        return min(timeout, settings.DATABASE_REPLICA_PIN_SECONDS)
+    return timeout
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def _token_user_id(request):
+    scheme, _, raw = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme not in api_settings.AUTH_HEADER_TYPES or not raw:
+        return None
+    try:
+        return AccessToken(raw.strip())[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None  # authentication rejects it later
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Picks the database each request reads from (see the module docstring).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return self.get_response(request)
+
+        user_id = _token_user_id(request)
+        alias = PRIMARY
+        if request.method in SAFE_METHODS and (user_id is None or not cache.get(_pin_key(user_id))):
+            alias = random.choice(replicas)
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        if request.method not in SAFE_METHODS and user_id is not None:
+            cache.set(_pin_key(user_id), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+        return response
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the request's read alias and all writes to `default`.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Explicitly, or Django would write an instance back where it was read.
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data, so objects read from any of them relate.
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases or None
@@ -0,0 +1,279 @@
+"""
+Per-request performance instrumentation.
+
+RequestMetricsMiddleware times every request and breaks it down into
+database work (queries and their time, on every configured database), the
+view, serialization (the time TimedSerializerMixin serializers and
+render_ticket_rows spend turning models and rows into data, which is part of
+the view), and rendering the response (where DRF turns the data into JSON or
+CSV), plus the response size. Each request reports its own breakdown in a
+Server-Timing header, and feeds histograms keyed by the resolved URL name
+(`ticket-list`, `dashboard-stats`, or 'unmatched') that /api/metrics/ serves in
+the Prometheus text format, together with the ticket response cache
+counters.
+
+Histograms are kept per process, like the cache counters, and carry a
+`process` label so that series from different gunicorn workers never mix.
+With settings.SLOW_REQUEST_SECONDS set, requests slower than that are
+logged to 'service_bay_api.slow_requests' with the SQL they ran.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+from tickets.response_cache import cache_metrics
+
+slow_request_logger = logging.getLogger('service_bay_api.slow_requests')
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# The slow-request log keeps at most this many statements per request.
+SLOW_REQUEST_MAX_QUERIES = 100
+
+
+# --- Histograms ---
+class Histogram:
+    """
+    A Prometheus histogram: per label set, counts per upper bound, a sum and
+    a total count.
+    """
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self, label_names):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in sorted(self._series.items())]
+        for labels, counts, total, count in series:
+            base = _labels(zip(label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{base}}} {total:.6f}'
+            yield f'{self.name}_count{{{base}}} {count}'
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _labels(pairs):
+    escaped = ((name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')) for name, value in pairs)
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+LABELS = ('process', 'view', 'method')
+# Anything else a client sends is counted as 'other', to keep the label set bounded.
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+HISTOGRAMS = {
+    'total': Histogram('servicebay_request_duration_seconds', 'Time to respond, from the first middleware on.', SECONDS_BUCKETS),
+    'view': Histogram('servicebay_request_view_seconds', 'Time spent in the view, its queries included.', SECONDS_BUCKETS),
+    'serialize': Histogram('servicebay_request_serialize_seconds', 'Time spent serializing models and rows, within the view.', SECONDS_BUCKETS),
+    'render': Histogram('servicebay_request_render_seconds', 'Time spent rendering the response body.', SECONDS_BUCKETS),
+    'db': Histogram('servicebay_request_db_seconds', 'Time spent waiting on database queries.', SECONDS_BUCKETS),
+    'queries': Histogram('servicebay_request_db_queries', 'Database queries run.', QUERY_BUCKETS),
+    'size': Histogram('servicebay_response_size_bytes', 'Response body size (streamed responses are not counted).', BYTES_BUCKETS),
+}
+_status_counts = {}
+_status_lock = threading.Lock()
+
+
+def clear_metrics():
+    for histogram in HISTOGRAMS.values():
+        histogram.clear()
+    with _status_lock:
+        _status_counts.clear()
+
+
+# --- Middleware ---
+# The timer of the request being handled, for code that has no request at hand.
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+
+
+@contextmanager
+def serializing():
+    """
+    Adds the time spent in the block to the current request's serialize span.
+    Nested blocks (a serializer within a serializer) are counted once.
+    """
+    timer = _current_timer.get()
+    if timer is None or timer.serializing:
+        yield
+        return
+    timer.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.serialize_seconds += time.perf_counter() - started
+        timer.serializing = False
+
+
+class TimedSerializerMixin:
+    """
+    Counts a serializer's to_representation() towards the request's
+    serialize span.
+    """
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
+
+
+class RequestTimer:
+    """
+    Accumulates one request's database work, via an execute wrapper on each
+    database connection, and its serialization time, via serializing().
+    """
+    def __init__(self, keep_sql):
+        self.started = time.perf_counter()
+        self.view_started = self.view_ended = self.render_ended = None
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializing = False
+        self.serialize_seconds = 0.0
+        self.statements = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.statements is not None and len(self.statements) < SLOW_REQUEST_MAX_QUERIES:
+                self.statements.append((elapsed, context['connection'].alias, sql))
+
+    def rendered(self, response):
+        self.render_ended = time.perf_counter()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each request's timings (see the module docstring). Place it
+    first in MIDDLEWARE so that its total covers the other middleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.process = str(os.getpid())
+
+    def __call__(self, request):
+        slow_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', None)
+        timer = request._metrics_timer = RequestTimer(keep_sql=slow_seconds is not None)
+        token = _current_timer.set(timer)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        ended = time.perf_counter()
+
+        total = ended - timer.started
+        view_ended = timer.view_ended or ended
+        view = view_ended - timer.view_started if timer.view_started is not None else 0.0
+        render = timer.render_ended - view_ended if timer.render_ended is not None else 0.0
+        size = None if response.streaming else len(response.content)
+        self.record(request, response, timer, total, view, render, size)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timer.db_seconds * 1000:.1f};desc="{timer.queries} queries"',
+            f'view;dur={view * 1000:.1f}',
+            f'serialize;dur={timer.serialize_seconds * 1000:.1f}',
+            f'render;dur={render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        if slow_seconds is not None and total >= slow_seconds:
+            self.log_slow_request(request, response, timer, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_timer.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses come back unrendered: the view ends here and
+        # rendering starts.
+        timer = request._metrics_timer
+        timer.view_ended = time.perf_counter()
+        response.add_post_render_callback(timer.rendered)
+        return response
+
+    def record(self, request, response, timer, total, view, render, size):
+        match = request.resolver_match
+        method = request.method if request.method in METHODS else 'other'
+        labels = (self.process, match.view_name if match else 'unmatched', method)
+        for name, value in (('total', total), ('view', view), ('serialize', timer.serialize_seconds), ('render', render), ('db', timer.db_seconds), ('queries', timer.queries)):
+            HISTOGRAMS[name].observe(labels, value)
+        if size is not None:
+            HISTOGRAMS['size'].observe(labels, size)
+        with _status_lock:
+            key = (*labels, response.status_code)
+            _status_counts[key] = _status_counts.get(key, 0) + 1
+
+    def log_slow_request(self, request, response, timer, total):
+        statements = sorted(timer.statements, reverse=True)
+        slow_request_logger.warning(
+            'Slow request: %s %s -> %s in %.0f ms, %s queries in %.0f ms. Slowest statements:\n%s',
+            request.method, request.get_full_path(), response.status_code, total * 1000, timer.queries, timer.db_seconds * 1000,
+            '\n'.join(f'  {elapsed * 1000:.1f} ms [{alias}] {sql}' for elapsed, alias, sql in statements[:20]),
+        )
+
+
+# --- Exposition ---
+def prometheus_text():
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.expose(LABELS))
+    lines += ['# HELP servicebay_requests_total Responses sent, by status code.', '# TYPE servicebay_requests_total counter']
+    with _status_lock:
+        counts = sorted(_status_counts.items())
+    for key, count in counts:
+        lines.append(f'servicebay_requests_total{{{_labels(zip((*LABELS, "status"), key))}}} {count}')
+
+    process = os.getpid()
+    cache = cache_metrics()
+    lines += ['# HELP servicebay_ticket_cache_lookups_total Ticket response cache lookups.', '# TYPE servicebay_ticket_cache_lookups_total counter']
+    for kind in ('list', 'detail'):
+        for result, key in (('hit', 'hits'), ('miss', 'misses')):
+            lines.append(f'servicebay_ticket_cache_lookups_total{{process="{process}",kind="{kind}",result="{result}"}} {cache[kind][key]}')
+    lines += ['# HELP servicebay_ticket_cache_invalidations_total Ticket response cache invalidations.',
+              '# TYPE servicebay_ticket_cache_invalidations_total counter',
+              f'servicebay_ticket_cache_invalidations_total{{process="{process}"}} {cache["invalidations"]}']
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsView(APIView):
+    """
+    This process's request metrics in the Prometheus text format. Only
+    accessible by admins.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
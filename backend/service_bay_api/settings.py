@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'service_bay_api.metrics.RequestMetricsMiddleware',
+    'service_bay_api.db_routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -72,6 +74,44 @@ DATABASES = {
 }
 # --- END FIX ---
 
+# Django's default SQLite test database is in-memory with a shared cache, where
+# a lock conflict fails at once instead of waiting out the busy timeout. A file
+# keeps the concurrent-write tests on SQLite's normal locking.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# Optional read replicas of `default`, as a comma-separated list of database
+# URLs. Read-only requests are spread over them; see service_bay_api/db_routing.py.
+# Run the test suite without any: it confines tests to `default`.
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, map(str.strip, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))), start=1):
+    DATABASES[f'replica{number}'] = {**dj_database_url.parse(url, conn_max_age=600), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['service_bay_api.db_routing.ReplicaRouter']
+# How long after a write its user's reads stay on `default`; should comfortably
+# exceed the replicas' lag. Cached payloads read from a replica live no longer.
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Backs the dashboard statistics, the ticket response cache
+# (tickets/response_cache.py) and, when selected, the throttle buckets.
+# Local runs keep it in process memory, or in a directory shared by local
+# workers with CACHE_BACKEND=file. In production set CACHE_BACKEND to a shared
+# backend's class path (e.g. django.core.cache.backends.redis.RedisCache) and
+# CACHE_LOCATION to its address.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache') if CACHE_BACKEND == 'file' else 'service-bay'),
+        'OPTIONS': {'MAX_ENTRIES': 20000} if CACHE_BACKEND in CACHE_BACKENDS else {},
+    }
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -97,13 +137,96 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
-    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',)
+    'DEFAULT_AUTHENTICATION_CLASSES': ('users.authentication.CachedJWTAuthentication',),
+    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
+    # Token buckets (service_bay_api/throttling.py): each rate is both the burst
+    # size and the refill rate. 'login' and 'login_account' guard the password
+    # check on /api/token/; 'poll' and 'poll_total' the endpoints dashboards
+    # poll, where 'poll_total' is shared by all clients and should sit well
+    # below what one worker can serve, leaving room for everything else.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'service_bay_api.throttling.UserBucketThrottle',
+        'service_bay_api.throttling.AnonBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '300/min',
+        'anon': '60/min',
+        'login': '10/min',
+        'login_account': '5/min',
+        'poll': '60/min',
+        'poll_total': '50/s',
+    },
+    # Clients reach us through Render's proxy; count the address it forwarded.
+    'NUM_PROXIES': 1 if os.environ.get('RENDER') else None,
 }
 
+# Where throttle buckets are kept: per process (LocalBucketStore), or in the
+# default cache (CacheBucketStore), which is shared once CACHES points at one.
+THROTTLE_STORE = 'service_bay_api.throttling.LocalBucketStore'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.MyTokenObtainPairSerializer',
 }
 
+# Per-process cache of authenticated users (users/authentication.py). Saves
+# evict immediately in the process that made them, and in every other process
+# through a version kept in the default cache once CACHES is shared; with the
+# locmem cache the TTL bounds how long another worker may keep serving a user
+# that was deactivated or re-roled.
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_SECONDS = 30
+
+# Requests slower than this many seconds are logged with their SQL by
+# service_bay_api.metrics (logger 'service_bay_api.slow_requests'); None turns
+# the log off. Server-Timing headers and /api/metrics/ are always on.
+SLOW_REQUEST_SECONDS = float(os.environ['SLOW_REQUEST_SECONDS']) if os.environ.get('SLOW_REQUEST_SECONDS') else None
+
+# Background jobs (tickets/jobs.py), run by `manage.py run_jobs` workers.
+# JOBS_RUN_INLINE runs each job in the process that queued it, right after
+# its transaction commits, for setups without a worker (local development).
+JOBS_RUN_INLINE = os.environ.get('JOBS_RUN_INLINE', 'False') == 'True'
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 3600
+# A worker that has not finished a job this long after claiming it is taken to have died.
+JOB_LEASE_SECONDS = 300
+JOB_POLL_SECONDS = 1.0
+
+# Push channel for notifications (served by asgi.py at /api/notifications/stream/).
+# Notifications are created by the run_jobs worker, not by the process holding
+# the stream. CacheBroker records each publish in the default cache and streams
+# check it every NOTIFICATION_STREAM_SIGNAL_SECONDS, which reaches them from
+# other processes because the cache is shared: run_jobs refuses to start with
+# the per-process locmem cache (use CACHE_BACKEND=file locally, or
+# JOBS_RUN_INLINE). The catch-up query only covers what a stream missed.
+NOTIFICATION_BROKER = 'tickets.broker.CacheBroker'
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = 15
+NOTIFICATION_STREAM_SIGNAL_SECONDS = 1
+NOTIFICATION_STREAM_CATCHUP_SECONDS = 30
+
+# Delta sync (?updated_since=) re-reads this many seconds behind the client's
+# cursor, to pick up tickets whose updated_at was stamped before a slow commit.
+# Keep it above the longest ticket write transaction.
+TICKET_DELTA_OVERLAP_SECONDS = 5
+
+# Upper bound on how stale the cached admin dashboard statistics may get when
+# a write happened in another process (local writes invalidate immediately).
+DASHBOARD_STATS_CACHE_SECONDS = 60
+
+# How long a cached ticket list or detail payload may live. Writes retire
+# entries at once wherever the cache is shared; with the per-process locmem
+# cache a write made by another worker is only seen once the entry expires.
+TICKET_CACHE_SECONDS = 30 if CACHE_BACKEND == 'locmem' else 300
+
+# Retention for read notifications, applied by `manage.py prune_notifications`:
+# 'archive' moves them to NotificationArchive, 'delete' drops them.
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATION_RETENTION_MODE = 'archive'
+
+# Closed tickets move to the archive tables this many days after closing,
+# when `manage.py archive_tickets` runs. The dashboard's archived counts are
+# cached for up to TICKET_ARCHIVE_COUNTS_CACHE_SECONDS between runs.
+TICKET_ARCHIVE_AFTER_DAYS = 365
+TICKET_ARCHIVE_COUNTS_CACHE_SECONDS = 3600
@@ -0,0 +1,59 @@
+"""
+External-content FTS5 indexes for the SQLite development database.
+
+Each index is a virtual table over a model table's columns, using the
+trigram tokenizer so any substring of three or more characters matches,
+and kept current by insert/update/delete triggers on the model table.
+"""
+
+
+def trigger_names(index_table):
+    return (f'{index_table}_ai', f'{index_table}_ad', f'{index_table}_au')
+
+
+def install_fts5_index(connection, index_table, content_table, columns):
+    """
+    Creates the FTS5 table and its triggers if missing, and rebuilds the
+    index whenever a trigger had to be (re)created. Django rebuilds a SQLite
+    table for many schema changes, which drops its triggers, so callers also
+    run this after every migrate.
+    """
+    triggers = trigger_names(index_table)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+                       [index_table, *triggers])
+        if {row[0] for row in cursor.fetchall()} == {index_table, *triggers}:
+            return
+
+        names = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        insert_new = f"INSERT INTO {index_table}(rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = f"INSERT INTO {index_table}({index_table}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {index_table} USING fts5({names}, "
+                       f"content='{content_table}', content_rowid='id', tokenize='trigram')")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {triggers[0]} AFTER INSERT ON {content_table} BEGIN {insert_new} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {triggers[1]} AFTER DELETE ON {content_table} BEGIN {delete_old} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {triggers[2]} AFTER UPDATE OF {names} ON {content_table} "
+                       f"BEGIN {delete_old} {insert_new} END")
+        cursor.execute(f"INSERT INTO {index_table}({index_table}) VALUES ('rebuild')")
+
+
+def uninstall_fts5_index(connection, index_table):
+    with connection.cursor() as cursor:
+        for trigger in trigger_names(index_table):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute(f'DROP TABLE IF EXISTS {index_table}')
+
+
+def fts5_expression(query, min_length=3):
+    """
+    Every whitespace-separated term must appear somewhere (implicit AND), as
+    a substring. Terms shorter than the trigram width cannot be looked up
+    and are dropped; a query made only of short terms ("12 cd") is matched
+    as a single substring instead. Returns '' when nothing is searchable.
+    """
+    terms = [term for term in query.split() if len(term) >= min_length]
+    if not terms and len(query) >= min_length:
+        terms = [query]
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
@@ -0,0 +1,193 @@
+"""
+Token-bucket request throttling.
+
+Each scope's budget lives in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in the
+usual DRF form ('30/min'): a bucket holds that many tokens and refills at that
+rate, so a client may burst up to the budget but is held to the average. A
+rejected request gets a 429 whose Retry-After header says when the next token
+arrives. Buckets are kept by the store named in settings.THROTTLE_STORE:
+LocalBucketStore counts per worker process, CacheBucketStore in Django's
+default cache, which is shared between workers when that cache is.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# --- Bucket stores ---
+def _refill(bucket, capacity, rate, now):
+    if bucket is None:
+        return float(capacity)
+    tokens, stamp = bucket
+    return min(float(capacity), tokens + max(now - stamp, 0) * rate)
+
+
+class LocalBucketStore:
+    """
+    Buckets in this process, least recently used dropped beyond `max_keys`.
+    """
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or getattr(settings, 'THROTTLE_LOCAL_MAX_KEYS', 100000)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """
+        Takes a token from the bucket. Returns 0 on success, otherwise the
+        seconds until one is available.
+        """
+        with self._lock:
+            tokens = _refill(self._buckets.get(key), capacity, rate, now)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in the default Django cache. The read-modify-write is not atomic,
+    so concurrent requests for one key may occasionally both get the last
+    token; budgets are a ceiling on sustained load, not an exact quota.
+    """
+    def take(self, key, capacity, rate, now):
+        tokens = _refill(cache.get(key), capacity, rate, now)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        # A bucket untouched for capacity / rate seconds is full again and need not be kept.
+        cache.set(key, (tokens - 1 if not wait else tokens, now), math.ceil(capacity / rate) + 1)
+        return wait
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_bucket_store():
+    """
+    Returns the process-wide bucket store configured by settings.THROTTLE_STORE.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(getattr(settings, 'THROTTLE_STORE', 'service_bay_api.throttling.LocalBucketStore'))()
+    return _store
+
+
+# --- Throttles ---
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle's scopes, rates and keys, with a token bucket in
+    place of the request-history window.
+    """
+    timer = time.time  # wall clock, so buckets in a shared cache agree between hosts
+    retry_after = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.retry_after = get_bucket_store().take(self.key, self.num_requests, self.num_requests / self.duration, self.timer())
+        return not self.retry_after
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """The general budget of an authenticated user."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+        return None
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """The general budget of an unauthenticated client address."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Password checks per client address."""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """
+    Password checks per account, whatever the address, so guesses spread
+    over many addresses still run out.
+    """
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        ident = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class PollingThrottle(TokenBucketThrottle):
+    """
+    The budget of the endpoints dashboards poll on a timer, per user, and
+    then the PollingLoadShedThrottle bucket shared by every poll. Only polls
+    the user's own bucket admits take from the shared one, so a client
+    polling past its budget cannot get everyone else's polls shed.
+    """
+    scope = 'poll'
+
+    def __init__(self):
+        super().__init__()
+        self.load_shed = PollingLoadShedThrottle()
+
+    def allow_request(self, request, view):
+        if not super().allow_request(request, view):
+            return False
+        if not self.load_shed.allow_request(request, view):
+            self.retry_after = self.load_shed.retry_after
+            return False
+        return True
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = f'ip-{self.get_ident(request)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class PollingLoadShedThrottle(TokenBucketThrottle):
+    """
+    One bucket shared by every poll (per process with LocalBucketStore).
+    When a poll storm drains it, further polls are turned away before they
+    reach the database and the rest of the API keeps its capacity. Taken
+    from by PollingThrottle, after the poller's own bucket.
+    """
+    scope = 'poll_total'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': 'all'}
@@ -16,13 +16,15 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
+from users.views import LoginView
+from .metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # JWT authentication endpoints
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', LoginView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # User app URLs (registration and profile)
@@ -32,4 +34,7 @@ urlpatterns = [
     # This now includes the ticket router at the base '/api/' path.
     # The router itself will create the '/api/tickets/' endpoint.
     path('api/', include('tickets.urls')),
+
+    # Per-endpoint request timings in the Prometheus text format (admins)
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
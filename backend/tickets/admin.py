@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Ticket
+from django.db import transaction
+from .models import Ticket, TicketEvent
 
-admin.site.register(Ticket)
-        
\ No newline at end of file
+class TicketAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        # Edits made here belong in the ticket history like API edits do.
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            TicketEvent.record(obj, actor=request.user, kind=TicketEvent.UPDATED if change else TicketEvent.CREATED)
+
+admin.site.register(Ticket, TicketAdmin)
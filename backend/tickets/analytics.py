@@ -0,0 +1,239 @@
+"""
+Ticket throughput and turnaround analytics, served from rollup tables.
+
+Every ticket contributes to three rollups, each keyed by its category and
+priority: TicketDailyRollup counts it on the day it was opened and, once
+closed, on the day it was closed together with how long that took;
+TicketCloseTimeRollup puts that time in a logarithmic bucket, for medians;
+and TicketBacklogRollup counts it under its status while it is active.
+
+A ticket write applies the difference between the ticket's contribution
+before and after it (record_ticket_changes()), in the write's transaction,
+so the rollups always equal what rebuild_rollups() recomputes from the
+ticket table. Reports read the rollups only.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import ACTIVE_STATUSES, CLOSED_STATUSES, Ticket, TicketArchive, TicketBacklogRollup, TicketCloseTimeRollup, TicketDailyRollup
+
+ROLLUPS = (TicketDailyRollup, TicketCloseTimeRollup, TicketBacklogRollup)
+STATE_FIELDS = ('status', 'category', 'priority', 'created_at', 'closed_at')
+
+# Bucket 0 holds closes within 15 minutes; each further bucket is sqrt(2)
+# times wider than the last, so a median read from them is within about 20%.
+# The last bucket (roughly six months and over) is open-ended.
+CLOSE_TIME_BASE_SECONDS = 900
+CLOSE_TIME_BUCKETS = 30
+
+
+# --- Close time buckets ---
+def close_time_bucket(seconds):
+    if seconds <= CLOSE_TIME_BASE_SECONDS:
+        return 0
+    return min(math.ceil(2 * math.log2(seconds / CLOSE_TIME_BASE_SECONDS)), CLOSE_TIME_BUCKETS - 1)
+
+
+def bucket_bounds(bucket):
+    """
+    The (lower, upper) close time in seconds of a bucket; upper is None for
+    the last one.
+    """
+    lower = 0 if bucket == 0 else CLOSE_TIME_BASE_SECONDS * 2 ** ((bucket - 1) / 2)
+    upper = None if bucket == CLOSE_TIME_BUCKETS - 1 else CLOSE_TIME_BASE_SECONDS * 2 ** (bucket / 2)
+    return lower, upper
+
+
+def median_from_buckets(counts):
+    """
+    Estimates the median close time from {bucket: count}, interpolating
+    within the bucket that holds it.
+    """
+    total = sum(counts.values())
+    if not total:
+        return None
+    middle = total / 2
+    seen = 0
+    for bucket in sorted(counts):
+        count = counts[bucket]
+        if count <= 0:
+            continue
+        if seen + count >= middle:
+            lower, upper = bucket_bounds(bucket)
+            fraction = (middle - seen) / count
+            if upper is None:
+                return round(lower)
+            if lower == 0:
+                return round(upper * fraction)
+            return round(lower * (upper / lower) ** fraction)
+        seen += count
+    return None
+
+
+# --- Maintenance ---
+def _day(value):
+    return timezone.localtime(value).date()
+
+
+def _contribute(deltas, state, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) one ticket state's counts to `deltas`.
+    """
+    if state is None:
+        return
+    status, category, priority, created_at, closed_at = (state[name] for name in STATE_FIELDS)
+    deltas[TicketDailyRollup][(_day(created_at), category, priority)]['opened'] += sign
+    if status in CLOSED_STATUSES and closed_at is not None:
+        seconds = max(0, round((closed_at - created_at).total_seconds()))
+        closed = deltas[TicketDailyRollup][(_day(closed_at), category, priority)]
+        closed['closed'] += sign
+        closed['close_seconds'] += sign * seconds
+        deltas[TicketCloseTimeRollup][(_day(closed_at), category, priority, close_time_bucket(seconds))]['count'] += sign
+    elif status in ACTIVE_STATUSES:
+        deltas[TicketBacklogRollup][(status, category, priority)]['count'] += sign
+
+
+def _states(ticket, created, deleted):
+    current = {name: getattr(ticket, name) for name in STATE_FIELDS}
+    if created:
+        return None, current
+    if deleted:
+        return current, None
+    # last_changes holds [old, new] for what the last save() changed.
+    changes = getattr(ticket, 'last_changes', None) or {}
+    before = {name: changes[name][0] if name in changes else value for name, value in current.items()}
+    return before, current
+
+
+def record_ticket_changes(tickets, created=False, deleted=False, using=None):
+    """
+    Brings the rollups in line with saved (or just deleted) tickets. Call
+    in the transaction that wrote them, after save() or bulk_save() has set
+    last_changes; tickets whose counted fields did not change cost nothing.
+    """
+    deltas = defaultdict(lambda: defaultdict(Counter))
+    for ticket in tickets:
+        before, after = _states(ticket, created, deleted)
+        if before != after:
+            _contribute(deltas, before, -1)
+            _contribute(deltas, after, 1)
+    for model, changes in deltas.items():
+        model.add(changes, using=using)
+
+
+def rebuild_rollups(using=None, chunk_size=5000):
+    """
+    Recomputes every rollup from the live and archived tickets in one
+    transaction and returns the number of tickets read.
+    """
+    using = using or router.db_for_write(TicketDailyRollup)
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            # Writers that already touched a rollup commit before the tickets
+            # are read; later ones wait and apply their deltas to the result.
+            with connection.cursor() as cursor:
+                cursor.execute('LOCK TABLE {} IN EXCLUSIVE MODE'.format(
+                    ', '.join(connection.ops.quote_name(model._meta.db_table) for model in ROLLUPS)))
+        for model in ROLLUPS:
+            # Deleting first also takes SQLite's write lock before the read.
+            model.objects.using(using).all().delete()
+        deltas = defaultdict(lambda: defaultdict(Counter))
+        read = 0
+        # Archived tickets still count; only where they are stored changed.
+        for model in (Ticket, TicketArchive):
+            for state in model.objects.using(using).order_by().values(*STATE_FIELDS).iterator(chunk_size=chunk_size):
+                _contribute(deltas, state, 1)
+                read += 1
+        for model, rows in deltas.items():
+            model.objects.using(using).bulk_create(
+                [model(**dict(zip(model.DIMENSIONS, key)), **counts) for key, counts in rows.items()], batch_size=1000)
+    return read
+
+
+# --- Reports ---
+INTERVALS = {'day': F('day'), 'week': TruncWeek('day'), 'month': TruncMonth('day')}
+
+
+def _periods(start, end, interval):
+    if interval == 'week':
+        period = start - timedelta(days=start.weekday())
+    elif interval == 'month':
+        period = start.replace(day=1)
+    else:
+        period = start
+    while period <= end:
+        yield period
+        if interval == 'week':
+            period += timedelta(days=7)
+        elif interval == 'month':
+            period = (period + timedelta(days=32)).replace(day=1)
+        else:
+            period += timedelta(days=1)
+
+
+def _summary(totals, buckets):
+    closed = totals.get('closed') or 0
+    return {
+        'opened': totals.get('opened') or 0,
+        'closed': closed,
+        'mean_close_seconds': round(totals['close_seconds'] / closed) if closed else None,
+        'median_close_seconds': median_from_buckets(buckets),
+    }
+
+
+def _grouped(daily, closes, dimension):
+    totals = {row[dimension]: row for row in daily.values(dimension).annotate(
+        opened=Sum('opened'), closed=Sum('closed'), close_seconds=Sum('close_seconds'))}
+    buckets = defaultdict(dict)
+    for row in closes.values(dimension, 'bucket').annotate(total=Sum('count')):
+        buckets[row[dimension]][row['bucket']] = row['total']
+    return totals, buckets
+
+
+def ticket_analytics(start, end, interval='day', category=None, priority=None):
+    """
+    Tickets opened and closed, with mean and median time to close, per
+    period between two dates (inclusive) and per category and priority over
+    the whole range, plus the current backlog by status. Close times are
+    attributed to the day a ticket closed; medians are estimates (see
+    CLOSE_TIME_BUCKETS).
+    """
+    filters = {name: value for name, value in (('category', category), ('priority', priority)) if value}
+    daily = TicketDailyRollup.objects.filter(day__range=(start, end), **filters).order_by()
+    closes = TicketCloseTimeRollup.objects.filter(day__range=(start, end), **filters).order_by()
+
+    periods, period_buckets = _grouped(daily.annotate(period=INTERVALS[interval]), closes.annotate(period=INTERVALS[interval]), 'period')
+    series = [{'period': period, **_summary(periods.get(period, {}), period_buckets.get(period, {}))}
+              for period in _periods(start, end, interval)]
+    overall, overall_buckets = Counter(), Counter()
+    for row in periods.values():
+        overall.update({name: row[name] for name in ('opened', 'closed', 'close_seconds')})
+    for buckets in period_buckets.values():
+        overall_buckets.update(buckets)
+
+    breakdowns = {}
+    for dimension, choices in (('category', Ticket.CATEGORY_CHOICES), ('priority', Ticket.PRIORITY_CHOICES)):
+        totals, buckets = _grouped(daily, closes, dimension)
+        breakdowns[f'by_{dimension}'] = [{dimension: value, **_summary(totals.get(value, {}), buckets.get(value, {}))}
+                                         for value, _ in choices if value in totals]
+
+    backlog = dict(TicketBacklogRollup.objects.filter(**filters).order_by().values('status')
+                   .annotate(total=Sum('count')).values_list('status', 'total'))
+    return {
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'totals': _summary(overall, overall_buckets),
+        'series': series,
+        **breakdowns,
+        'backlog': {
+            'total': sum(backlog.get(status, 0) for status in ACTIVE_STATUSES),
+            'by_status': {status: backlog.get(status, 0) for status in ACTIVE_STATUSES},
+        },
+    }
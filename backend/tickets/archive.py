@@ -0,0 +1,132 @@
+"""
+Hot/cold split of the ticket table.
+
+Closed tickets whose closed_at is older than a threshold are moved, in
+batches, to TicketArchive, and their notifications to NotificationArchive
+(`manage.py archive_tickets`). Day-to-day lists, counts and their indexes
+then cover the live tickets only, while history stays readable: detail
+lookups fall back to the archive, and ?include_archived=1 lists both
+(LiveAndArchived). TicketEvents stay where they are; they already outlive
+their tickets.
+
+Archiving changes where a ticket is stored, not what it counts for: the
+analytics rollups are left alone (rebuild_rollups() reads both tables), and
+the dashboard adds the archive's counts (stats.archived_ticket_counts()).
+"""
+from django.db import router, transaction
+from django.db.models import Count, Max, Min, Sum
+from .locking import claimable
+from .models import CLOSED_STATUSES, Notification, NotificationArchive, Ticket, TicketArchive
+from .response_cache import invalidate_tickets
+from .stats import invalidate_archived_ticket_counts, invalidate_dashboard_stats
+
+ARCHIVED_TICKET_FIELDS = tuple(field.attname for field in TicketArchive._meta.concrete_fields if field.name != 'archived_at')
+ARCHIVED_NOTIFICATION_FIELDS = ('id', 'recipient_id', 'ticket_id', 'message', 'is_read', 'created_at')
+
+
+# --- Archiving ---
+def archivable_tickets(before):
+    """
+    Closed tickets that closed before `before` (served by ticket_closed_idx).
+    """
+    return Ticket.objects.filter(status__in=CLOSED_STATUSES, closed_at__lt=before)
+
+
+def archive_batch(tickets, position, batch_size):
+    """
+    Moves the next `batch_size` of `tickets` after `position` (keyset on
+    closed_at, id) and their notifications to the archive tables, in one
+    transaction. Returns the number of tickets moved and the position to
+    continue from.
+    """
+    if position is not None:
+        closed_at, last_id = position
+        tickets = tickets.filter(closed_at__gte=closed_at).exclude(closed_at=closed_at, id__lte=last_id)
+    using = router.db_for_write(Ticket)
+    with transaction.atomic(using=using):
+        # Tickets someone is editing right now are skipped (see locking.claimable()).
+        rows = list(claimable(tickets.using(using)).order_by('closed_at', 'id').values(*ARCHIVED_TICKET_FIELDS)[:batch_size])
+        if not rows:
+            return 0, position
+        ids = [row['id'] for row in rows]
+        TicketArchive.objects.using(using).bulk_create([TicketArchive(**row) for row in rows], ignore_conflicts=True)
+
+        notifications = Notification.objects.using(using).filter(ticket_id__in=ids)
+        NotificationArchive.objects.using(using).bulk_create(
+            [NotificationArchive(**row) for row in notifications.values(*ARCHIVED_NOTIFICATION_FIELDS)], ignore_conflicts=True)
+        # A plain delete, so notification_deleted keeps the unread counters right.
+        notifications.delete()
+        # _raw_delete() sends no post_delete: ticket_changed would take the
+        # tickets out of the rollups, which must keep counting them.
+        Ticket.objects.using(using).filter(pk__in=ids)._raw_delete(using)
+
+    invalidate_tickets([Ticket(id=row['id'], created_by_id=row['created_by_id'], assigned_to_id=row['assigned_to_id']) for row in rows], using=using)
+    invalidate_dashboard_stats(using=using)
+    invalidate_archived_ticket_counts(using=using)
+    last = rows[-1]
+    return len(rows), (last['closed_at'], last['id'])
+
+
+# --- Reading both ---
+class LiveAndArchived:
+    """
+    A live Ticket queryset and the matching TicketArchive queryset, used as
+    one. filter() and values() apply to both; counts and aggregates combine
+    the two; iterating, slicing or iterator() runs a single UNION ALL in the
+    order_by() order. That covers what the ticket list, its paginators and
+    the export do with a queryset. Combine values() querysets only, since
+    the two tables differ in their other columns.
+    """
+    model = Ticket
+    COMBINE = {Count: sum, Sum: sum, Max: max, Min: min}
+
+    def __init__(self, live, archived, ordering=None):
+        self.live = live
+        self.archived = archived
+        self.ordering = ordering if ordering is not None else tuple(live.query.order_by)
+
+    def _each(self, method, *args, **kwargs):
+        return LiveAndArchived(getattr(self.live, method)(*args, **kwargs), getattr(self.archived, method)(*args, **kwargs), self.ordering)
+
+    def filter(self, *args, **kwargs):
+        return self._each('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._each('exclude', *args, **kwargs)
+
+    def values(self, *fields):
+        return self._each('values', *fields)
+
+    def order_by(self, *fields):
+        return LiveAndArchived(self.live, self.archived, fields)
+
+    @property
+    def ordered(self):
+        return bool(self.ordering)
+
+    @property
+    def db(self):
+        return self.live.db
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+    def aggregate(self, **aggregates):
+        live, archived = self.live.aggregate(**aggregates), self.archived.aggregate(**aggregates)
+        combined = {}
+        for name, aggregate in aggregates.items():
+            values = [value for value in (live[name], archived[name]) if value is not None]
+            combined[name] = self.COMBINE[type(aggregate)](values) if values else None
+        return combined
+
+    def union(self):
+        return self.live.order_by().union(self.archived.order_by(), all=True).order_by(*self.ordering)
+
+    def iterator(self, chunk_size=None):
+        return self.union().iterator(chunk_size=chunk_size)
+
+    def __iter__(self):
+        return iter(self.union())
+
+    def __getitem__(self, key):
+        return self.union()[key]
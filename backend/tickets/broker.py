@@ -0,0 +1,145 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class Subscription:
+    """
+    One open stream. Messages are handed to the event loop that owns the
+    stream, so publishers may call in from any thread.
+    """
+    def __init__(self, broker, user_id, loop, max_pending=100):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The stream's periodic catch-up query picks up anything dropped here.
+            pass
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Fan-out of notification messages to the streams open in this process.
+
+    This is the local stand-in for a real pub/sub: publishes made by another
+    worker process never reach these subscribers, which is why streams also
+    run a cheap catch-up query on an interval.
+    """
+    # Whether latest_id() sees publishes made by other processes.
+    shared = False
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The stream's event loop has already shut down.
+                self.unsubscribe(subscription)
+
+    def latest_id(self, user_id):
+        """
+        The id of the newest message published to `user_id` by any process,
+        or None when that is not known.
+        """
+        return None
+
+
+class CacheBroker(InProcessBroker):
+    """
+    InProcessBroker that also records the newest notification id published
+    to each user in the default cache. Streams poll that key and run their
+    catch-up query as soon as it moves, which is how notifications created
+    by the `run_jobs` worker reach streams held by the web processes. That
+    needs a cache the processes share; with the per-process locmem cache
+    only the periodic catch-up query remains.
+    """
+    shared = True
+    # Long enough for every open stream to have polled it; anything older
+    # is picked up by the periodic catch-up anyway.
+    LATEST_ID_SECONDS = 300
+
+    def publish(self, user_id, message):
+        cache.set(f'notifications:latest:{user_id}', message['id'], self.LATEST_ID_SECONDS)
+        super().publish(user_id, message)
+
+    def latest_id(self, user_id):
+        return cache.get(f'notifications:latest:{user_id}')
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """
+    Returns the process-wide broker configured by settings.NOTIFICATION_BROKER.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'NOTIFICATION_BROKER', 'tickets.broker.CacheBroker'))()
+    return _broker
+
+
+def notification_message(notification):
+    from .serializers import NotificationSerializer
+    return {
+        'id': notification.pk,
+        'event': 'notification',
+        'data': json.dumps(NotificationSerializer(notification).data, cls=JSONEncoder),
+    }
+
+
+def publish_notifications(notifications):
+    """
+    Pushes freshly created notifications to their recipients' open streams
+    once the surrounding transaction commits.
+    """
+    messages = [(n.recipient_id, notification_message(n)) for n in notifications]
+    if not messages:
+        return
+
+    def publish():
+        broker = get_broker()
+        for recipient_id, message in messages:
+            broker.publish(recipient_id, message)
+
+    transaction.on_commit(publish)
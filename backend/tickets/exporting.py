@@ -0,0 +1,83 @@
+"""
+Streaming export of tickets as CSV or JSON Lines.
+
+Rows are read with QuerySet.iterator() a chunk at a time (a server-side
+cursor on PostgreSQL) and rendered like the list endpoint renders them, so
+an export of any size holds one chunk in memory and starts sending as soon
+as the first chunk is read. The columns are TicketSerializer's fields.
+"""
+import csv
+import json
+
+from rest_framework import renderers, serializers
+from .serializers import TicketSerializer, project_ticket_rows, render_ticket_row
+
+EXPORT_CHUNK_SIZE = 2000
+# Rendered rows are sent in groups, rather than one tiny write per row.
+ROWS_PER_WRITE = 100
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the queryset's tickets rendered as TicketSerializer would.
+    """
+    datetime_field = serializers.DateTimeField()
+    for row in project_ticket_rows(queryset).iterator(chunk_size=chunk_size):
+        yield render_ticket_row(row, datetime_field)
+
+
+class _Line:
+    # csv.writer only writes to files; this one hands each line back.
+    def write(self, line):
+        return line
+
+
+def _grouped(lines):
+    group = []
+    for line in lines:
+        group.append(line)
+        if len(group) == ROWS_PER_WRITE:
+            yield ''.join(group)
+            group = []
+    if group:
+        yield ''.join(group)
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(_Line(), fieldnames=TicketSerializer.Meta.fields)
+    yield writer.writeheader()
+    yield from _grouped(writer.writerow(row) for row in rows)
+
+
+def stream_jsonl(rows):
+    yield from _grouped(json.dumps(row) + '\n' for row in rows)
+
+
+# --- Renderers ---
+# The export streams its own body; these select the format (?format=csv or an
+# Accept header) and render the error responses, which are plain data.
+class CSVRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    stream = staticmethod(stream_csv)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        writer = csv.DictWriter(_Line(), fieldnames=list(rows[0]) if rows else [])
+        return (writer.writeheader() + ''.join(writer.writerow(row) for row in rows)).encode(self.charset)
+
+
+class JSONLinesRenderer(renderers.BaseRenderer):
+    media_type = 'application/jsonl'
+    format = 'jsonl'
+    charset = 'utf-8'
+    stream = staticmethod(stream_jsonl)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(row) + '\n' for row in rows).encode(self.charset)
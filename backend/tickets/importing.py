@@ -0,0 +1,248 @@
+"""
+Bulk import of historical tickets (and the customers who raised them).
+
+Rows are read one at a time from CSV or JSON Lines and written in batches:
+one bulk_create for new customers, one for tickets and one for their
+TicketEvents, with customer_ticket_id numbers reserved a block per customer.
+Memory holds one batch plus an email -> user map, however long the file.
+
+Each row names its customer by `customer_email` (created as a customer if
+unknown, with `customer_first_name`, `customer_last_name` and
+`customer_phone`) and optionally its technician by `assigned_to_email`.
+Ticket fields follow TicketSerializer's rules; `created_at`, `updated_at`,
+`closed_at` (Completed and Cancelled tickets only; defaults to `updated_at`)
+and `customer_ticket_id` may carry the historical values.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from users.models import CustomUser
+from .analytics import record_ticket_changes
+from .models import CLOSED_STATUSES, CustomerTicketSequence, Ticket, TicketArchive, TicketEvent
+from .seeding import preserved_timestamps
+from .serializers import TicketSerializer
+
+CUSTOMER_FIELDS = {'customer_first_name': 'first_name', 'customer_last_name': 'last_name', 'customer_phone': 'phone_number'}
+TIMESTAMP_FIELDS = ('created_at', 'updated_at', 'closed_at')
+ASSIGNABLE_ROLES = ('technician', 'admin')
+
+
+# --- Reading ---
+def read_rows(handle, fmt):
+    """
+    Yields each input row as a dict of non-empty values, or as an error
+    message when the row cannot be parsed.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(handle):
+            yield {key.strip(): value.strip() for key, value in row.items()
+                   if key and isinstance(value, str) and value.strip()}
+        return
+    for line in handle:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(row, dict):
+            yield 'Expected a JSON object.'
+            continue
+        yield {key: value for key, value in row.items() if value not in (None, '')}
+
+
+def _parse_timestamp(value):
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None and isinstance(value, str) and parse_date(value):
+        parsed = parse_datetime(f'{value}T00:00:00')
+    if parsed is None:
+        raise ValueError('Expected an ISO 8601 date or timestamp.')
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+# --- Importing ---
+class RowRejected(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class TicketImporter:
+    """
+    Validates and writes batches of rows. Call import_batch() inside a
+    transaction; it returns the number of tickets created and the rejected
+    rows as (row number, errors).
+    """
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = {email.lower(): (pk, role) for email, pk, role in CustomUser.objects.values_list('email', 'id', 'user_role').iterator()}
+        self.customers_created = 0
+        # One serializer validates every row (run_validation() keeps no state).
+        # assigned_to is resolved by email instead, without a query per row.
+        self.serializer = TicketSerializer()
+        self.serializer.fields.pop('assigned_to')
+        self.writable_fields = [name for name, field in self.serializer.fields.items() if not field.read_only]
+
+    def import_batch(self, rows):
+        rejected = []
+        valid = []
+        for number, row in rows:
+            try:
+                valid.append((number, *self.validate(row)))
+            except RowRejected as exc:
+                rejected.append((number, exc.errors))
+
+        self.create_customers([customer for number, ticket, email, customer in valid if customer is not None])
+        tickets = []
+        for number, ticket, email, customer in valid:
+            ticket.created_by_id = self.users[email.lower()][0]
+            tickets.append((number, ticket))
+        tickets, duplicates = self.drop_duplicates(tickets)
+        rejected += duplicates
+        self.number(tickets)
+
+        tickets = [ticket for number, ticket in tickets]
+        with preserved_timestamps(Ticket):
+            Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+        for ticket in tickets:
+            ticket.last_changes = ticket.get_changes()
+        TicketEvent.record_many(tickets, kind=TicketEvent.CREATED)
+        record_ticket_changes(tickets, created=True)
+        return len(tickets), sorted(rejected)
+
+    def validate(self, row):
+        """
+        Returns an unsaved Ticket, its customer's email and the unsaved new
+        customer (None if known). Raises RowRejected with errors in the shape
+        of serializer errors.
+        """
+        if isinstance(row, str):
+            raise RowRejected({'row': [row]})
+        errors, fields = {}, {}
+        try:
+            fields = self.serializer.run_validation({name: row[name] for name in self.writable_fields if name in row})
+        except ValidationError as exc:
+            errors.update(exc.detail)
+
+        timestamps = {}
+        for name in TIMESTAMP_FIELDS:
+            if name in row:
+                try:
+                    timestamps[name] = _parse_timestamp(row[name])
+                except ValueError as exc:
+                    errors[name] = [str(exc)]
+        number = row.get('customer_ticket_id')
+        if number is not None:
+            try:
+                number = int(number)
+                if number < 1:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors['customer_ticket_id'] = ['Expected a positive integer.']
+
+        assigned_to_id = None
+        if 'assigned_to_email' in row:
+            assignee = self.users.get(str(row['assigned_to_email']).lower())
+            if assignee is None:
+                errors['assigned_to_email'] = ['No user with this email.']
+            elif assignee[1] not in ASSIGNABLE_ROLES:
+                errors['assigned_to_email'] = ['Tickets can only be assigned to technicians and admins.']
+            else:
+                assigned_to_id = assignee[0]
+
+        customer = None
+        email = row.get('customer_email')
+        if not isinstance(email, str):
+            errors['customer_email'] = ['This field is required.']
+        elif email.lower() not in self.users:
+            customer = CustomUser(email=CustomUser.objects.normalize_email(email), user_role='customer',
+                                  **{field: str(row[key]) for key, field in CUSTOMER_FIELDS.items() if key in row})
+            customer.set_unusable_password()
+            try:
+                customer.clean_fields(exclude=['password', 'last_login', 'date_joined'])
+            except DjangoValidationError as exc:
+                errors.update({f'customer_{name}': messages for name, messages in exc.message_dict.items()})
+
+        closed = fields.get('status', Ticket._meta.get_field('status').default) in CLOSED_STATUSES
+        if 'closed_at' in timestamps and not closed and 'status' not in errors:
+            errors.setdefault('closed_at', ['Only Completed and Cancelled tickets can have a closed_at.'])
+
+        if errors:
+            raise RowRejected(errors)
+        created_at = timestamps.get('created_at', timezone.now())
+        updated_at = timestamps.get('updated_at', created_at)
+        # Closed tickets without a recorded closing time are taken to have closed at their last update.
+        ticket = Ticket(**fields, assigned_to_id=assigned_to_id, customer_ticket_id=number,
+                        created_at=created_at, updated_at=updated_at,
+                        closed_at=timestamps.get('closed_at', updated_at) if closed else None)
+        return ticket, email, customer
+
+    def create_customers(self, customers):
+        new = {}
+        for customer in customers:
+            new.setdefault(customer.email.lower(), customer)
+        if not new:
+            return
+        # ignore_conflicts: someone may have registered one of them since the map was loaded.
+        CustomUser.objects.bulk_create(new.values(), batch_size=self.batch_size, ignore_conflicts=True)
+        for email, pk, role in CustomUser.objects.filter(email__in=[customer.email for customer in new.values()]).values_list('email', 'id', 'user_role'):
+            self.users[email.lower()] = (pk, role)
+        self.customers_created += len(new)
+
+    def drop_duplicates(self, tickets):
+        """
+        Rejects rows whose customer_ticket_id the customer already holds, in
+        the database or earlier in the batch, so re-importing a file that
+        carries its job numbers creates nothing twice.
+        """
+        wanted = defaultdict(set)
+        for number, ticket in tickets:
+            if ticket.customer_ticket_id is not None:
+                wanted[ticket.created_by_id].add(ticket.customer_ticket_id)
+        # One query per table (archived tickets keep their numbers too) for the
+        # whole batch; the cross product it over-fetches is filtered here.
+        taken = set()
+        for model in (Ticket, TicketArchive) if wanted else ():
+            existing = model.objects.filter(
+                created_by_id__in=wanted, customer_ticket_id__in={value for numbers in wanted.values() for value in numbers},
+            ).values_list('created_by_id', 'customer_ticket_id')
+            taken.update((customer_id, value) for customer_id, value in existing if value in wanted[customer_id])
+
+        kept, duplicates = [], []
+        for number, ticket in tickets:
+            key = (ticket.created_by_id, ticket.customer_ticket_id)
+            if ticket.customer_ticket_id is not None and key in taken:
+                duplicates.append((number, {'customer_ticket_id': ['The customer already has a ticket with this number.']}))
+                continue
+            taken.add(key)
+            kept.append((number, ticket))
+        return kept, duplicates
+
+    def number(self, tickets):
+        """
+        Fills in missing customer_ticket_ids from one reserved block per
+        customer, and moves each sequence past any imported number so later
+        tickets never collide with them.
+        """
+        missing = Counter(ticket.created_by_id for number, ticket in tickets if ticket.customer_ticket_id is None)
+        highest = {}
+        for number, ticket in tickets:
+            if ticket.customer_ticket_id is not None:
+                highest[ticket.created_by_id] = max(highest.get(ticket.created_by_id, 0), ticket.customer_ticket_id)
+        for customer_id, value in highest.items():
+            CustomerTicketSequence.allocate(customer_id, count=0)  # make sure the row exists
+            CustomerTicketSequence.objects.filter(customer_id=customer_id).update(last_value=Greatest(F('last_value'), value))
+
+        next_numbers = {customer_id: CustomerTicketSequence.allocate(customer_id, count=count) for customer_id, count in missing.items()}
+        for number, ticket in tickets:
+            if ticket.customer_ticket_id is None:
+                ticket.customer_ticket_id = next_numbers[ticket.created_by_id]
+                next_numbers[ticket.created_by_id] += 1
@@ -0,0 +1,128 @@
+"""
+A durable background job queue kept in the database (the Job table), so
+side effects of a write (notifications today) leave the request path
+without an external broker.
+
+enqueue() inserts the job in the caller's transaction: it exists exactly
+when the write that queued it commits. `manage.py run_jobs` workers claim
+due jobs in batches (any number of them may run at once, see
+locking.claimable()), run each one and delete it. A job that raises is
+retried with exponential backoff and marked failed after max_attempts.
+Delivery is at least once: a worker that dies mid-job leaves it to be run
+again when its lease expires, so tasks must tolerate a repeat.
+
+With settings.JOBS_RUN_INLINE, jobs run in the enqueuing process once its
+transaction commits instead, and no worker is needed.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .locking import claimable
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, payload=None, delay=None, max_attempts=None):
+    """
+    Queues a call of `task` (the dotted path of a function) with `payload`
+    (JSON-serialisable keyword arguments), to run once the current
+    transaction commits. Returns the Job (None when run inline).
+    """
+    payload = payload or {}
+    if settings.JOBS_RUN_INLINE:
+        transaction.on_commit(lambda: import_string(task)(**payload))
+        return None
+    return Job.objects.create(
+        task=task, payload=payload, run_at=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    """
+    Backoff after a job's `attempts`-th failure: doubling from
+    JOB_RETRY_BASE_SECONDS up to JOB_RETRY_MAX_SECONDS, with jitter so jobs
+    that failed together do not retry together.
+    """
+    seconds = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return timedelta(seconds=seconds * random.uniform(0.75, 1))
+
+
+# --- Running ---
+def claim_jobs(worker, limit, lease=None):
+    """
+    Takes up to `limit` due jobs for `worker`, oldest first, and leases them
+    to it: they are due again, for any worker, once the lease runs out.
+    """
+    using = router.db_for_write(Job)
+    now = timezone.now()
+    lease = lease or timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    with transaction.atomic(using=using):
+        due = Job.objects.using(using).filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+        jobs = list(claimable(due)[:limit])
+        if jobs:
+            Job.objects.using(using).filter(pk__in=[job.pk for job in jobs]).update(
+                run_at=now + lease, locked_by=worker, attempts=F('attempts') + 1)
+    for job in jobs:
+        job.run_at, job.locked_by, job.attempts = now + lease, worker, job.attempts + 1
+    return jobs
+
+
+def _fail(job, error):
+    job.last_error = error
+    job.locked_by = ''
+    if job.attempts >= job.max_attempts:
+        job.status = Job.FAILED
+        logger.error('Job %s (%s) failed for good after %s attempts.', job.pk, job.task, job.attempts)
+    else:
+        job.run_at = timezone.now() + retry_delay(job.attempts)
+    Job.objects.filter(pk=job.pk).update(status=job.status, run_at=job.run_at, locked_by='', last_error=error)
+
+
+def run_job(job):
+    """
+    Runs one claimed job. On success the job is deleted in the transaction
+    that commits the task's own writes; on failure it is rescheduled or,
+    out of attempts, marked failed. Returns whether it succeeded.
+    """
+    if job.attempts > job.max_attempts:
+        # Its last attempt was claimed but never reported back.
+        job.attempts = job.max_attempts
+        _fail(job, job.last_error or 'The last attempt did not finish within its lease.')
+        return False
+    try:
+        with transaction.atomic():
+            import_string(job.task)(**job.payload)
+            Job.objects.filter(pk=job.pk).delete()
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s.', job.pk, job.task, job.attempts)
+        _fail(job, traceback.format_exc())
+        return False
+    return True
+
+
+def run_due_jobs(worker, batch_size):
+    """
+    Claims and runs one batch of due jobs. Returns (succeeded, failed).
+    """
+    succeeded = failed = 0
+    for job in claim_jobs(worker, batch_size):
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
@@ -0,0 +1,37 @@
+"""
+Row claiming for queues that many workers take from at once (the
+technicians' work queue, background jobs): each claimer must get rows no
+other claimer gets.
+"""
+from django.db import connections
+
+
+def _take_write_lock(queryset):
+    # Any write statement makes SQLite take the database write lock (waiting
+    # out the busy timeout), and the transaction holds it until it ends.
+    connection = connections[queryset.db]
+    meta = queryset.model._meta
+    table, pk = (connection.ops.quote_name(name) for name in (meta.db_table, meta.pk.column))
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET {pk} = {pk} WHERE 1 = 0')
+
+
+def claimable(queryset):
+    """
+    Returns `queryset` set up so that the rows it reads are the caller's
+    until the surrounding transaction ends. Call inside transaction.atomic()
+    on the database the claim writes to.
+
+    Where the database supports SKIP LOCKED (PostgreSQL), the rows read are
+    locked and concurrent claimers skip them, so they take different rows
+    without waiting on each other. SQLite has no row locks, so the claimer
+    takes the database write lock before it reads: claims run one at a
+    time, each seeing the ones before it.
+    """
+    connection = connections[queryset.db]
+    if connection.features.has_select_for_update_skip_locked:
+        return queryset.select_for_update(skip_locked=True, of=('self',))
+    if connection.vendor == 'sqlite':
+        _take_write_lock(queryset)
+        return queryset
+    return queryset.select_for_update(of=('self',))
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tickets.archive import archivable_tickets, archive_batch
+
+
+class Command(BaseCommand):
+    help = ('Moves Completed and Cancelled tickets that closed longer ago than the threshold, with their '
+            'notifications, to the archive tables in small batches, one short transaction each, so the '
+            'command is safe to run while the API is serving traffic. Archived tickets stay readable.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TICKET_ARCHIVE_AFTER_DAYS,
+                            help='Keep tickets closed fewer than this many days ago live (default: %(default)s).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Tickets per transaction.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived without changing anything.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be positive.')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        tickets = archivable_tickets(cutoff)
+
+        if options['dry_run']:
+            total = tickets.count()
+            batches = -(-total // options['batch_size'])
+            self.stdout.write(f'Would archive {total} tickets closed before {cutoff:%Y-%m-%d %H:%M} '
+                              f'in {batches} batches of {options["batch_size"]}.')
+            return
+
+        started = time.perf_counter()
+        archived = batches = 0
+        position = None
+        while options['max_batches'] is None or batches < options['max_batches']:
+            batch_started = time.perf_counter()
+            count, position = archive_batch(tickets, position, options['batch_size'])
+            if not count:
+                break
+            archived += count
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  batch {batches}: {count} tickets in {(time.perf_counter() - batch_started) * 1000:.0f} ms')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.perf_counter() - started
+        rate = archived / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tickets in {batches} batches, '
+                                             f'{elapsed:.1f}s ({rate:,.0f} tickets/s).'))
@@ -0,0 +1,310 @@
+import json
+import platform
+import random
+import re
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from unittest import mock
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from service_bay_api.throttling import TokenBucketThrottle
+from tickets.models import Notification, Ticket
+from tickets.seeding import seed
+from users.authentication import get_user_cache
+from users.models import CustomUser
+
+# Users of each role the requests are spread over, so per-user caches and
+# index ranges are exercised rather than one hot account.
+USERS_PER_ROLE = 50
+ACTIVE_STATUSES = Ticket.ACTIVE_STATUSES
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list.
+    return values[max(0, min(len(values) - 1, round(fraction * len(values) + 0.5) - 1))]
+
+
+def rows_in(response, streamed=None):
+    """
+    How many records a response serialized: list items, the results of a
+    page, 1 for a single object, or the lines of a streamed JSON Lines body.
+    """
+    if streamed is not None:
+        return streamed.count(b'\n')
+    data = getattr(response, 'data', None)
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        return len(data['results']) if isinstance(data.get('results'), list) else 1
+    return 0
+
+
+class Command(BaseCommand):
+    help = ('Seeds a throwaway data set, drives every ticket and user endpoint through the test '
+            'client with a weighted mix of customers, technicians and admins, and writes p50/p95 '
+            'latency, query counts and rows serialized per endpoint as JSON for diffing between commits. '
+            'Not driven: /api/token/ (its throttles and password hashing would dominate) and the '
+            'notification stream (a long-lived ASGI response).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=20000)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--technicians', type=int, default=20)
+        parser.add_argument('--notifications', type=int, help='Notifications to seed (default: as many as tickets).')
+        parser.add_argument('--no-seed', action='store_true', help='Use the existing data instead of seeding (requires users of every role).')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests to spread over the endpoints by weight.')
+        parser.add_argument('--min-samples', type=int, default=20, help='Requests per endpoint at the least.')
+        parser.add_argument('--cache', choices=['cold', 'warm'], default='cold',
+                            help='cold clears the caches before every request; warm lets repeated reads hit them.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the request order.')
+        parser.add_argument('--output', help='Write the JSON report here instead of to stdout.')
+        parser.add_argument('--compare', help='A previous report to print p95 and query count changes against.')
+        parser.add_argument('--max-regression', type=float,
+                            help='With --compare, fail if any p95 grows by more than this many percent or any query count grows.')
+
+    def handle(self, *args, **options):
+        baseline = self.load_report(options['compare']) if options['compare'] else None
+        # Kept out of the report, so two runs' reports diff cleanly.
+        self.stderr.write(f'Started at {timezone.now().isoformat()}.')
+        with transaction.atomic():
+            if not options['no_seed']:
+                self.stderr.write(f"Seeding {options['tickets']} tickets...")
+                seed(customers=options['customers'], technicians=options['technicians'], tickets=options['tickets'],
+                     notifications=options['tickets'] if options['notifications'] is None else options['notifications'],
+                     seed=options['seed'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            context = self.get_context(random.Random(options['seed']))
+            # Throttle budgets would turn a tight benchmark loop into 429s; what
+            # is measured here is the work behind each endpoint.
+            with mock.patch.object(TokenBucketThrottle, 'allow_request', return_value=True):
+                samples = self.run_requests(context, options)
+            transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cache': options['cache'],
+                'requests': sum(len(sample['latency']) for sample in samples.values()),
+                'data': context['volumes'],
+            },
+            'endpoints': {label: self.summarize(sample) for label, sample in sorted(samples.items())},
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}.")
+        else:
+            self.stdout.write(output)
+        self.print_table(report['endpoints'], baseline and baseline['endpoints'])
+        if baseline is not None and options['max_regression'] is not None:
+            self.check_regressions(report['endpoints'], baseline['endpoints'], options['max_regression'])
+
+    # --- Data ---
+    def get_context(self, rng):
+        users = {}
+        for role in ('customer', 'technician', 'admin'):
+            ids = list(CustomUser.objects.filter(user_role=role, is_active=True).order_by('-id').values_list('id', flat=True)[:USERS_PER_ROLE])
+            if not ids:
+                raise CommandError(f'The benchmark needs at least one active {role}.')
+            users[role] = list(CustomUser.objects.filter(id__in=ids))
+        created, assigned = defaultdict(list), defaultdict(list)
+        for pk, created_by in Ticket.objects.filter(created_by__in=users['customer']).values_list('id', 'created_by_id').iterator():
+            created[created_by].append(pk)
+        for pk, assigned_to in Ticket.objects.filter(
+                assigned_to__in=users['technician'], status__in=ACTIVE_STATUSES).values_list('id', 'assigned_to_id').iterator():
+            assigned[assigned_to].append(pk)
+        all_ids = [pk for ids in created.values() for pk in ids]
+        if not all_ids:
+            raise CommandError('The benchmark needs tickets created by the sampled customers.')
+        return {
+            'rng': rng,
+            'users': users,
+            'created': created,
+            'assigned': assigned,
+            'ticket_ids': all_ids,
+            'since': (timezone.now() - timezone.timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'volumes': {
+                'users': CustomUser.objects.count(),
+                'tickets': Ticket.objects.count(),
+                'notifications': Notification.objects.count(),
+            },
+        }
+
+    def get_scenarios(self):
+        """
+        (label, role, weight, method, request builder). Builders return the
+        path and body for a user of that role, or None when the user has
+        nothing to act on. Weights reflect the traffic: mostly customer and
+        technician polls, with admin work and writes a small share.
+        """
+        def on_ticket(tickets, template, body=None):
+            def build(ctx, user):
+                ids = ctx[tickets].get(user.pk)
+                return ids and (template.format(id=ctx['rng'].choice(ids)), body)
+            return build
+
+        def some_tickets(ctx, count):
+            return ctx['rng'].sample(ctx['ticket_ids'], min(count, len(ctx['ticket_ids'])))
+
+        def customer_of(ctx):
+            return ctx['rng'].choice(ctx['users']['customer'])
+
+        return [
+            # tickets/urls.py
+            ('ticket-list (customer)', 'customer', 20, 'get', lambda ctx, user: ('/api/tickets/', None)),
+            ('ticket-list (customer, delta)', 'customer', 10, 'get', lambda ctx, user: (f"/api/tickets/?updated_since={ctx['since']}", None)),
+            ('ticket-list (technician)', 'technician', 10, 'get', lambda ctx, user: ('/api/tickets/', None)),
+            ('ticket-list (technician, cursor)', 'technician', 5, 'get', lambda ctx, user: ('/api/tickets/?cursor=', None)),
+            ('ticket-list (admin)', 'admin', 4, 'get', lambda ctx, user: ('/api/tickets/', None)),
+            ('ticket-list (admin, delta)', 'admin', 2, 'get', lambda ctx, user: (f"/api/tickets/?updated_since={ctx['since']}", None)),
+            ('ticket-list (admin, search)', 'admin', 2, 'get', lambda ctx, user: ('/api/tickets/?q=brake+noise', None)),
+            ('ticket-detail (customer)', 'customer', 6, 'get', on_ticket('created', '/api/tickets/{id}/')),
+            ('ticket-events (customer)', 'customer', 2, 'get', on_ticket('created', '/api/tickets/{id}/events/')),
+            ('ticket-create (customer)', 'customer', 2, 'post', lambda ctx, user: (
+                '/api/tickets/', {'title': 'Brake noise', 'description': 'Squeals when stopping.', 'category': 'Brakes',
+                                  'vehicle_make': 'Ford', 'vehicle_model': 'Focus', 'vehicle_year': 2019})),
+            ('ticket-update (technician)', 'technician', 3, 'patch', on_ticket('assigned', '/api/tickets/{id}/', {'status': 'Awaiting Parts'})),
+            ('ticket-bulk (admin)', 'admin', 1, 'post', lambda ctx, user: (
+                '/api/tickets/bulk/', {'ids': some_tickets(ctx, 50), 'priority': 'Urgent'})),
+            ('ticket-queue (technician)', 'technician', 2, 'get', lambda ctx, user: ('/api/tickets/queue/', None)),
+            ('ticket-claim (technician)', 'technician', 1, 'post', lambda ctx, user: ('/api/tickets/claim/', None)),
+            ('ticket-destroy (admin)', 'admin', 1, 'delete', lambda ctx, user: (f"/api/tickets/{ctx['rng'].choice(ctx['ticket_ids'])}/", None)),
+            ('ticket-export (customer)', 'customer', 1, 'get', lambda ctx, user: ('/api/tickets/export/?format=jsonl', None)),
+            ('ticket-export (admin, delta)', 'admin', 1, 'get', lambda ctx, user: (f"/api/tickets/export/?format=jsonl&updated_since={ctx['since']}", None)),
+            ('ticket-event-feed (admin)', 'admin', 1, 'get', lambda ctx, user: ('/api/ticket-events/', None)),
+            ('notification-list', 'customer', 6, 'get', lambda ctx, user: ('/api/notifications/', None)),
+            ('notification-unread-count', 'customer', 12, 'get', lambda ctx, user: ('/api/notifications/unread_count/', None)),
+            ('notification-unread-count (technician)', 'technician', 6, 'get', lambda ctx, user: ('/api/notifications/unread_count/', None)),
+            ('notification-mark-all-read', 'customer', 1, 'post', lambda ctx, user: ('/api/notifications/mark_all_as_read/', None)),
+            ('dashboard-stats (admin)', 'admin', 2, 'get', lambda ctx, user: ('/api/dashboard-stats/', None)),
+            ('cache-metrics (admin)', 'admin', 1, 'get', lambda ctx, user: ('/api/cache-metrics/', None)),
+            ('analytics, 90 days by week (admin)', 'admin', 1, 'get', lambda ctx, user: (f'/api/analytics/?interval=week&start={timezone.localdate() - timedelta(days=89)}', None)),
+            # users/urls.py
+            ('user-register', None, 1, 'post', lambda ctx, user: (
+                '/api/users/register/', {'email': f"bench.{ctx['rng'].getrandbits(48):x}@example.com", 'password': 'Bench-pass-123'})),
+            ('user-me', 'customer', 4, 'get', lambda ctx, user: ('/api/users/me/', None)),
+            ('user-create (admin)', 'admin', 1, 'post', lambda ctx, user: (
+                '/api/users/', {'email': f"bench.{ctx['rng'].getrandbits(48):x}@example.com", 'password': 'Bench-pass-123',
+                                'user_role': 'technician'})),
+            ('user-list (admin)', 'admin', 1, 'get', lambda ctx, user: ('/api/users/?count=estimate', None)),
+            ('user-list (admin, role)', 'admin', 1, 'get', lambda ctx, user: ('/api/users/?role=technician', None)),
+            ('user-list (admin, search)', 'admin', 1, 'get', lambda ctx, user: ('/api/users/?search=cust&count=estimate', None)),
+            ('user-detail (admin)', 'admin', 1, 'get', lambda ctx, user: (f'/api/users/{customer_of(ctx).pk}/', None)),
+            ('user-update (admin)', 'admin', 1, 'patch', lambda ctx, user: (f'/api/users/{customer_of(ctx).pk}/', {'first_name': 'Benchmark'})),
+        ]
+
+    # --- Running ---
+    def run_requests(self, ctx, options):
+        scenarios = self.get_scenarios()
+        total_weight = sum(scenario[2] for scenario in scenarios)
+        plan = [scenario for scenario in scenarios
+                for _ in range(max(options['min_samples'], round(options['requests'] * scenario[2] / total_weight)))]
+        ctx['rng'].shuffle(plan)
+
+        samples = defaultdict(lambda: {'method': None, 'path': None, 'role': None, 'latency': [], 'queries': [], 'rows': [], 'status': Counter()})
+        queries = []
+        self.stderr.write(f'Running {len(plan)} requests over {len(scenarios)} endpoints...')
+        for label, role, weight, method, build in plan:
+            user, request = None, None
+            for _ in range(10):  # a few users may have nothing to act on
+                user = ctx['rng'].choice(ctx['users'][role]) if role else None
+                request = build(ctx, user)
+                if request:
+                    break
+            if not request:
+                continue
+            path, body = request
+            client = APIClient(SERVER_NAME='localhost')
+            if user is not None:
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            if options['cache'] == 'cold':
+                # Also keeps query counts comparable between runs.
+                cache.clear()
+                get_user_cache().clear()
+
+            queries.clear()
+            # Each request's writes are undone, so every sample sees the same data.
+            with transaction.atomic(), connection.execute_wrapper(lambda execute, *args: queries.append(1) or execute(*args)):
+                started = time.perf_counter()
+                response = getattr(client, method)(path, body, format='json') if body is not None else getattr(client, method)(path)
+                # An export's rows are queried and rendered as its body is read.
+                streamed = b''.join(response.streaming_content) if response.streaming else None
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+
+            sample = samples[label]
+            sample.update(method=method.upper(), path=re.sub(r'/\d+/', '/{id}/', path), role=role)
+            sample['latency'].append(elapsed * 1000)
+            sample['queries'].append(len(queries))
+            sample['rows'].append(rows_in(response, streamed))
+            sample['status'][str(response.status_code)] += 1
+        return samples
+
+    def summarize(self, sample):
+        latency = sorted(sample['latency'])
+        return {
+            'method': sample['method'],
+            'path': sample['path'],
+            'role': sample['role'],
+            'samples': len(latency),
+            'status': dict(sample['status']),
+            'latency_ms': {
+                'p50': round(percentile(latency, 0.50), 3),
+                'p95': round(percentile(latency, 0.95), 3),
+                'mean': round(sum(latency) / len(latency), 3),
+                'max': round(latency[-1], 3),
+            },
+            'queries': {'mean': round(sum(sample['queries']) / len(latency), 2), 'max': max(sample['queries'])},
+            'rows': {'mean': round(sum(sample['rows']) / len(latency), 2), 'total': sum(sample['rows'])},
+        }
+
+    # --- Reporting ---
+    def load_report(self, path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read the baseline report {path}: {exc}')
+
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_table(self, endpoints, baseline=None):
+        self.stderr.write(f"  {'endpoint':<42} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'rows':>8}" + ('  p95 change' if baseline else ''))
+        for label, result in endpoints.items():
+            line = (f"  {label:<42} {result['latency_ms']['p50']:>9.1f} {result['latency_ms']['p95']:>9.1f} "
+                    f"{result['queries']['mean']:>8.1f} {result['rows']['mean']:>8.1f}")
+            if baseline and label in baseline:
+                before = baseline[label]['latency_ms']['p95']
+                line += f'  {(result["latency_ms"]["p95"] - before) / before * 100 if before else 0:+10.1f}%'
+            self.stderr.write(line)
+
+    def check_regressions(self, endpoints, baseline, max_regression):
+        regressions = []
+        for label, result in endpoints.items():
+            if label not in baseline:
+                continue
+            before, after = baseline[label], result
+            if before['latency_ms']['p95'] and (after['latency_ms']['p95'] / before['latency_ms']['p95'] - 1) * 100 > max_regression:
+                regressions.append(f"{label}: p95 {before['latency_ms']['p95']:.1f} -> {after['latency_ms']['p95']:.1f} ms")
+            if after['queries']['max'] > before['queries']['max']:
+                regressions.append(f"{label}: up to {after['queries']['max']} queries, was {before['queries']['max']}")
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against the baseline:\n' + '\n'.join(regressions))
+        self.stderr.write(self.style.SUCCESS('No regressions against the baseline.'))
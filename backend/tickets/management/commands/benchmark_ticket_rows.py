@@ -0,0 +1,53 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.utils.encoders import JSONEncoder
+from tickets.models import Ticket
+from tickets.seeding import seed
+from tickets.serializers import TicketSerializer, project_ticket_rows, render_ticket_rows
+
+
+class Command(BaseCommand):
+    help = ('Compares rows/second of TicketSerializer against the values() list path on a '
+            'throwaway seeded data set, and checks both produce identical output.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3, help='Best of N runs per strategy.')
+        parser.add_argument('--skip-unjoined', action='store_true', help='Skip the N+1 baseline (one query per user reference).')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            self.stdout.write(f'Seeding {rows} tickets...')
+            last_existing_id = Ticket.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            seed(customers=max(1, rows // 20), technicians=20, tickets=rows, notifications=0)
+            # Each run builds a fresh queryset so no strategy reuses another's result cache.
+            def tickets():
+                return Ticket.objects.filter(id__gt=last_existing_id).order_by('-created_at', '-id')
+
+            strategies = [
+                ('serializer + select_related', lambda: TicketSerializer(tickets().select_related('created_by', 'assigned_to'), many=True).data),
+                ('values() rows', lambda: render_ticket_rows(project_ticket_rows(tickets()))),
+            ]
+            if not options['skip_unjoined']:
+                strategies.insert(0, ('serializer, no joins (N+1)', lambda: TicketSerializer(tickets(), many=True).data))
+
+            outputs = {}
+            for label, render in strategies:
+                best, queries = None, []
+                for _ in range(options['repeat']):
+                    queries.clear()
+                    with connection.execute_wrapper(lambda execute, *args: queries.append(1) or execute(*args)):
+                        started = time.perf_counter()
+                        data = render()
+                        elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                outputs[label] = json.dumps(data, cls=JSONEncoder)
+                self.stdout.write(f'  {label:<30} {len(data) / best:>12,.0f} rows/s  {best * 1000:>9.1f} ms  {len(queries)} queries')
+            transaction.set_rollback(True)
+
+        if len(set(outputs.values())) != 1:
+            raise CommandError('The list renderers produced different output.')
+        self.stdout.write(self.style.SUCCESS('All strategies produced identical output.'))
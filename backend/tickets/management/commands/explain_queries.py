@@ -0,0 +1,142 @@
+import re
+from urllib.parse import quote
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from tickets.models import Ticket
+from tickets.seeding import seed
+from tickets.stats import ARCHIVED_COUNTS_CACHE_KEY, DASHBOARD_STATS_CACHE_KEY
+
+# SQLite reports full scans as "SCAN <table>", walking the table or a whole index
+# ("USING [COVERING] INDEX", with no search bound), and sorts as "USE TEMP B-TREE";
+# PostgreSQL as "Seq Scan" and "Sort" nodes. An index walk that serves a LIMIT's
+# order stops after that many rows, so it is not counted (see bounded_walk()).
+SQLITE_PROBLEMS = re.compile(r'^SCAN \w+(?: USING (?:COVERING )?INDEX \w+)?$|USE TEMP B-TREE')
+SQLITE_INDEX_WALK = re.compile(r'^SCAN \w+ USING (?:COVERING )?INDEX \w+$')
+LIMIT = re.compile(r'\bLIMIT \d+', re.IGNORECASE)
+POSTGRES_PROBLEMS = re.compile(r'Seq Scan|(?<!Incremental )Sort\b')
+# Problems a check accepts by design, as (plan line pattern, reason).
+WHOLE_TABLE_AGGREGATE = (re.compile(r'^SCAN \w+|USE TEMP B-TREE FOR GROUP BY|Seq Scan|Sort\b'),
+                         'whole-table counts, cached for DASHBOARD_STATS_CACHE_SECONDS')
+SCOPE_TOTAL = (re.compile(r'^SCAN \w+|Seq Scan'), 'the total that admin page numbers and sent deltas report counts every ticket')
+RANKED_SORT = (re.compile(r'USE TEMP B-TREE FOR ORDER BY|Sort\b'), 'matches are sorted by their computed rank')
+
+
+class Command(BaseCommand):
+    help = ('Seeds a throwaway data set, runs EXPLAIN on the queries behind each API view '
+            'and fails if any of them needs a sequential scan, a walk of a whole index or a sort. '
+            'The dashboard statistics and the admin totals (whole-table counts) and ticket search '
+            '(sorted by rank) are checked too, but may scan or sort where they must.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=20000)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--no-seed', action='store_true', help='Use the existing data instead of seeding (requires users of every role).')
+        parser.add_argument('--keep', action='store_true', help='Commit the seeded data instead of rolling it back.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plan checks are not implemented for {connection.vendor}.')
+        failures = []
+        with transaction.atomic():
+            users = self.get_users(options)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                if connection.vendor == 'postgresql':
+                    # Ask "can an index serve this?" rather than "is a seq scan cheaper on this tiny table?".
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            # Make sure the cached statistics are computed, so their queries are
+            # seen; the invalidate_*() helpers would wait for a commit that never comes.
+            cache.delete_many([DASHBOARD_STATS_CACHE_KEY, ARCHIVED_COUNTS_CACHE_KEY])
+            for label, user, method, path, *accepted in self.get_checks(users):
+                failures += self.check_endpoint(label, user, method, path, *accepted)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} check(s) failed:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All checked queries are served by indexes, apart from the expected steps noted above.'))
+
+    def get_users(self, options):
+        if not options['no_seed']:
+            self.stdout.write(f"Seeding {options['tickets']} tickets...")
+            users = seed(customers=options['customers'], tickets=options['tickets'], notifications=options['tickets'])
+            return {role: members[0] for role, members in users.items()}
+        from users.models import CustomUser
+        users = {role: CustomUser.objects.filter(user_role=role).first() for role in ('customer', 'technician', 'admin')}
+        if not all(users.values()):
+            raise CommandError('--no-seed needs at least one customer, technician and admin.')
+        return users
+
+    def get_checks(self, users):
+        customer, technician, admin = users['customer'], users['technician'], users['admin']
+        ticket = Ticket.objects.filter(created_by=customer).first()
+        recent = (timezone.now() - timezone.timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        checks = [
+            ('ticket-list (admin)', admin, 'get', '/api/tickets/', SCOPE_TOTAL),
+            ('ticket-list (admin, cursor)', admin, 'get', '/api/tickets/?cursor='),
+            ('ticket-list (admin, delta)', admin, 'get', f'/api/tickets/?updated_since={recent}', SCOPE_TOTAL),
+            ('ticket-list (technician)', technician, 'get', '/api/tickets/'),
+            ('ticket-list (technician, delta)', technician, 'get', f'/api/tickets/?updated_since={recent}'),
+            ('ticket-list (customer)', customer, 'get', '/api/tickets/'),
+            ('ticket-list (customer, cursor)', customer, 'get', '/api/tickets/?cursor=&page_size=5'),
+            ('ticket-list (customer, delta)', customer, 'get', f'/api/tickets/?updated_since={recent}'),
+            ('ticket-list (admin, search)', admin, 'get', '/api/tickets/?q=brake', RANKED_SORT),
+            ('ticket-list (technician, search)', technician, 'get', '/api/tickets/?q=brake', RANKED_SORT),
+            ('ticket-list (customer, search)', customer, 'get', '/api/tickets/?q=brake', RANKED_SORT),
+            ('ticket-list (admin, ticket number search)', admin, 'get', '/api/tickets/?q=%231234', RANKED_SORT),
+            ('ticket-list (admin, customer email search)', admin, 'get', f'/api/tickets/?q={quote(customer.email)}', RANKED_SORT),
+            ('notification-list', customer, 'get', '/api/notifications/'),
+            ('notification-unread-count', customer, 'get', '/api/notifications/unread_count/'),
+            ('notification-mark-all-read', customer, 'post', '/api/notifications/mark_all_as_read/'),
+            ('user-list (by role)', admin, 'get', '/api/users/?role=technician'),
+            ('dashboard-stats', admin, 'get', '/api/dashboard-stats/', WHOLE_TABLE_AGGREGATE),
+        ]
+        if ticket is not None:
+            checks.append(('ticket-detail', customer, 'get', f'/api/tickets/{ticket.pk}/'))
+        return checks
+
+    def check_endpoint(self, label, user, method, path, accepted=(None, None)):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(path)
+        if response.status_code >= 400:
+            return [f'{label}: {method.upper()} {path} returned {response.status_code}']
+
+        failures = []
+        accepted_pattern, reason = accepted
+        accepted_lines = 0
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            plan = self.explain(sql)
+            problems = [line for line in plan if (SQLITE_PROBLEMS if connection.vendor == 'sqlite' else POSTGRES_PROBLEMS).search(line.strip())
+                        and not self.bounded_walk(sql, plan, line)]
+            if accepted_pattern is not None:
+                accepted_lines += sum(1 for line in problems if accepted_pattern.search(line.strip()))
+                problems = [line for line in problems if not accepted_pattern.search(line.strip())]
+            if problems:
+                failures.append(f'{label}: {sql}\n    ' + '\n    '.join(plan))
+        status = self.style.ERROR('FAIL') if failures else self.style.SUCCESS('ok')
+        note = f'; {accepted_lines} expected scan/sort step(s): {reason}' if accepted_lines else ''
+        self.stdout.write(f'  {status}  {label} ({len(context.captured_queries)} queries{note})')
+        return failures
+
+    def bounded_walk(self, sql, plan, line):
+        # An index walked in order under a LIMIT, with no sort to feed, reads
+        # only LIMIT rows; the same walk for an aggregate reads the whole index.
+        return (connection.vendor == 'sqlite' and SQLITE_INDEX_WALK.search(line.strip()) is not None
+                and LIMIT.search(sql) is not None and not any('TEMP B-TREE' in step for step in plan))
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import nullcontext
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tickets.importing import TicketImporter, read_rows
+from tickets.models import ImportCheckpoint
+from tickets.response_cache import invalidate_all
+from tickets.stats import invalidate_dashboard_stats
+
+
+class Command(BaseCommand):
+    help = ('Imports historical tickets, and the customers who raised them, from a CSV or JSON Lines '
+            'file in batches, one transaction each. Progress is checkpointed with every batch, so '
+            'running the command again after a failure resumes where it stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSON Lines file.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction.')
+        parser.add_argument('--checkpoint', help='Name to track progress under (default: the absolute path of the file).')
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved progress and read the file from the start.')
+        parser.add_argument('--errors', help='Append rejected rows, with their errors, to this JSON Lines file.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without keeping anything.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else None)
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        source = options['checkpoint'] or os.path.abspath(path)
+        if len(source) > ImportCheckpoint._meta.get_field('source').max_length:
+            source = hashlib.sha256(source.encode()).hexdigest()
+
+        importer = TicketImporter(batch_size=options['batch_size'])
+        errors = open(options['errors'], 'a') if options['errors'] else None
+        started = time.perf_counter()
+        imported = rejected = 0
+        try:
+            # A dry run nests every batch, and the checkpoint, in one transaction that is rolled back.
+            with open(path, newline='', encoding='utf-8-sig') as handle, transaction.atomic() if options['dry_run'] else nullcontext():
+                checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+                if options['restart']:
+                    checkpoint.position = checkpoint.imported = checkpoint.rejected = 0
+                    checkpoint.save()
+                start = checkpoint.position
+                if start:
+                    self.stdout.write(f'Resuming {source} after row {start} '
+                                      f'({checkpoint.imported} imported, {checkpoint.rejected} rejected so far).')
+                rows = enumerate(read_rows(handle, fmt), start=1)
+                # Rows already committed by an earlier run are read past, not re-imported.
+                for _ in islice(rows, start):
+                    pass
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    count, failures = self.import_batch(importer, checkpoint, batch)
+                    imported += count
+                    rejected += len(failures)
+                    for number, row_errors in failures:
+                        if errors:
+                            errors.write(json.dumps({'row': number, 'errors': row_errors}) + '\n')
+                        if options['verbosity'] > 1:
+                            self.stderr.write(f'  row {number}: {json.dumps(row_errors)}')
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'  rows {batch[0][0]}-{batch[-1][0]}: {count} imported, {len(failures)} rejected')
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        finally:
+            if errors:
+                errors.close()
+            if imported and not options['dry_run']:
+                # bulk_create() sends no post_save, so neither signal receiver ran.
+                invalidate_dashboard_stats()
+                invalidate_all()
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} tickets ({importer.customers_created} new customers), rejected {rejected} rows, '
+            f'in {elapsed:.1f}s ({(imported + rejected) / elapsed if elapsed else 0:,.0f} rows/s).'))
+
+    def import_batch(self, importer, checkpoint, batch):
+        """
+        Imports one batch and advances the checkpoint in the same transaction.
+        """
+        try:
+            with transaction.atomic():
+                count, failures = importer.import_batch(batch)
+                checkpoint.position = batch[-1][0]
+                checkpoint.imported += count
+                checkpoint.rejected += len(failures)
+                checkpoint.save(update_fields=['position', 'imported', 'rejected', 'updated_at'])
+        except Exception as exc:
+            raise CommandError(f'Rows {batch[0][0]}-{batch[-1][0]} failed and were rolled back ({exc}). '
+                               f'Everything before row {batch[0][0]} is committed; run the command again to resume.') from exc
+        return count, failures
@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from tickets.models import Notification, NotificationArchive
+
+ARCHIVED_FIELDS = ('id', 'recipient_id', 'ticket_id', 'message', 'is_read', 'created_at')
+
+
+class Command(BaseCommand):
+    help = ('Applies the notification retention policy: read notifications older than the '
+            'retention period are archived or deleted in small batches, one short transaction '
+            'each, so the command is safe to run while the API is serving traffic.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+                            help='Keep read notifications newer than this many days (default: %(default)s).')
+        parser.add_argument('--mode', choices=['archive', 'delete'], default=settings.NOTIFICATION_RETENTION_MODE,
+                            help='Move expired rows to NotificationArchive, or drop them (default: %(default)s).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be pruned without changing anything.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be positive.')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            total = expired.count()
+            batches = -(-total // options['batch_size'])
+            self.stdout.write(f'Would {options["mode"]} {total} read notifications older than '
+                              f'{cutoff:%Y-%m-%d %H:%M} in {batches} batches of {options["batch_size"]}.')
+            return
+
+        started = time.perf_counter()
+        pruned = batches = 0
+        position = None
+        while options['max_batches'] is None or batches < options['max_batches']:
+            batch_started = time.perf_counter()
+            count, position = self.prune_batch(expired, position, options['batch_size'], options['mode'] == 'archive')
+            if not count:
+                break
+            pruned += count
+            batches += 1
+            elapsed = time.perf_counter() - batch_started
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  batch {batches}: {count} rows in {elapsed * 1000:.0f} ms')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.perf_counter() - started
+        verb = 'Archived' if options['mode'] == 'archive' else 'Deleted'
+        rate = pruned / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(f'{verb} {pruned} notifications in {batches} batches, '
+                                             f'{elapsed:.1f}s ({rate:,.0f} rows/s).'))
+
+    def prune_batch(self, expired, position, batch_size, archive):
+        """
+        Archives or deletes the next `batch_size` expired rows after
+        `position` (keyset on notif_read_age_idx). Returns the row count and
+        the position to continue from.
+        """
+        queryset = expired
+        if position is not None:
+            created_at, last_id = position
+            queryset = queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=last_id)
+        with transaction.atomic():
+            rows = list(queryset.order_by('created_at', 'id').values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return 0, position
+            if archive:
+                NotificationArchive.objects.bulk_create([NotificationArchive(**row) for row in rows], ignore_conflicts=True)
+            Notification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        return len(rows), (rows[-1]['created_at'], rows[-1]['id'])
@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tickets.analytics import rebuild_rollups
+from tickets.models import CLOSED_STATUSES, Ticket, TicketEvent
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the ticket analytics rollups from the ticket table. First fills in closed_at '
+            'on closed tickets that lack it, from the history of when they entered a final status.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tickets given a closed_at per transaction.')
+        parser.add_argument('--skip-closed-at', action='store_true', help='Only rebuild the rollups.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if not options['skip_closed_at']:
+            filled = self.fill_closed_at(options['batch_size'])
+            self.stdout.write(f'Filled in closed_at on {filled} tickets.')
+        read = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the rollups from {read} tickets in {time.perf_counter() - started:.1f}s.'))
+
+    def fill_closed_at(self, batch_size):
+        filled = 0
+        last_id = 0
+        while True:
+            # Keyset over the primary key; filled tickets drop out of the filter.
+            tickets = list(Ticket.objects.filter(pk__gt=last_id, status__in=CLOSED_STATUSES, closed_at__isnull=True)
+                           .order_by('pk').only('pk', 'status', 'updated_at')[:batch_size])
+            if not tickets:
+                return filled
+            last_id = tickets[-1].pk
+            closed_at = {}
+            events = (TicketEvent.objects.filter(ticket_id__in=[ticket.pk for ticket in tickets], changes__has_key='status')
+                      .order_by('id').values_list('ticket_id', 'created_at', 'changes'))
+            for ticket_id, created_at, changes in events:
+                old, new = changes['status']
+                if new in CLOSED_STATUSES and old not in CLOSED_STATUSES:
+                    closed_at[ticket_id] = created_at  # the last time it closed wins
+            for ticket in tickets:
+                # Without a recorded transition, the last update is the best estimate.
+                ticket.closed_at = closed_at.get(ticket.pk, ticket.updated_at)
+            with transaction.atomic():
+                # bulk_update() leaves updated_at alone and sends no signals; the
+                # rollups are rebuilt afterwards anyway.
+                Ticket.objects.bulk_update(tickets, ['closed_at'], batch_size=batch_size)
+            filled += len(tickets)
@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand
+from users.models import CustomUser
+from tickets.models import NotificationCounter
+
+
+class Command(BaseCommand):
+    help = ('Recounts unread notifications per user and rewrites any NotificationCounter '
+            'that has drifted from the notifications table.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only check this user id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users recounted per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        checked = fixed = 0
+        for batch in self.user_batches(options['users'], options['batch_size']):
+            drifted = NotificationCounter.reconcile(batch, dry_run=options['dry_run'])
+            checked += len(batch)
+            fixed += len(drifted)
+            for recipient_id, stored, actual in drifted:
+                self.stdout.write(f'  user #{recipient_id}: counter {"missing" if stored is None else stored}, actual {actual}')
+
+        verb = 'would fix' if options['dry_run'] else 'fixed'
+        style = self.style.WARNING if fixed else self.style.SUCCESS
+        self.stdout.write(style(f'Checked {checked} users, {verb} {fixed} counters in {time.perf_counter() - started:.1f}s.'))
+
+    def user_batches(self, users, batch_size):
+        if users:
+            yield sorted(set(users))
+            return
+        # Keyset over the primary key so every batch is an index range scan.
+        last_id = 0
+        while True:
+            batch = list(CustomUser.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]
@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from tickets.jobs import run_due_jobs, worker_name
+
+
+class Command(BaseCommand):
+    help = ('Runs queued background jobs (see tickets/jobs.py): claims due jobs in batches, runs them, '
+            'and retries failures with backoff. Any number of workers may run at once, on one host or '
+            'several. SIGTERM or Ctrl-C stops a worker after the job it is running.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed at a time (default: %(default)s).')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to run (default: %(default)s).')
+        parser.add_argument('--poll', type=float, default=settings.JOB_POLL_SECONDS,
+                            help='Seconds to wait before looking again when no job is due (default: %(default)s).')
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due, then exit.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['processes'] < 1:
+            raise CommandError('--batch-size and --processes must be positive.')
+        if isinstance(caches['default'], LocMemCache):
+            # The jobs' notifications would only reach open streams through
+            # their catch-up query; see NOTIFICATION_BROKER in settings.py.
+            raise CommandError('run_jobs needs a cache the web processes share (CACHE_BACKEND=file locally, '
+                               'a shared backend in production); without one set JOBS_RUN_INLINE=True instead.')
+        if options['processes'] == 1:
+            self.work(options['batch_size'], options['poll'], options['once'])
+            return
+
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        children = [multiprocessing.Process(target=self.work, args=(options['batch_size'], options['poll'], options['once']))
+                    for _ in range(options['processes'])]
+        for child in children:
+            child.start()
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: each finishes its current job
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
+
+    def work(self, batch_size, poll, once):
+        stopping = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: stopping.set())
+        worker = worker_name()
+        self.stdout.write(f'Worker {worker} started.')
+        succeeded = failed = 0
+        while not stopping.is_set():
+            close_old_connections()
+            done, errors = run_due_jobs(worker, batch_size)
+            succeeded += done
+            failed += errors
+            if done + errors < batch_size:
+                if once:
+                    break
+                stopping.wait(poll)
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} stopped: {succeeded} jobs done, {failed} failed.'))
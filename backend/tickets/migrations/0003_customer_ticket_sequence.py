@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_sequences(apps, schema_editor):
+    Ticket = apps.get_model('tickets', 'Ticket')
+    CustomerTicketSequence = apps.get_model('tickets', 'CustomerTicketSequence')
+    db_alias = schema_editor.connection.alias
+    last_values = Ticket.objects.using(db_alias).values('created_by_id').annotate(last=Max('customer_ticket_id')).order_by()
+    CustomerTicketSequence.objects.using(db_alias).bulk_create(
+        [CustomerTicketSequence(customer_id=row['created_by_id'], last_value=row['last'] or 0) for row in last_values],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0002_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerTicketSequence',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
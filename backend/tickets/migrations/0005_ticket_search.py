@@ -0,0 +1,88 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+
+# The search indexes as they stood when this migration was written, copied
+# rather than imported from tickets/search.py: what an applied migration did
+# must not change when that module does. A change to the indexes there needs
+# a new migration that recreates them.
+POSTGRESQL_INDEXES = [
+    GinIndex(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('license_plate', 'vin', weight='A', config='simple')
+        + SearchVector('vehicle_make', 'vehicle_model', weight='B', config='simple')
+        + SearchVector('description', weight='C', config='english'),
+        name='ticket_search_idx',
+    ),
+    GinIndex(OpClass(Upper(Cast('license_plate', TextField())), name='gin_trgm_ops'), name='ticket_plate_trgm_idx'),
+    GinIndex(OpClass(Upper(Cast('vin', TextField())), name='gin_trgm_ops'), name='ticket_vin_trgm_idx'),
+]
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_ticket_search USING fts5("
+    "title, description, vehicle_make, vehicle_model, license_plate, vin, "
+    "content='tickets_ticket', content_rowid='id', tokenize='trigram')",
+
+    "CREATE TRIGGER IF NOT EXISTS tickets_ticket_search_ai AFTER INSERT ON tickets_ticket BEGIN "
+    "INSERT INTO tickets_ticket_search(rowid, title, description, vehicle_make, vehicle_model, license_plate, vin) "
+    "VALUES (new.id, new.title, new.description, new.vehicle_make, new.vehicle_model, new.license_plate, new.vin); END",
+
+    "CREATE TRIGGER IF NOT EXISTS tickets_ticket_search_ad AFTER DELETE ON tickets_ticket BEGIN "
+    "INSERT INTO tickets_ticket_search(tickets_ticket_search, rowid, title, description, vehicle_make, vehicle_model, license_plate, vin) "
+    "VALUES ('delete', old.id, old.title, old.description, old.vehicle_make, old.vehicle_model, old.license_plate, old.vin); END",
+
+    "CREATE TRIGGER IF NOT EXISTS tickets_ticket_search_au "
+    "AFTER UPDATE OF title, description, vehicle_make, vehicle_model, license_plate, vin ON tickets_ticket BEGIN "
+    "INSERT INTO tickets_ticket_search(tickets_ticket_search, rowid, title, description, vehicle_make, vehicle_model, license_plate, vin) "
+    "VALUES ('delete', old.id, old.title, old.description, old.vehicle_make, old.vehicle_model, old.license_plate, old.vin); "
+    "INSERT INTO tickets_ticket_search(rowid, title, description, vehicle_make, vehicle_model, license_plate, vin) "
+    "VALUES (new.id, new.title, new.description, new.vehicle_make, new.vehicle_model, new.license_plate, new.vin); END",
+
+    # Index the tickets that already exist.
+    "INSERT INTO tickets_ticket_search(tickets_ticket_search) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS tickets_ticket_search_ai',
+    'DROP TRIGGER IF EXISTS tickets_ticket_search_ad',
+    'DROP TRIGGER IF EXISTS tickets_ticket_search_au',
+    'DROP TABLE IF EXISTS tickets_ticket_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Ticket = apps.get_model('tickets', 'Ticket')
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in POSTGRESQL_INDEXES:
+            schema_editor.add_index(Ticket, index)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        Ticket = apps.get_model('tickets', 'Ticket')
+        for index in POSTGRESQL_INDEXES:
+            schema_editor.remove_index(Ticket, index)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # The search indexes are backend-specific (GIN/pg_trgm or an FTS5 table
+    # with triggers), so they live outside Ticket.Meta.indexes.
+
+    dependencies = [
+        ('tickets', '0004_ticket_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
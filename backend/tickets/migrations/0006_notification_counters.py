@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('tickets', 'Notification')
+    NotificationCounter = apps.get_model('tickets', 'NotificationCounter')
+    db_alias = schema_editor.connection.alias
+    unread = Notification.objects.using(db_alias).filter(is_read=False).values('recipient_id').annotate(unread=Count('id')).order_by()
+    NotificationCounter.objects.using(db_alias).bulk_create(
+        [NotificationCounter(recipient_id=row['recipient_id'], unread=row['unread']) for row in unread],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticket_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('recipient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticket_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='Critical', then=models.Value(0)), models.When(priority='Urgent', then=models.Value(1)), models.When(priority='Standard', then=models.Value(2)), models.When(priority='Routine', then=models.Value(3)), default=models.Value(4)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', True), ('status', 'Open')), fields=['priority_rank', 'created_at', 'id'], name='ticket_work_queue_idx'),
+        ),
+    ]
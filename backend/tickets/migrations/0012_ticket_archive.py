@@ -0,0 +1,70 @@
+# Generated by Django 5.1.2 on 2026-10-18 21:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0011_background_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('Open', 'Open'), ('Scheduled', 'Scheduled'), ('In Progress', 'In Progress'), ('Awaiting Parts', 'Awaiting Parts'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=20)),
+                ('priority', models.CharField(choices=[('Routine', 'Routine'), ('Standard', 'Standard'), ('Urgent', 'Urgent'), ('Critical', 'Critical')], max_length=20)),
+                ('category', models.CharField(choices=[('Engine', 'Engine Services'), ('Brakes', 'Brake Services'), ('Tires', 'Tire Services'), ('Suspension', 'Suspension & Steering'), ('Electrical', 'Electrical System'), ('Maintenance', 'Routine Maintenance'), ('Diagnostics', 'Diagnostics'), ('Bodywork', 'Bodywork/Cosmetic'), ('Other', 'Other Service')], max_length=50)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('vehicle_make', models.CharField(blank=True, max_length=50, null=True)),
+                ('vehicle_model', models.CharField(blank=True, max_length=50, null=True)),
+                ('vehicle_year', models.IntegerField(blank=True, null=True)),
+                ('license_plate', models.CharField(blank=True, max_length=20, null=True)),
+                ('vin', models.CharField(blank=True, max_length=17, null=True)),
+                ('customer_ticket_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(('status__in', ['Completed', 'Cancelled'])), fields=['closed_at', 'id'], name='ticket_closed_idx'),
+        ),
+        migrations.AddField(
+            model_name='ticketarchive',
+            name='assigned_to',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='ticketarchive',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='ticketarchive',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='ticket_archive_creator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketarchive',
+            index=models.Index(fields=['assigned_to', '-created_at', '-id'], name='ticket_archive_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketarchive',
+            index=models.Index(fields=['-created_at', '-id'], name='ticket_archive_recent_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ticketarchive',
+            unique_together={('created_by', 'customer_ticket_id')},
+        ),
+    ]
@@ -1,7 +1,19 @@
-from django.db import models
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router, transaction
+from django.db.models import Case, Count, F, Max, Value, When
+from django.db.models.functions import Greatest
 from django.conf import settings
+from django.utils import timezone
+
+# Statuses a ticket can still move out of; Completed and Cancelled are final.
+ACTIVE_STATUSES = ['Open', 'Scheduled', 'In Progress', 'Awaiting Parts']
+CLOSED_STATUSES = ['Completed', 'Cancelled']
 
 class Ticket(models.Model):
+    ACTIVE_STATUSES = ACTIVE_STATUSES
+    CLOSED_STATUSES = CLOSED_STATUSES
     STATUS_CHOICES = [('Open', 'Open'), ('Scheduled', 'Scheduled'), ('In Progress', 'In Progress'), ('Awaiting Parts', 'Awaiting Parts'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')]
     PRIORITY_CHOICES = [('Routine', 'Routine'), ('Standard', 'Standard'), ('Urgent', 'Urgent'), ('Critical', 'Critical')]
     CATEGORY_CHOICES = [('Engine', 'Engine Services'), ('Brakes', 'Brake Services'), ('Tires', 'Tire Services'), ('Suspension', 'Suspension & Steering'), ('Electrical', 'Electrical System'), ('Maintenance', 'Routine Maintenance'), ('Diagnostics', 'Diagnostics'), ('Bodywork', 'Bodywork/Cosmetic'), ('Other', 'Other Service')]
@@ -11,8 +23,9 @@ class Ticket(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Open')
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='Standard')
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='Maintenance')
-    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tickets')
-    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='assigned_tickets', blank=True, null=True, limit_choices_to={'user_role__in': ['technician', 'admin']})
+    # Both foreign keys are served by the composite indexes in Meta, so they skip the default single-column index.
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tickets', db_index=False)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='assigned_tickets', blank=True, null=True, limit_choices_to={'user_role__in': ['technician', 'admin']}, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     closed_at = models.DateTimeField(blank=True, null=True)
@@ -25,18 +38,211 @@ class Ticket(models.Model):
     # --- THIS FIELD WAS MISSING ---
     customer_ticket_id = models.PositiveIntegerField(blank=True, null=True)
 
+    # Sorts priorities most urgent first (Critical = 0), for the work queue's index.
+    PRIORITY_RANKS = {'Critical': 0, 'Urgent': 1, 'Standard': 2, 'Routine': 3}
+    priority_rank = models.GeneratedField(
+        expression=Case(*(When(priority=value, then=Value(rank)) for value, rank in PRIORITY_RANKS.items()), default=Value(len(PRIORITY_RANKS))),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+
+    # Fields whose changes save() diffs and TicketEvent records.
+    TRACKED_FIELDS = ('title', 'description', 'status', 'priority', 'category', 'assigned_to', 'closed_at',
+                      'vehicle_make', 'vehicle_model', 'vehicle_year', 'license_plate', 'vin')
+
     def __str__(self):
         return f"Ticket #{self.id}: {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Snapshot what was loaded so save() can diff without reading the row again.
+        instance._loaded_state = instance.tracked_state()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_state = self.tracked_state()
+
+    def tracked_state(self):
+        state = {}
+        for name in self.TRACKED_FIELDS:
+            attname = self._meta.get_field(name).attname
+            if attname in self.__dict__:  # skip deferred fields rather than loading them
+                state[name] = self.__dict__[attname]
+        return state
+
+    def get_changes(self):
+        """
+        Returns {field: [old, new]} for tracked fields that differ from the
+        loaded snapshot, or every non-empty tracked field for a new ticket.
+        """
+        before = getattr(self, '_loaded_state', None)
+        after = self.tracked_state()
+        if before is None:
+            return {name: [None, value] for name, value in after.items() if value not in (None, '')}
+        return {name: [before[name], value] for name, value in after.items() if name in before and before[name] != value}
+
+    def sync_closed_at(self, now=None):
+        """
+        Stamps closed_at when the ticket moves into a final status and clears
+        it when the ticket is reopened. A new ticket keeps a closed_at it was
+        given (e.g. an imported one); tickets closed before closed_at was
+        maintained get theirs from `manage.py rebuild_ticket_rollups`.
+        """
+        if 'status' not in self.__dict__:
+            return
+        if self.status not in CLOSED_STATUSES:
+            self.closed_at = None
+            return
+        before = getattr(self, '_loaded_state', None)
+        if before is None:
+            if self.closed_at is None:
+                self.closed_at = now or timezone.now()
+        elif before.get('status', self.status) not in CLOSED_STATUSES:
+            self.closed_at = now or timezone.now()
+
     def save(self, *args, **kwargs):
+        self.sync_closed_at()
+        # What this save changes, for TicketEvent.record(), notifications and
+        # the post_save receivers (set first, since post_save fires inside save).
+        self.last_changes = self.get_changes()
         if not self.pk and not self.customer_ticket_id:
-            customer_tickets_count = Ticket.objects.filter(created_by=self.created_by).count()
-            self.customer_ticket_id = customer_tickets_count + 1
-        super().save(*args, **kwargs)
+            # The sequence row stays locked until the insert commits, so a failed
+            # insert hands its number back instead of leaving a gap.
+            with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Ticket)):
+                self.customer_ticket_id = CustomerTicketSequence.allocate(self.created_by_id, using=kwargs.get('using'))
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_state = self.tracked_state()
+
+    @classmethod
+    def bulk_save(cls, tickets, fields, using=None):
+        """
+        save() for many loaded tickets at once: one bulk_update for `fields`
+        plus updated_at (and closed_at with status), leaving last_changes set
+        on each ticket. Like any bulk write it sends no post_save signals.
+        """
+        now = timezone.now()
+        if 'status' in fields and 'closed_at' not in fields:
+            fields = [*fields, 'closed_at']
+        for ticket in tickets:
+            if 'status' in fields:
+                ticket.sync_closed_at(now)
+            ticket.last_changes = ticket.get_changes()
+            ticket.updated_at = now
+        cls.objects.using(using).bulk_update(tickets, [*fields, 'updated_at'], batch_size=500)
+        for ticket in tickets:
+            ticket._loaded_state = ticket.tracked_state()
 
     class Meta:
         ordering = ['-created_at']
         unique_together = ('created_by', 'customer_ticket_id')
+        indexes = [
+            # Ticket lists per role, newest first (also the keyset pagination order).
+            models.Index(fields=['created_by', '-created_at', '-id'], name='ticket_creator_recent_idx'),
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='ticket_assignee_recent_idx'),
+            models.Index(fields=['-created_at', '-id'], name='ticket_recent_idx'),
+            # Delta sync (?updated_since=) per role.
+            models.Index(fields=['created_by', 'updated_at', 'id'], name='ticket_creator_updated_idx'),
+            models.Index(fields=['assigned_to', 'updated_at', 'id'], name='ticket_assignee_updated_idx'),
+            models.Index(fields=['updated_at', 'id'], name='ticket_updated_idx'),
+            # Status filters and counts only ever target the small, active part of the table.
+            models.Index(fields=['status', '-created_at'], name='ticket_active_status_idx', condition=models.Q(status__in=ACTIVE_STATUSES)),
+            # The technicians' work queue (tickets/work_queue.py), read in exactly this order.
+            models.Index(fields=['priority_rank', 'created_at', 'id'], name='ticket_work_queue_idx',
+                         condition=models.Q(status='Open', assigned_to__isnull=True)),
+            # Archiving (tickets/archive.py) walks closed tickets oldest closed first.
+            models.Index(fields=['closed_at', 'id'], name='ticket_closed_idx', condition=models.Q(status__in=CLOSED_STATUSES)),
+        ]
+
+class CustomerTicketSequence(models.Model):
+    """
+    The last customer_ticket_id handed out to each customer.
+
+    Allocation is a single UPDATE ... RETURNING on the customer's row, which
+    costs the same however many tickets they have and serialises concurrent
+    creates for that customer on the row lock (a database write lock on
+    SQLite) instead of racing on unique_together.
+    """
+    customer = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Ticket sequence for user #{self.customer_id}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, customer_id, count=1, using=None):
+        """
+        Reserves `count` consecutive numbers for the customer and returns the
+        first one. Call inside a transaction to hold the row until commit.
+        """
+        using = using or router.db_for_write(cls)
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {qn(cls._meta.db_table)} SET {qn('last_value')} = {qn('last_value')} + %s "
+                f"WHERE {qn('customer_id')} = %s RETURNING {qn('last_value')}",
+                [count, customer_id],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            return row[0] - count + 1
+
+        # First ticket since the sequence was introduced: start after any
+        # number the customer already holds. A concurrent creator may win the
+        # insert; ignore_conflicts lets both fall through to the UPDATE.
+        start = Ticket.objects.using(using).filter(created_by_id=customer_id).aggregate(last=Max('customer_ticket_id'))['last'] or 0
+        cls.objects.using(using).bulk_create([cls(customer_id=customer_id, last_value=start)], ignore_conflicts=True)
+        return cls.allocate(customer_id, count, using=using)
+
+class TicketEvent(models.Model):
+    """
+    Append-only history of ticket changes: one row per create or update with
+    the field-level diff. Rows deliberately outlive the ticket (no database
+    constraint, nothing cascades) so the audit trail survives deletion.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    KIND_CHOICES = [(CREATED, 'Created'), (UPDATED, 'Updated')]
+
+    ticket = models.ForeignKey(Ticket, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='events')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=UPDATED)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ticket #{self.ticket_id}: {', '.join(self.changes)}"
+
+    @classmethod
+    def record(cls, ticket, actor=None, kind=UPDATED):
+        """
+        Writes the changes of the ticket's last save(). Call it in the same
+        transaction as that save; returns None when nothing changed.
+        """
+        changes = getattr(ticket, 'last_changes', None)
+        if not changes:
+            return None
+        return cls.objects.create(ticket=ticket, actor=actor, kind=kind, changes=changes)
+
+    @classmethod
+    def record_many(cls, tickets, actor=None, kind=UPDATED):
+        """
+        record() for a batch of saved tickets, written with one bulk_create.
+        """
+        events = [cls(ticket=ticket, actor=actor, kind=kind, changes=ticket.last_changes)
+                  for ticket in tickets if getattr(ticket, 'last_changes', None)]
+        return cls.objects.bulk_create(events, batch_size=500)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Incremental reads of one ticket's history (?after=<event id>).
+            models.Index(fields=['ticket', 'id'], name='ticket_event_ticket_idx'),
+        ]
 
 class Notification(models.Model):
     # --- ALL OF THESE FIELDS WERE MISSING ---
@@ -61,4 +267,281 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recipient_recent_idx'),
+            models.Index(fields=['recipient', '-created_at'], name='notif_unread_idx', condition=models.Q(is_read=False)),
+            # Retention sweeps walk read notifications oldest first (prune_notifications).
+            models.Index(fields=['created_at', 'id'], name='notif_read_age_idx', condition=models.Q(is_read=True)),
+        ]
+
+class TicketArchive(models.Model):
+    """
+    Closed tickets moved out of the live table by archive_tickets (see
+    tickets/archive.py), with their original ids and timestamps. The
+    columns are Ticket's; archived tickets are never written again.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    status = models.CharField(max_length=20, choices=Ticket.STATUS_CHOICES)
+    priority = models.CharField(max_length=20, choices=Ticket.PRIORITY_CHOICES)
+    category = models.CharField(max_length=50, choices=Ticket.CATEGORY_CHOICES)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='+', blank=True, null=True, db_index=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    closed_at = models.DateTimeField(blank=True, null=True)
+    vehicle_make = models.CharField(max_length=50, blank=True, null=True)
+    vehicle_model = models.CharField(max_length=50, blank=True, null=True)
+    vehicle_year = models.IntegerField(blank=True, null=True)
+    license_plate = models.CharField(max_length=20, blank=True, null=True)
+    vin = models.CharField(max_length=17, blank=True, null=True)
+    customer_ticket_id = models.PositiveIntegerField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived ticket #{self.id}: {self.title}"
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ('created_by', 'customer_ticket_id')
+        indexes = [
+            # The same list access paths as Ticket, for ?include_archived=1.
+            models.Index(fields=['created_by', '-created_at', '-id'], name='ticket_archive_creator_idx'),
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='ticket_archive_assignee_idx'),
+            models.Index(fields=['-created_at', '-id'], name='ticket_archive_recent_idx'),
+        ]
+
+class NotificationArchive(models.Model):
+    """
+    Read notifications moved out of the live table by prune_notifications.
+    Rows keep their original id; ticket_id is a plain column so archived
+    notifications outlive their tickets.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False)
+    ticket_id = models.BigIntegerField(blank=True, null=True)
+    message = models.CharField(max_length=255)
+    is_read = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived notification #{self.id} for user #{self.recipient_id}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_archive_recipient_idx'),
+        ]
+
+class NotificationCounter(models.Model):
+    """
+    Denormalised count of a user's unread notifications, so the navbar badge
+    is a primary-key lookup instead of a scan of their history. Maintained by
+    create_notifications(), MarkAllAsReadView and notification deletes;
+    `manage.py repair_notification_counters` reconciles any drift.
+    """
+    recipient = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Unread notifications for user #{self.recipient_id}: {self.unread}"
+
+    @classmethod
+    def add(cls, deltas, using=None):
+        """
+        Applies {recipient_id: delta} to the counters, creating missing rows.
+        Call in the transaction that created or changed the notifications.
+        """
+        deltas = {recipient_id: delta for recipient_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        counters = cls.objects.using(using or router.db_for_write(cls))
+        # In recipient order, so concurrent writers lock shared rows in the same order.
+        deltas = sorted(deltas.items())
+        # Only increments need a row; a decrement without one has nothing to correct
+        # (and its recipient may be in the middle of being deleted).
+        counters.bulk_create([cls(recipient_id=recipient_id) for recipient_id, delta in deltas if delta > 0], ignore_conflicts=True)
+        for recipient_id, delta in deltas:
+            counters.filter(recipient_id=recipient_id).update(unread=Greatest(F('unread') + delta, 0))
+
+    @classmethod
+    def reconcile(cls, recipient_ids, dry_run=False, using=None):
+        """
+        Recounts the unread notifications of the given recipients and rewrites
+        the counters that drifted. Returns (recipient_id, stored, actual) for
+        each of them; `stored` is None where the counter row was missing.
+        """
+        using = using or router.db_for_write(cls)
+        with transaction.atomic(using=using):
+            # Lock first, then count: a concurrent create_notifications() either
+            # committed before the count or waits and applies its delta after.
+            stored = dict(cls.objects.using(using).select_for_update().filter(recipient_id__in=recipient_ids).values_list('recipient_id', 'unread'))
+            actual = dict(Notification.objects.using(using).filter(recipient_id__in=recipient_ids, is_read=False)
+                          .order_by().values('recipient_id').annotate(unread=Count('id')).values_list('recipient_id', 'unread'))
+            drifted = [(recipient_id, stored.get(recipient_id), actual.get(recipient_id, 0))
+                       for recipient_id in recipient_ids if stored.get(recipient_id, 0) != actual.get(recipient_id, 0)]
+            if drifted and not dry_run:
+                cls.objects.using(using).bulk_create(
+                    [cls(recipient_id=recipient_id, unread=unread) for recipient_id, old, unread in drifted if old is None])
+                cls.objects.using(using).bulk_update(
+                    [cls(recipient_id=recipient_id, unread=unread) for recipient_id, old, unread in drifted if old is not None], ['unread'])
+        return drifted
+
+class ImportCheckpoint(models.Model):
+    """
+    How far `manage.py import_tickets` got through one source. It advances
+    in the same transaction as each imported batch, so a rerun after a
+    failure resumes right after the last committed row.
+    """
+    source = models.CharField(max_length=255, unique=True)
+    position = models.PositiveBigIntegerField(default=0)  # input rows consumed, imported or rejected
+    imported = models.PositiveBigIntegerField(default=0)
+    rejected = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import of {self.source}: {self.position} rows read"
+
+# --- Analytics rollups ---
+class Rollup(models.Model):
+    """
+    A table of counters keyed by DIMENSIONS, kept up to date with add() by
+    the writes that change what they count (see tickets/analytics.py).
+    """
+    DIMENSIONS = ()
+    # Up to this many keys are updated one UPDATE each; more take one bulk_update.
+    SMALL_BATCH = 4
+
+    @classmethod
+    def add(cls, deltas, using=None):
+        """
+        Applies {dimension values: {counter: delta}} to the rows, creating
+        missing ones. Call in the transaction of the write being counted.
+        """
+        deltas = {key: {name: delta for name, delta in changes.items() if delta} for key, changes in deltas.items()}
+        # In key order, so that writers touching the same hot rows (a bulk
+        # update and a single status change, say) lock them in the same order
+        # instead of deadlocking.
+        deltas = dict(sorted(((key, changes) for key, changes in deltas.items() if changes), key=lambda item: item[0]))
+        if not deltas:
+            return
+        rows = cls.objects.using(using or router.db_for_write(cls))
+        if len(deltas) <= cls.SMALL_BATCH:
+            for key, changes in deltas.items():
+                update = {name: F(name) + delta for name, delta in changes.items()}
+                if not rows.filter(**dict(zip(cls.DIMENSIONS, key))).update(**update):
+                    # First count for this key. A concurrent writer may win the
+                    # insert; ignore_conflicts lets both fall through to the UPDATE.
+                    rows.bulk_create([cls(**dict(zip(cls.DIMENSIONS, key)))], ignore_conflicts=True)
+                    rows.filter(**dict(zip(cls.DIMENSIONS, key))).update(**update)
+            return
+        rows.bulk_create([cls(**dict(zip(cls.DIMENSIONS, key))) for key in deltas], batch_size=500, ignore_conflicts=True)
+        lead = cls.DIMENSIONS[0]
+        changed = {}
+        for pk, *key in rows.filter(**{f'{lead}__in': {key[0] for key in deltas}}).values_list('pk', *cls.DIMENSIONS):
+            if tuple(key) in deltas:
+                changed[pk] = deltas[tuple(key)]
+        counters = {name for changes in changed.values() for name in changes}
+        pks = sorted(changed)
+        for start in range(0, len(pks), 500):
+            batch = pks[start:start + 500]
+            update = {}
+            for name in counters:
+                # One WHEN per distinct increment, which is usually just +1 or -1.
+                by_delta = defaultdict(list)
+                for pk in batch:
+                    by_delta[changed[pk].get(name, 0)].append(pk)
+                update[name] = F(name) + Case(*(When(pk__in=ids, then=Value(delta)) for delta, ids in by_delta.items() if delta),
+                                              default=Value(0), output_field=cls._meta.get_field(name))
+            rows.filter(pk__in=batch).update(**update)
+
+    class Meta:
+        abstract = True
+
+class TicketDailyRollup(Rollup):
+    """
+    Tickets opened and closed per day, category and priority, with the total
+    time the closed ones took from creation to closing.
+    """
+    DIMENSIONS = ('day', 'category', 'priority')
+    day = models.DateField()
+    category = models.CharField(max_length=50)
+    priority = models.CharField(max_length=20)
+    opened = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+    close_seconds = models.BigIntegerField(default=0)
 
+    def __str__(self):
+        return f"{self.day} {self.category}/{self.priority}: {self.opened} opened, {self.closed} closed"
+
+    class Meta:
+        unique_together = ('day', 'category', 'priority')
+
+class TicketCloseTimeRollup(Rollup):
+    """
+    Tickets closed per day, category and priority, counted in logarithmic
+    buckets of time to close so that medians can be estimated.
+    """
+    DIMENSIONS = ('day', 'category', 'priority', 'bucket')
+    day = models.DateField()
+    category = models.CharField(max_length=50)
+    priority = models.CharField(max_length=20)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.category}/{self.priority} bucket {self.bucket}: {self.count}"
+
+    class Meta:
+        unique_together = ('day', 'category', 'priority', 'bucket')
+
+class TicketBacklogRollup(Rollup):
+    """
+    Active tickets right now per status, category and priority.
+    """
+    DIMENSIONS = ('status', 'category', 'priority')
+    status = models.CharField(max_length=20)
+    category = models.CharField(max_length=50)
+    priority = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status} {self.category}/{self.priority}: {self.count}"
+
+    class Meta:
+        unique_together = ('status', 'category', 'priority')
+
+# --- Background jobs ---
+class Job(models.Model):
+    """
+    A unit of deferred work: the function at `task` (a dotted path) called
+    with `payload` as keyword arguments. Jobs are queued by tickets.jobs.enqueue()
+    and run by `manage.py run_jobs`; a job row is deleted once it succeeds.
+
+    A claimed job stays queued with run_at pushed out by the lease, so one
+    whose worker died is simply due again when the lease runs out.
+    """
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (FAILED, 'Failed')]
+
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Job #{self.pk}: {self.task} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # Workers claim due jobs oldest first; failed jobs stay out of the index.
+            models.Index(fields=['run_at', 'id'], name='job_due_idx', condition=models.Q(status='queued')),
+        ]
@@ -0,0 +1,57 @@
+from collections import Counter
+from django.db import transaction
+from .broker import publish_notifications
+from .jobs import enqueue
+from .models import Notification, NotificationCounter
+
+
+def notifications_for_changes(ticket, changes, actor=None):
+    """
+    Derives the notifications a ticket's field-level diff fans out to. Nobody
+    is notified about a change they made themselves.
+    """
+    actor_id = actor.pk if actor is not None else None
+    notifications = []
+    if 'status' in changes and ticket.created_by_id != actor_id:
+        message = f"The status of your ticket '#{ticket.id}: {ticket.title}' was updated to '{ticket.status}'."
+        notifications.append(Notification(recipient_id=ticket.created_by_id, ticket=ticket, message=message))
+    if 'assigned_to' in changes:
+        assignee_id = changes['assigned_to'][1]
+        if assignee_id is not None and assignee_id != actor_id:
+            message = f"You have been assigned a new ticket: '#{ticket.id}: {ticket.title}'."
+            notifications.append(Notification(recipient_id=assignee_id, ticket=ticket, message=message))
+    return notifications
+
+
+def create_notifications(notifications):
+    """
+    Inserts notifications with a single bulk_create, bumps the recipients'
+    unread counters and pushes the notifications to their open streams.
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications)
+        NotificationCounter.add(Counter(n.recipient_id for n in created if not n.is_read))
+        publish_notifications(created)
+    return created
+
+
+def deliver_notifications(notifications):
+    """
+    The background job behind notify_after_commit(): creates notifications
+    given as dicts of recipient_id, ticket_id and message.
+    """
+    create_notifications([Notification(**fields) for fields in notifications])
+
+
+def notify_after_commit(notifications):
+    """
+    Queues the notifications to be created by a background job (see
+    tickets/jobs.py) once the current transaction commits, so a rolled-back
+    change never notifies anyone and the request does not wait on the
+    fan-out. Call it inside the transaction that makes the change.
+    """
+    if notifications:
+        enqueue('tickets.notifications.deliver_notifications', {'notifications': [
+            {'recipient_id': n.recipient_id, 'ticket_id': n.ticket_id, 'message': n.message} for n in notifications]})
@@ -0,0 +1,117 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering columns instead of using
+    OFFSET, so every page costs the same index range scan however deep it is.
+
+    Unlike DRF's CursorPagination (position + offset on the first ordering
+    field) the cursor carries a value for every field in `ordering`, and the
+    ordering must end in a unique column. `?count=1` opts into the total.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.total = queryset.count() if self.count_requested(request) else None
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, forwards=not reverse))
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self.position_of(rows[-1]) if rows and has_next else None
+        self.previous_position = self.position_of(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_link(self.next_position, reverse=False),
+            'previous': self.get_link(self.previous_position, reverse=True),
+            'results': data,
+        }
+        if self.total is not None:
+            payload = {'count': self.total, **payload}
+        return Response(payload)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def count_requested(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def seek_filter(self, position, forwards):
+        """
+        Rows strictly after `position` in traversal order, expanded as
+        (a < x) OR (a = x AND b < y) ... The leading bound on the first field
+        is repeated outside the OR so the planner can turn it into an index
+        range condition.
+        """
+        names = [field.lstrip('-') for field in self.ordering]
+        lookups = ['lt' if field.startswith('-') == forwards else 'gt' for field in self.ordering]
+        seek = Q()
+        for index, name in enumerate(names):
+            equal = {names[prior]: position[prior] for prior in range(index)}
+            seek |= Q(**equal, **{f'{name}__{lookups[index]}': position[index]})
+        return Q(**{f'{names[0]}__{lookups[0]}e': position[0]}) & seek
+
+    def position_of(self, row):
+        names = [field.lstrip('-') for field in self.ordering]
+        values = [row[name] if isinstance(row, dict) else getattr(row, name) for name in names]
+        return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            position, reverse = payload['p'], bool(payload['r'])
+            if len(position) != len(self.ordering):
+                raise ValueError
+            fields = [model._meta.get_field(field.lstrip('-')) for field in self.ordering]
+            position = [field.to_python(value) for field, value in zip(fields, position)]
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
@@ -0,0 +1,130 @@
+"""
+Versioned cache of ticket API payloads.
+
+List payloads are stored under the caller's list version, detail payloads
+under the ticket's version. A ticket write bumps every version it affects
+once its transaction commits: the creator's list, the old and new
+assignee's lists, the list all admins share and the ticket's own. Later
+reads miss and refill, and entries under retired versions simply expire.
+User changes bump one global version, since names and emails appear in
+every payload. The versions live in the cache too, so the scheme works
+unchanged on a shared backend; a lost version key just starts a new one.
+
+Hits and misses are counted per process; see cache_metrics().
+"""
+import hashlib
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from service_bay_api.db_routing import cache_timeout
+
+GLOBAL_VERSION = 'all'
+
+
+# --- Versions ---
+def _version_key(name):
+    return f'tickets:v:{name}'
+
+
+def get_versions(*names):
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if found.get(key) is None:
+            # add() so that concurrent first readers settle on the same version.
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key) or uuid.uuid4().hex
+    return [found[key] for key in keys]
+
+
+def bump_versions(names, using=None):
+    """
+    Retires the given versions when the current transaction commits (at
+    once outside one), so a reader racing the write cannot cache the old
+    rows under a new version.
+    """
+    names = set(names)
+    if not names:
+        return
+
+    def bump():
+        cache.set_many({_version_key(name): uuid.uuid4().hex for name in names}, None)
+        _count('invalidations', len(names))
+
+    transaction.on_commit(bump, using=using)
+
+
+def list_scope(user):
+    # Every admin sees the same list, so they share one version and one entry per URL.
+    return 'admins' if user.user_role == 'admin' else f'user-{user.pk}'
+
+
+def ticket_versions(ticket):
+    """
+    The versions a write to `ticket` makes stale.
+    """
+    old_assignee = getattr(ticket, 'last_changes', {}).get('assigned_to', [None])[0]
+    users = {ticket.created_by_id, ticket.assigned_to_id, old_assignee} - {None}
+    return {f'ticket-{ticket.pk}', 'list:admins', *(f'list:user-{user_id}' for user_id in users)}
+
+
+def invalidate_tickets(tickets, using=None):
+    bump_versions({name for ticket in tickets for name in ticket_versions(ticket)}, using=using)
+
+
+def invalidate_all(using=None):
+    bump_versions({GLOBAL_VERSION}, using=using)
+
+
+# --- Entries ---
+def list_version(user):
+    """
+    The versions a write to any ticket in `user`'s list retires, as one string.
+    """
+    return ':'.join(get_versions(GLOBAL_VERSION, f'list:{list_scope(user)}'))
+
+
+def list_cache_key(user, url):
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f'tickets:list:{list_scope(user)}:{user.user_role}:{list_version(user)}:{digest}'
+
+
+def detail_cache_key(ticket_id):
+    everything, ticket = get_versions(GLOBAL_VERSION, f'ticket-{ticket_id}')
+    return f'tickets:detail:{ticket_id}:{everything}:{ticket}'
+
+
+def get_entry(kind, key):
+    entry = cache.get(key)
+    _count(f'{kind}_hits' if entry is not None else f'{kind}_misses')
+    return entry
+
+
+def set_entry(key, entry):
+    cache.set(key, entry, cache_timeout(getattr(settings, 'TICKET_CACHE_SECONDS', 300)))
+
+
+# --- Metrics ---
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def cache_metrics():
+    """
+    This process's hit and miss counts per payload kind, with hit ratios.
+    """
+    with _metrics_lock:
+        counts = dict(_metrics)
+    metrics = {'invalidations': counts.get('invalidations', 0)}
+    for kind in ('list', 'detail'):
+        hits, misses = counts.get(f'{kind}_hits', 0), counts.get(f'{kind}_misses', 0)
+        metrics[kind] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None}
+    return metrics
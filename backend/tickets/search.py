@@ -0,0 +1,155 @@
+"""
+Ranked full-text search over tickets (?q= on the ticket list).
+
+PostgreSQL uses a GIN expression index over a weighted tsvector of the text
+fields, plus pg_trgm GIN indexes so partial licence plates and VINs match
+by substring. SQLite uses an external-content FTS5 table with the trigram
+tokenizer, kept in step with tickets_ticket by triggers. Either way the
+database maintains the index on every write, bulk ones included.
+
+A query that names tickets outright, a ticket number ('123' or '#123') or a
+customer's email address, also matches those tickets exactly, ranked above
+the text matches.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, TextField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, Greatest, Upper
+from service_bay_api.sqlite_fts import fts5_expression, install_fts5_index, uninstall_fts5_index
+
+SEARCH_CONFIG = 'english'
+MIN_TERM_LENGTH = 3  # the trigram indexes cannot serve shorter substrings
+
+SQLITE_TABLE = 'tickets_ticket_search'
+SQLITE_COLUMNS = ('title', 'description', 'vehicle_make', 'vehicle_model', 'license_plate', 'vin')
+SQLITE_WEIGHTS = (10.0, 2.0, 1.0, 1.0, 5.0, 5.0)
+# Up to 18 digits, so the id always fits a 64-bit integer column.
+TICKET_NUMBER = re.compile(r'#?(\d{1,18})')
+
+
+# --- PostgreSQL ---
+def search_vector():
+    """
+    The weighted document searched on PostgreSQL. ticket_search_idx is built
+    from this exact expression, so changing it needs a migration that
+    recreates the index.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('license_plate', 'vin', weight='A', config='simple')
+        + SearchVector('vehicle_make', 'vehicle_model', weight='B', config='simple')
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def _trigram_operand(field):
+    # Matches the left-hand side Django compiles for field__icontains.
+    return Upper(Cast(field, TextField()))
+
+
+def postgresql_indexes():
+    return [
+        GinIndex(search_vector(), name='ticket_search_idx'),
+        GinIndex(OpClass(_trigram_operand('license_plate'), name='gin_trgm_ops'), name='ticket_plate_trgm_idx'),
+        GinIndex(OpClass(_trigram_operand('vin'), name='gin_trgm_ops'), name='ticket_vin_trgm_idx'),
+    ]
+
+
+def _search_postgresql(queryset, query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    match = Q(search_document=search_query)
+    rank = SearchRank(F('search_document'), search_query)
+    if len(query) >= MIN_TERM_LENGTH:
+        match |= Q(license_plate__icontains=query) | Q(vin__icontains=query)
+        rank = rank + Coalesce(Greatest(TrigramSimilarity('license_plate', query), TrigramSimilarity('vin', query)), Value(0.0))
+    return queryset.annotate(search_document=search_vector()).filter(match).annotate(search_rank=rank)
+
+
+# --- SQLite ---
+def install_sqlite_index(connection):
+    install_fts5_index(connection, SQLITE_TABLE, 'tickets_ticket', SQLITE_COLUMNS)
+
+
+def uninstall_sqlite_index(connection):
+    uninstall_fts5_index(connection, SQLITE_TABLE)
+
+
+def _search_sqlite(queryset, query):
+    expression = fts5_expression(query, MIN_TERM_LENGTH)
+    if not expression:
+        return queryset.annotate(search_rank=Value(0.0)).none()
+    table = queryset.model._meta.db_table
+    weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+    # Joined rather than ranked by a correlated subquery: the join runs the
+    # MATCH once, where the subquery re-ran it for every matching ticket.
+    # bm25() is lower-is-better; negate it so every backend sorts rank descending.
+    return queryset.extra(
+        tables=[SQLITE_TABLE],
+        where=[f'{SQLITE_TABLE}.rowid = "{table}"."id"', f'{SQLITE_TABLE} MATCH %s'],
+        params=[expression],
+        select={'search_rank': f'-bm25({SQLITE_TABLE}, {weights})'},
+    )
+
+
+def _sqlite_matches(query):
+    expression = fts5_expression(query, MIN_TERM_LENGTH)
+    if not expression:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', (expression,)))
+
+
+# --- Entry point ---
+def _text_matches(queryset, query, vendor):
+    # The unranked text matches, as a filter that can be OR'ed with others.
+    if vendor == 'sqlite':
+        return _sqlite_matches(query)
+    return Q(pk__in=_search_postgresql(queryset.model._base_manager.using(queryset.db), query).values('pk'))
+
+
+def _exact_match(queryset, query):
+    """
+    The tickets `query` names outright: a ticket number, or the email
+    address of the customer who opened them. None for any other query.
+    """
+    number = TICKET_NUMBER.fullmatch(query)
+    if number:
+        return Q(pk=int(number.group(1)))
+    if '@' in query:
+        # A subquery rather than a join, so both sides of the OR can use an index.
+        customers = get_user_model()._default_manager.using(queryset.db).filter(email__iexact=query)
+        return Q(created_by__in=customers.values('pk'))
+    return None
+
+
+def search_tickets(queryset, query):
+    """
+    Narrows a Ticket queryset to the tickets matching `query`, best match
+    first (ties newest first).
+    """
+    vendor = connections[queryset.db].vendor
+    exact = _exact_match(queryset, query)
+    if vendor == 'postgresql':
+        search = _search_postgresql
+    elif vendor == 'sqlite':
+        search = _search_sqlite
+    else:
+        # No search index on other backends: unranked substring matching.
+        match = Q() if exact is None else exact
+        for field in SQLITE_COLUMNS:
+            match |= Q(**{f'{field}__icontains': query})
+        return queryset.filter(match)
+    if exact is None:
+        queryset = search(queryset, query)
+    else:
+        # The SQLite text match is a join, which cannot be OR'ed with the
+        # exact match, so here the text matches come from a subquery (still
+        # one MATCH) and give up their ranking among themselves.
+        queryset = queryset.filter(exact | _text_matches(queryset, query, vendor)).annotate(
+            search_rank=Case(When(exact, then=Value(1.0)), default=Value(0.0), output_field=FloatField()),
+        )
+    return queryset.order_by('-search_rank', '-created_at', '-id')
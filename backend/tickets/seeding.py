@@ -0,0 +1,132 @@
+"""
+Synthetic data for query-plan checks and benchmarks.
+
+Everything is written with bulk_create in batches, so seeding a few hundred
+thousand rows takes seconds rather than minutes.
+"""
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from users.models import CustomUser
+from .analytics import rebuild_rollups
+from .models import CustomerTicketSequence, Notification, NotificationCounter, Ticket
+
+STATUS_WEIGHTS = {'Open': 10, 'Scheduled': 5, 'In Progress': 8, 'Awaiting Parts': 3, 'Completed': 60, 'Cancelled': 14}
+PRIORITY_WEIGHTS = {'Routine': 30, 'Standard': 50, 'Urgent': 15, 'Critical': 5}
+MAKES = [('Toyota', 'Corolla'), ('Ford', 'Focus'), ('Honda', 'Civic'), ('BMW', '320i'), ('Volkswagen', 'Golf'), ('Nissan', 'Micra')]
+WORDS = ['brake', 'noise', 'engine', 'light', 'oil', 'leak', 'tire', 'rotation', 'battery', 'dead', 'steering', 'vibration',
+         'service', 'coolant', 'gearbox', 'clutch', 'exhaust', 'rattle', 'suspension', 'alignment', 'diagnostic', 'fault']
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+
+
+@contextmanager
+def preserved_timestamps(*models):
+    """
+    Lets bulk writes keep explicit created_at/updated_at values instead of
+    having auto_now/auto_now_add overwrite them. Only for single-purpose
+    processes (seeding, imports): the flags are class-level state.
+    """
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(customers=200, technicians=10, admins=2, tickets=5000, notifications=5000,
+         days=730, batch_size=2000, password=None, seed=0, stdout=None):
+    """
+    Creates users, tickets and notifications and returns the created users
+    grouped by role. Passwords are unusable unless `password` is given.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    hashed = make_password(password)
+    tag = f'{now.timestamp():.0f}'
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    users = {}
+    for role, count in (('customer', customers), ('technician', technicians), ('admin', admins)):
+        batch = [
+            CustomUser(email=f'{role}{index}.{tag}@seed.example.com', first_name=role.title(), last_name=str(index),
+                       user_role=role, password=hashed, is_staff=role == 'admin')
+            for index in range(count)
+        ]
+        users[role] = CustomUser.objects.bulk_create(batch, batch_size=batch_size)
+        log(f'Seeded {count} {role} accounts.')
+
+    assignees = users['technician'] + users['admin']
+    next_customer_ticket_id = {customer.pk: 1 for customer in users['customer']}
+    created = 0
+    with preserved_timestamps(Ticket):
+        while created < tickets:
+            batch = []
+            for _ in range(min(batch_size, tickets - created)):
+                customer = rng.choice(users['customer'])
+                status = _weighted(rng, STATUS_WEIGHTS)
+                created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+                updated_at = min(now, created_at + timedelta(hours=rng.randint(0, 72)))
+                make, model = rng.choice(MAKES)
+                batch.append(Ticket(
+                    title=_sentence(rng, 3).capitalize(), description=_sentence(rng, 25),
+                    status=status, priority=_weighted(rng, PRIORITY_WEIGHTS),
+                    category=rng.choice(Ticket.CATEGORY_CHOICES)[0],
+                    created_by=customer,
+                    assigned_to=rng.choice(assignees) if assignees and status != 'Open' else None,
+                    created_at=created_at, updated_at=updated_at,
+                    closed_at=updated_at if status in ('Completed', 'Cancelled') else None,
+                    vehicle_make=make, vehicle_model=model, vehicle_year=rng.randint(1998, 2026),
+                    license_plate=f'{rng.choice(VIN_CHARS[:23])}{rng.choice(VIN_CHARS[:23])}{rng.randint(10, 99)} {"".join(rng.choices(VIN_CHARS[:23], k=3))}',
+                    vin=''.join(rng.choices(VIN_CHARS, k=17)),
+                    customer_ticket_id=next_customer_ticket_id[customer.pk],
+                ))
+                next_customer_ticket_id[customer.pk] += 1
+            Ticket.objects.bulk_create(batch, batch_size=batch_size)
+            created += len(batch)
+        CustomerTicketSequence.objects.bulk_create(
+            [CustomerTicketSequence(customer_id=pk, last_value=next_id - 1) for pk, next_id in next_customer_ticket_id.items()],
+            batch_size=batch_size,
+        )
+        log(f'Seeded {tickets} tickets.')
+    # Cheaper than counting each batch into the rollups as it is written.
+    rebuild_rollups()
+
+    ticket_ids = list(Ticket.objects.order_by('-id').values_list('id', 'created_by_id')[:tickets])
+    recipients = users['customer'] + users['technician']
+    unread = Counter()
+    created = 0
+    while ticket_ids and recipients and created < notifications:
+        batch = []
+        for _ in range(min(batch_size, notifications - created)):
+            ticket_id, customer_id = rng.choice(ticket_ids)
+            batch.append(Notification(
+                recipient_id=customer_id if rng.random() < 0.7 else rng.choice(recipients).pk,
+                ticket_id=ticket_id, message=_sentence(rng, 8), is_read=rng.random() < 0.8,
+            ))
+        Notification.objects.bulk_create(batch, batch_size=batch_size)
+        unread.update(n.recipient_id for n in batch if not n.is_read)
+        created += len(batch)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(recipient_id=pk, unread=count) for pk, count in unread.items()], batch_size=batch_size)
+    log(f'Seeded {created} notifications.')
+    return users
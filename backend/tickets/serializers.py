@@ -1,7 +1,11 @@
+from datetime import timedelta
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Ticket, Notification
+from service_bay_api.metrics import TimedSerializerMixin, serializing
+from users.models import CustomUser
+from .models import Ticket, TicketEvent, Notification
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # We replace the email field with the user's full name.
     created_by_email = serializers.ReadOnlyField(source='created_by.email') # Keep for admin/customer
     created_by_name = serializers.SerializerMethodField() # NEW: Field for customer's full name
@@ -27,8 +31,57 @@ class TicketSerializer(serializers.ModelSerializer):
         """
         return obj.created_by.get_full_name() or obj.created_by.email
 
+class TicketEventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = TicketEvent
+        fields = ['id', 'ticket', 'actor', 'kind', 'changes', 'created_at']
+        read_only_fields = fields
+
+# --- Bulk operations ---
+BULK_MAX_TICKETS = 500
+
+class BulkTicketUpdateSerializer(serializers.Serializer):
+    """
+    Body of POST /tickets/bulk/: the ticket ids and the changes to apply to
+    every one of them. At least one change is required.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=BULK_MAX_TICKETS)
+    # Same choices as Ticket.assigned_to's limit_choices_to.
+    assigned_to = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.filter(user_role__in=['technician', 'admin']), allow_null=True, required=False)
+    status = serializers.ChoiceField(choices=Ticket.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Ticket.PRIORITY_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if not set(attrs) - {'ids'}:
+            raise serializers.ValidationError('Provide at least one of assigned_to, status or priority.')
+        return attrs
+
+# --- Analytics ---
+ANALYTICS_MAX_DAYS = 1096
+ANALYTICS_DEFAULT_DAYS = 30
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """
+    Query of GET /analytics/: an inclusive date range (the last 30 days by
+    default), the period to group it by and optional filters.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    category = serializers.ChoiceField(choices=Ticket.CATEGORY_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Ticket.PRIORITY_CHOICES, required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or timezone.localdate()
+        start = attrs.get('start') or end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+        if start > end:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (end - start).days >= ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError({'start': f'The range is limited to {ANALYTICS_MAX_DAYS} days.'})
+        return {**attrs, 'start': start, 'end': end}
+
 # --- NotificationSerializer remains the same ---
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = [
@@ -41,3 +94,49 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id', 'created_at')
 
+
+# --- Lean list rendering ---
+# List pages can run to thousands of rows, and building a Ticket instance plus
+# two related users per row dominates their cost. These helpers project the
+# exact columns TicketSerializer needs with values(), joined user fields
+# included, and render the resulting dicts to the same output.
+TICKET_ROW_COLUMNS = tuple(name for name in TicketSerializer.Meta.fields if name not in ('created_by_email', 'created_by_name', 'assigned_to_email'))
+TICKET_ROW_JOINS = ('created_by__email', 'created_by__first_name', 'created_by__last_name', 'assigned_to__email')
+TICKET_ROW_DATETIMES = ('created_at', 'updated_at', 'closed_at')
+
+def project_ticket_rows(queryset, *extra):
+    """
+    Narrows a Ticket queryset to the dict rows render_ticket_rows expects,
+    plus any `extra` columns (e.g. for a paginator's cursor).
+    """
+    return queryset.values(*TICKET_ROW_COLUMNS, *TICKET_ROW_JOINS, *extra)
+
+def render_ticket_row(row, datetime_field=None):
+    to_datetime = (datetime_field or serializers.DateTimeField()).to_representation
+    rendered = {}
+    for name in TicketSerializer.Meta.fields:
+        if name in TICKET_ROW_DATETIMES:
+            value = row[name]
+            rendered[name] = None if value is None else to_datetime(value)
+        elif name == 'created_by_email':
+            rendered[name] = row['created_by__email']
+        elif name == 'created_by_name':
+            # Same as CustomUser.get_full_name() or email.
+            full_name = f"{row['created_by__first_name']} {row['created_by__last_name']}".strip()
+            rendered[name] = full_name or row['created_by__email']
+        elif name == 'assigned_to_email':
+            # TicketSerializer omits the key entirely for unassigned tickets.
+            if row['assigned_to'] is not None:
+                rendered[name] = row['assigned_to__email']
+        else:
+            rendered[name] = row[name]
+    return rendered
+
+def render_ticket_rows(rows):
+    """
+    Renders projected rows exactly as TicketSerializer(many=True) would.
+    """
+    datetime_field = serializers.DateTimeField()
+    rows = list(rows)  # any query runs here, outside the serialize span
+    with serializing():
+        return [render_ticket_row(row, datetime_field) for row in rows]
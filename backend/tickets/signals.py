@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .analytics import record_ticket_changes
+from .models import Notification, NotificationCounter, Ticket
+from .response_cache import invalidate_all, invalidate_tickets
+from .search import SQLITE_TABLE, install_sqlite_index
+from .stats import invalidate_dashboard_stats
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def ticket_changed(sender, instance, using, signal, created=False, **kwargs):
+    # Inside the save's transaction, where the rollups must change with the row.
+    record_ticket_changes([instance], created=created, deleted=signal is post_delete, using=using)
+    invalidate_dashboard_stats(using=using)
+    invalidate_tickets([instance], using=using)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, using, **kwargs):
+    # Covers cascades from ticket and user deletes too.
+    if not instance.is_read:
+        NotificationCounter.add({instance.recipient_id: -1}, using=using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, using, update_fields=None, **kwargs):
+    # Partial saves such as last_login updates change neither the role counts
+    # nor the names and emails that cached ticket payloads show.
+    fields = set(update_fields) if update_fields is not None else None
+    if fields is None or 'user_role' in fields:
+        invalidate_dashboard_stats(using=using)
+    if fields is None or fields & {'user_role', 'email', 'first_name', 'last_name'}:
+        invalidate_all(using=using)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # SQLite migrations that rebuild tickets_ticket drop the FTS5 triggers with
+    # the old table; put them back (and reindex) once migrate has finished.
+    if sender.name != 'tickets' or connections[using].vendor != 'sqlite':
+        return
+    if SQLITE_TABLE in connections[using].introspection.table_names():
+        install_sqlite_index(connections[using])
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from service_bay_api.db_routing import cache_timeout
+from users.models import CustomUser
+from .models import Ticket, TicketArchive
+
+DASHBOARD_STATS_CACHE_KEY = 'tickets:dashboard-stats'
+ARCHIVED_COUNTS_CACHE_KEY = 'tickets:archived-counts'
+
+
+def compute_dashboard_stats():
+    """
+    Computes the admin dashboard statistics with one conditional-aggregation
+    query per table. Archived tickets count too (see archived_ticket_counts()).
+    """
+    ticket_counts = Ticket.objects.aggregate(
+        total=Count('id'),
+        **{f'status_{index}': Count('id', filter=Q(status=value)) for index, (value, _) in enumerate(Ticket.STATUS_CHOICES)}
+    )
+    user_counts = CustomUser.objects.aggregate(
+        **{role: Count('id', filter=Q(user_role=role)) for role, _ in CustomUser.USER_ROLES}
+    )
+    archived = archived_ticket_counts()
+    tickets_by_status = {value: ticket_counts[f'status_{index}'] + archived.get(value, 0) for index, (value, _) in enumerate(Ticket.STATUS_CHOICES)}
+    return {
+        'total_tickets': ticket_counts['total'] + sum(archived.values()),
+        'open_tickets': tickets_by_status['Open'],
+        'in_progress_tickets': tickets_by_status['In Progress'],
+        'tickets_by_status': tickets_by_status,
+        'total_customers': user_counts['customer'],
+        'total_technicians': user_counts['technician'],
+        'total_admins': user_counts['admin'],
+    }
+
+
+def archived_ticket_counts():
+    """
+    {status: count} of archived tickets. The archive only grows when
+    archive_tickets runs, which drops the cached copy; the timeout covers
+    archived tickets deleted with their users meanwhile.
+    """
+    counts = cache.get(ARCHIVED_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = dict(TicketArchive.objects.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total'))
+        cache.set(ARCHIVED_COUNTS_CACHE_KEY, counts, getattr(settings, 'TICKET_ARCHIVE_COUNTS_CACHE_SECONDS', 3600))
+    return counts
+
+
+def get_dashboard_stats():
+    """
+    Returns the cached dashboard statistics, recomputing them on a miss.
+
+    Ticket and user writes drop the cached copy (see signals.py); the timeout
+    only bounds staleness when another process made the write and the cache
+    backend is not shared. `generated_at`/`age_seconds` report how old the
+    numbers are.
+    """
+    entry = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    cached = entry is not None
+    if not cached:
+        entry = {'stats': compute_dashboard_stats(), 'generated_at': timezone.now()}
+        cache.set(DASHBOARD_STATS_CACHE_KEY, entry, cache_timeout(getattr(settings, 'DASHBOARD_STATS_CACHE_SECONDS', 60)))
+    return {
+        **entry['stats'],
+        'generated_at': entry['generated_at'],
+        'age_seconds': round((timezone.now() - entry['generated_at']).total_seconds(), 3),
+        'cached': cached,
+    }
+
+
+def invalidate_dashboard_stats(using=None):
+    """
+    Drops the cached statistics when the current transaction commits (at
+    once outside one), so a read racing the write cannot cache the
+    pre-commit counts for the whole TTL.
+    """
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_STATS_CACHE_KEY), using=using)
+
+
+def invalidate_archived_ticket_counts(using=None):
+    # Deferred like invalidate_dashboard_stats().
+    transaction.on_commit(lambda: cache.delete(ARCHIVED_COUNTS_CACHE_KEY), using=using)
@@ -0,0 +1,179 @@
+"""
+Server-sent events stream of a user's new notifications.
+
+This is a plain ASGI app mounted by service_bay_api/asgi.py in front of
+Django, so an idle stream costs an asyncio task instead of a worker thread.
+It is not reachable under WSGI, where clients keep polling the unread count.
+"""
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .broker import get_broker, notification_message
+from .models import Notification
+
+# EventSource cannot send an Authorization header, so browsers pass the
+# access token as ?token= on this path. Query strings end up in proxy and
+# access logs, so a logged URL works as a credential until the token expires
+# (ACCESS_TOKEN_LIFETIME, five minutes). Leave query strings out of the logs
+# for this path wherever they are kept longer than that, or shared.
+STREAM_PATH = '/api/notifications/stream/'
+CATCHUP_BATCH_SIZE = 50
+
+
+def _authenticate(raw_token):
+    """
+    Resolves the user exactly like the REST API does, via SimpleJWT.
+    """
+    close_old_connections()
+    try:
+        authentication = JWTAuthentication()
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token), validated_token
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    finally:
+        close_old_connections()
+
+
+def _latest_notification_id(user_id):
+    close_old_connections()
+    try:
+        return Notification.objects.filter(recipient_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+    finally:
+        close_old_connections()
+
+
+def _notifications_after(user_id, after_id):
+    close_old_connections()
+    try:
+        notifications = Notification.objects.filter(recipient_id=user_id, id__gt=after_id).order_by('id')[:CATCHUP_BATCH_SIZE]
+        return [notification_message(n) for n in notifications]
+    finally:
+        close_old_connections()
+
+
+def _encode_event(message):
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {message['data']}\n\n".encode()
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _reject(send, status, detail):
+    body = ('{"detail": "%s"}' % detail).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def notification_stream(scope, receive, send):
+    """
+    Streams `notification` events to the authenticated user.
+
+    The access token comes from the Authorization header or, because
+    EventSource cannot set headers, from ?token=. The stream ends when the
+    token expires so the client reconnects with a fresh one. Last-Event-ID
+    (or ?last_event_id=) replays anything missed while disconnected.
+    """
+    if scope['method'] != 'GET':
+        await _reject(send, 405, 'Method not allowed.')
+        return
+
+    headers = dict(scope['headers'])
+    query = parse_qs(scope.get('query_string', b'').decode())
+    raw_token = None
+    if b'authorization' in headers:
+        raw_token = JWTAuthentication().get_raw_token(headers[b'authorization'])
+    if raw_token is None and query.get('token'):
+        raw_token = query['token'][0].encode()
+    user, token = await sync_to_async(_authenticate)(raw_token) if raw_token else (None, None)
+    if user is None:
+        await _reject(send, 401, 'Authentication credentials were not provided or are invalid.')
+        return
+
+    last_id = _parse_int(headers.get(b'last-event-id', b'').decode()) or _parse_int(query.get('last_event_id', [None])[0])
+    replay = last_id is not None
+    if not replay:
+        last_id = await sync_to_async(_latest_notification_id)(user.pk)
+
+    response_headers = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]
+    origin = headers.get(b'origin', b'').decode()
+    if origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', ()):
+        response_headers += [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT_SECONDS', 15)
+    catchup_interval = getattr(settings, 'NOTIFICATION_STREAM_CATCHUP_SECONDS', 30)
+    signal_interval = getattr(settings, 'NOTIFICATION_STREAM_SIGNAL_SECONDS', 1)
+    expires_at = token['exp']
+    next_heartbeat = time.monotonic() + heartbeat
+
+    async def emit(body):
+        nonlocal next_heartbeat
+        await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        next_heartbeat = time.monotonic() + heartbeat
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    broker = get_broker()
+    subscription = broker.subscribe(user.pk)
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        next_catchup = time.monotonic() if replay else time.monotonic() + catchup_interval
+        next_signal = time.monotonic() + signal_interval if broker.shared else float('inf')
+
+        while time.time() < expires_at:
+            if time.monotonic() >= next_signal:
+                # A notification published by another process (the run_jobs
+                # worker) shows up here first; fetch it now rather than at the
+                # next scheduled catch-up.
+                latest = await sync_to_async(broker.latest_id)(user.pk)
+                if latest is not None and latest > last_id:
+                    next_catchup = time.monotonic()
+                next_signal = time.monotonic() + signal_interval
+
+            if time.monotonic() >= next_catchup:
+                # Notifications published by other worker processes never reach
+                # this process's broker; an indexed id > last_id query covers them.
+                missed = await sync_to_async(_notifications_after)(user.pk, last_id)
+                for message in missed:
+                    await emit(_encode_event(message))
+                    last_id = message['id']
+                if len(missed) == CATCHUP_BATCH_SIZE:
+                    continue  # more are waiting: read the next batch straight away
+                next_catchup = time.monotonic() + catchup_interval
+
+            timeout = max(0, min(min(next_heartbeat, next_catchup, next_signal) - time.monotonic(), expires_at - time.time()))
+            getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                getter.cancel()
+                return
+            if getter in done:
+                message = getter.result()
+                if message['id'] > last_id:
+                    await emit(_encode_event(message))
+                    last_id = message['id']
+            else:
+                getter.cancel()
+                if time.monotonic() >= next_heartbeat:
+                    await emit(b': keepalive\n\n')
+
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        subscription.close()
+        disconnected.cancel()
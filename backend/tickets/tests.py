@@ -1,3 +1,1145 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, router
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.tokens import AccessToken
+from service_bay_api.db_routing import ReplicaRoutingMiddleware, cache_timeout
+from service_bay_api import metrics
+from service_bay_api.metrics import RequestTimer, clear_metrics, serializing
+from service_bay_api.throttling import TokenBucketThrottle, get_bucket_store
+from users.models import CustomUser
+from .analytics import rebuild_rollups
+from .broker import InProcessBroker
+from .jobs import claim_jobs, enqueue, run_due_jobs
+from .management.commands.benchmark_api import Command as BenchmarkCommand
+from .models import (CustomerTicketSequence, ImportCheckpoint, Job, Notification, NotificationArchive, NotificationCounter, Rollup,
+                     Ticket, TicketArchive, TicketBacklogRollup, TicketCloseTimeRollup, TicketDailyRollup, TicketEvent)
+from .notifications import create_notifications, notify_after_commit
+from .search import SQLITE_TABLE
+from .serializers import TicketSerializer, project_ticket_rows, render_ticket_row
+from .stats import compute_dashboard_stats
+from .streams import STREAM_PATH, notification_stream
+from .work_queue import claim_next
+
+
+class CustomerTicketIdTests(TestCase):
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.other = CustomUser.objects.create_user('other@example.com', 'pw')
+
+    def test_numbers_are_per_customer(self):
+        first = Ticket.objects.create(title='A', description='-', created_by=self.customer)
+        second = Ticket.objects.create(title='B', description='-', created_by=self.customer)
+        other = Ticket.objects.create(title='C', description='-', created_by=self.other)
+        self.assertEqual((first.customer_ticket_id, second.customer_ticket_id, other.customer_ticket_id), (1, 2, 1))
+
+    def test_sequence_starts_after_existing_numbers(self):
+        # Tickets numbered before the sequence row existed (e.g. imported ones).
+        Ticket.objects.create(title='Old', description='-', created_by=self.customer, customer_ticket_id=41)
+        CustomerTicketSequence.objects.filter(customer=self.customer).delete()
+        ticket = Ticket.objects.create(title='New', description='-', created_by=self.customer)
+        self.assertEqual(ticket.customer_ticket_id, 42)
+
+    def test_allocate_reserves_a_block(self):
+        self.assertEqual(CustomerTicketSequence.allocate(self.customer.pk, count=10), 1)
+        self.assertEqual(CustomerTicketSequence.allocate(self.customer.pk), 11)
+
+
+class ConcurrentCustomerTicketIdTests(TransactionTestCase):
+    threads = 8
+    tickets_per_thread = 5
+
+    def test_concurrent_creates_get_distinct_consecutive_numbers(self):
+        customer = CustomUser.objects.create_user('busy@example.com', 'pw')
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def create_tickets():
+            try:
+                barrier.wait()
+                for _ in range(self.tickets_per_thread):
+                    Ticket.objects.create(title='Parallel', description='-', created_by_id=customer.pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=create_tickets) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        numbers = sorted(Ticket.objects.filter(created_by=customer).values_list('customer_ticket_id', flat=True))
+        self.assertEqual(numbers, list(range(1, self.threads * self.tickets_per_thread + 1)))
+
+
+class TicketImportTests(TestCase):
+    rows = (
+        'customer_email,customer_first_name,title,description,status,customer_ticket_id,assigned_to_email,created_at\n'
+        'new@example.com,Nina,Brakes,Squeal,Completed,7,tech@example.com,2021-03-04\n'
+        'new@example.com,,Oil,Change,Open,,,2021-05-06T10:00:00Z\n'
+        'known@example.com,,Tyres,Rotate,Open,,known@example.com,\n'
+        'known@example.com,,Lights,Out,Bogus,,,\n'
+    )
+
+    def setUp(self):
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        self.known = CustomUser.objects.create_user('known@example.com', 'pw')
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as file:
+            file.write(self.rows)
+        self.addCleanup(os.remove, self.path)
+
+    def import_file(self, *args):
+        call_command('import_tickets', self.path, *args, stdout=StringIO())
+
+    def test_imports_valid_rows_and_creates_customers(self):
+        self.import_file('--batch-size', '2')
+        customer = CustomUser.objects.get(email='new@example.com')
+        self.assertEqual((customer.user_role, customer.first_name, customer.has_usable_password()), ('customer', 'Nina', False))
+        brakes, oil = Ticket.objects.filter(created_by=customer).order_by('created_at')
+        self.assertEqual((brakes.customer_ticket_id, brakes.assigned_to, brakes.status), (7, self.tech, 'Completed'))
+        self.assertEqual((brakes.created_at.year, oil.customer_ticket_id), (2021, 8))
+        # Assigning to a customer and an unknown status are both rejected.
+        self.assertFalse(Ticket.objects.filter(created_by=self.known).exists())
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.position, checkpoint.imported, checkpoint.rejected), (4, 2, 2))
+
+    def test_rerun_resumes_and_restart_skips_numbered_duplicates(self):
+        self.import_file()
+        self.import_file()
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.import_file('--restart')
+        # Only the row without a customer_ticket_id can be imported twice.
+        self.assertEqual(Ticket.objects.count(), 3)
+
+    def test_dry_run_keeps_nothing(self):
+        self.import_file('--dry-run')
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(CustomUser.objects.filter(email='new@example.com').exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class WorkQueueTests(TestCase):
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.tech)
+
+    def create(self, title, priority, **fields):
+        return Ticket.objects.create(title=title, description='-', created_by=self.customer, priority=priority, **fields)
+
+    def test_queue_is_unassigned_open_tickets_by_priority_then_age(self):
+        self.create('routine', 'Routine')
+        self.create('old urgent', 'Urgent')
+        self.create('critical', 'Critical')
+        self.create('new urgent', 'Urgent')
+        self.create('taken', 'Critical', assigned_to=self.tech)
+        self.create('started', 'Critical', status='In Progress')
+        response = self.client.get('/api/tickets/queue/', {'page_size': 3})
+        self.assertEqual([ticket['title'] for ticket in response.data['results']], ['critical', 'old urgent', 'new urgent'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([ticket['title'] for ticket in response.data['results']], ['routine'])
+
+    def test_claim_assigns_the_head_of_the_queue(self):
+        self.create('standard', 'Standard')
+        urgent = self.create('urgent', 'Urgent')
+        response = self.client.post('/api/tickets/claim/')
+        self.assertEqual((response.data['id'], response.data['assigned_to']), (urgent.pk, self.tech.pk))
+        self.assertEqual(TicketEvent.objects.get(ticket=urgent, kind=TicketEvent.UPDATED).changes, {'assigned_to': [None, self.tech.pk]})
+        self.assertEqual(self.client.post('/api/tickets/claim/', {'category': 'Engine'}).status_code, 204)
+
+    def test_customers_cannot_work_the_queue(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/tickets/queue/').status_code, 403)
+        self.assertEqual(self.client.post('/api/tickets/claim/').status_code, 403)
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    threads = 8
+    claims_per_thread = 3
+
+    def test_concurrent_claims_take_distinct_tickets(self):
+        customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        technicians = [CustomUser.objects.create_user(f'tech{index}@example.com', 'pw', user_role='technician') for index in range(self.threads)]
+        tickets = [Ticket.objects.create(title=str(index), description='-', created_by=customer)
+                   for index in range(self.threads * self.claims_per_thread)]
+        barrier = threading.Barrier(self.threads)
+        claimed, errors = [], []
+
+        def claim(technician):
+            try:
+                barrier.wait()
+                for _ in range(self.claims_per_thread):
+                    claimed.append(claim_next(technician).pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=claim, args=(technician,)) for technician in technicians]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(claimed), [ticket.pk for ticket in tickets])
+        self.assertFalse(Ticket.objects.filter(assigned_to__isnull=True).exists())
+
+
+def failing_task():
+    raise RuntimeError('Out of paper')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.ticket = Ticket.objects.create(title='Brakes', description='-', created_by=self.customer)
+
+    def test_notifications_are_created_by_a_worker(self):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(f'/api/tickets/{self.ticket.pk}/', {'status': 'In Progress'}, format='json')
+        self.assertFalse(Notification.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'tickets.notifications.deliver_notifications')
+
+        self.assertEqual(run_due_jobs('worker', 10), (1, 0))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.ticket), (self.customer, self.ticket))
+        self.assertEqual(NotificationCounter.objects.get(recipient=self.customer).unread, 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failing_jobs_back_off_then_fail(self):
+        job = enqueue('tickets.tests.failing_task', max_attempts=2)
+        with self.assertLogs('tickets.jobs', 'ERROR'):
+            self.assertEqual(run_due_jobs('worker', 10), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, 1, ''))
+        self.assertIn('Out of paper', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(run_due_jobs('worker', 10), (0, 0))  # not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('tickets.jobs', 'ERROR'):
+            self.assertEqual(run_due_jobs('worker', 10), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(claim_jobs('worker', 10), [])
+
+    @mock.patch('tickets.management.commands.run_jobs.Command.work')
+    def test_the_worker_needs_a_cache_the_web_processes_share(self, work):
+        with self.assertRaisesMessage(CommandError, 'JOBS_RUN_INLINE'):
+            call_command('run_jobs', '--once')
+        work.assert_not_called()
+
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            call_command('run_jobs', '--once')
+        work.assert_called_once()
+
+    def test_expired_lease_makes_a_job_due_again(self):
+        job = enqueue('tickets.tests.failing_task')
+        self.assertEqual(claim_jobs('crashed', 10, lease=timedelta(seconds=-1)), [job])
+        self.assertEqual([(claimed.pk, claimed.attempts) for claimed in claim_jobs('worker', 10)], [(job.pk, 2)])
+        self.assertEqual(claim_jobs('worker', 10), [])
+
+
+class ConcurrentJobClaimTests(TransactionTestCase):
+    threads = 4
+
+    def test_concurrent_workers_claim_distinct_jobs(self):
+        jobs = [enqueue('tickets.tests.failing_task') for _ in range(20)]
+        barrier = threading.Barrier(self.threads)
+        claimed, errors = [], []
+
+        def work(worker):
+            try:
+                barrier.wait()
+                while batch := claim_jobs(worker, 3):
+                    claimed.extend(job.pk for job in batch)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work, args=(f'worker{index}',)) for index in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(claimed), [job.pk for job in jobs])
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        clear_metrics()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        Ticket.objects.create(title='Brakes', description='-', created_by=self.customer)
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_requests_are_timed_per_url_name(self):
+        self.client.force_authenticate(self.customer)
+        timing = self.client.get('/api/tickets/')['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+, serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        labels = f'process="{os.getpid()}",view="ticket-list",method="GET"'
+        self.assertIn(f'servicebay_request_duration_seconds_count{{{labels}}} 1', body)
+        self.assertIn(f'servicebay_request_db_queries_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertIn(f'servicebay_request_serialize_seconds_count{{{labels}}} 1', body)
+        self.assertIn(f'servicebay_requests_total{{{labels},status="200"}} 1', body)
+        self.assertIn('servicebay_ticket_cache_lookups_total{', body)
+
+    def test_serialization_is_timed_once_per_nesting(self):
+        ticket = Ticket.objects.select_related('created_by', 'assigned_to').get()
+        clock = iter(range(100))
+        with mock.patch('service_bay_api.metrics.time.perf_counter', lambda: next(clock)):
+            timer = RequestTimer(keep_sql=False)
+            token = metrics._current_timer.set(timer)
+            try:
+                TicketSerializer([ticket, ticket], many=True).data
+                with serializing():
+                    with serializing():
+                        pass
+            finally:
+                metrics._current_timer.reset(token)
+        # One second per item and one for the outer block; the inner block
+        # does not read the clock.
+        self.assertEqual(timer.serialize_seconds, 3)
+        # Outside a request there is nothing to time.
+        TicketSerializer(ticket).data
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertLogs('service_bay_api.slow_requests', 'WARNING') as logs:
+            self.client.get('/api/dashboard-stats/')
+        self.assertIn('GET /api/dashboard-stats/ -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.other = CustomUser.objects.create_user('other@example.com', 'pw')
+
+    def route(self, method, user=None):
+        seen = []
+
+        def view(request):
+            seen.append((router.db_for_read(Ticket), router.db_for_write(Ticket), cache_timeout(300)))
+            return HttpResponse()
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        ReplicaRoutingMiddleware(view)(getattr(RequestFactory(), method)('/api/tickets/', **headers))
+        return seen[0]
+
+    def test_reads_use_the_replica_until_the_user_writes(self):
+        self.assertEqual(self.route('get', self.user), ('replica1', 'default', 10))
+        self.assertEqual(self.route('patch', self.user), ('default', 'default', 300))
+        self.assertEqual(self.route('get', self.user), ('default', 'default', 300))
+        self.assertEqual(self.route('get', self.other), ('replica1', 'default', 10))
+        self.assertEqual(self.route('get'), ('replica1', 'default', 10))
+        self.assertEqual(router.db_for_read(Ticket), 'default')  # outside a request
+
+
+class TicketArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        long_ago = timezone.now() - timedelta(days=400)
+        self.old = Ticket.objects.create(title='Old brakes', description='-', created_by=self.customer, status='Completed',
+                                         closed_at=long_ago + timedelta(hours=3))
+        Ticket.objects.filter(pk=self.old.pk).update(created_at=long_ago)  # auto_now_add ignores a given value
+        self.recent = Ticket.objects.create(title='Recent tyres', description='-', created_by=self.customer, status='Completed')
+        self.open = Ticket.objects.create(title='Open oil', description='-', created_by=self.customer)
+        create_notifications([Notification(recipient=self.customer, ticket=self.old, message='Done')])
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client
+
+    def test_archiving_moves_old_closed_tickets_and_their_notifications(self):
+        rollups = [list(model.objects.order_by('pk').values()) for model in (TicketDailyRollup, TicketCloseTimeRollup, TicketBacklogRollup)]
+        stats = compute_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_tickets', stdout=StringIO())
+
+        self.assertEqual(set(Ticket.objects.values_list('id', flat=True)), {self.recent.pk, self.open.pk})
+        archived = TicketArchive.objects.get()
+        self.assertEqual((archived.pk, archived.title, archived.closed_at), (self.old.pk, self.old.title, self.old.closed_at))
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(NotificationArchive.objects.get().ticket_id, self.old.pk)
+        self.assertEqual(NotificationCounter.objects.get(recipient=self.customer).unread, 0)
+        # Where a ticket is stored does not change what it counts for.
+        self.assertEqual([list(model.objects.order_by('pk').values()) for model in (TicketDailyRollup, TicketCloseTimeRollup, TicketBacklogRollup)], rollups)
+        self.assertEqual(compute_dashboard_stats(), stats)
+        rebuild_rollups()
+        self.assertEqual(TicketDailyRollup.objects.aggregate(opened=Sum('opened'))['opened'], 3)
+
+    def test_archived_tickets_stay_readable(self):
+        call_command('archive_tickets', stdout=StringIO())
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get(f'/api/tickets/{self.old.pk}/').data['title'], 'Old brakes')
+        self.assertEqual(client.get(f'/api/tickets/{self.old.pk}/events/').status_code, 200)
+        self.assertEqual(self.client_for(self.admin).patch(f'/api/tickets/{self.old.pk}/', {'priority': 'Urgent'}, format='json').status_code, 404)
+
+        self.assertEqual([ticket['id'] for ticket in client.get('/api/tickets/').data], [self.open.pk, self.recent.pk])
+        self.assertEqual([ticket['id'] for ticket in client.get('/api/tickets/?include_archived=1').data], [self.open.pk, self.recent.pk, self.old.pk])
+        self.assertEqual(client.get('/api/tickets/?include_archived=1&q=brakes').status_code, 400)
+
+        admin = self.client_for(self.admin)
+        page = admin.get('/api/tickets/?include_archived=1&cursor=&page_size=2&count=1').data
+        self.assertEqual((page['count'], [ticket['id'] for ticket in page['results']]), (3, [self.open.pk, self.recent.pk]))
+        self.assertEqual([ticket['id'] for ticket in admin.get(page['next']).data['results']], [self.old.pk])
+        self.assertEqual(admin.get('/api/tickets/?include_archived=1&page=2&page_size=2').data['results'][0]['id'], self.old.pk)
+
+
+class TicketResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        self.other_tech = CustomUser.objects.create_user('other-tech@example.com', 'pw', user_role='technician')
+        self.ticket = Ticket.objects.create(title='Brakes', description='-', created_by=self.customer, assigned_to=self.tech)
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client
+
+    def test_repeated_list_is_served_from_cache(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/tickets/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = client.get('/api/tickets/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual([ticket['id'] for ticket in response.data], [self.ticket.pk])
+        self.assertEqual(client.get('/api/tickets/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_reassignment_invalidates_creator_and_both_assignees(self):
+        clients = {user: self.client_for(user) for user in (self.customer, self.tech, self.other_tech, self.admin)}
+        for client in clients.values():
+            client.get('/api/tickets/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(self.admin).patch(f'/api/tickets/{self.ticket.pk}/', {'assigned_to': self.other_tech.pk}, format='json')
+        for user, client in clients.items():
+            response = client.get('/api/tickets/')
+            self.assertEqual(response['X-Cache'], 'MISS', user.email)
+        self.assertEqual(clients[self.tech].get('/api/tickets/').data, [])
+        self.assertEqual(len(clients[self.other_tech].get('/api/tickets/').data), 1)
+
+    def test_cached_detail_is_still_permission_checked(self):
+        self.assertEqual(self.client_for(self.customer).get(f'/api/tickets/{self.ticket.pk}/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client_for(self.other_tech).get(f'/api/tickets/{self.ticket.pk}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client_for(self.tech).get(f'/api/tickets/{self.ticket.pk}/')['X-Cache'], 'HIT')
+
+    def test_renaming_a_user_invalidates_payloads_showing_it(self):
+        client = self.client_for(self.tech)
+        client.get(f'/api/tickets/{self.ticket.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.first_name = 'Dana'
+            self.customer.save()
+        self.assertEqual(client.get(f'/api/tickets/{self.ticket.pk}/').data['created_by_name'], 'Dana')
+
+
+class TicketExportTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw', first_name='Cara')
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        self.assigned = Ticket.objects.create(title='Brakes, front', description='Squeal', created_by=self.customer, assigned_to=self.tech)
+        self.unassigned = Ticket.objects.create(title='Oil', description='Change', created_by=self.customer)
+
+    def export(self, user, url):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        response = client.get(url)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_scoped_like_the_list(self):
+        response, body = self.export(self.tech, '/api/tickets/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="tickets-'))
+        rows = list(csv.DictReader(StringIO(body)))
+        self.assertEqual([row['id'] for row in rows], [str(self.assigned.pk)])
+        self.assertEqual((rows[0]['title'], rows[0]['created_by_name'], rows[0]['assigned_to_email']), ('Brakes, front', 'Cara', 'tech@example.com'))
+
+    def test_jsonl_export_matches_the_list_rows_and_filters(self):
+        response, body = self.export(self.admin, '/api/tickets/export/?format=jsonl')
+        self.assertEqual(response['Content-Type'], 'application/jsonl; charset=utf-8')
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(self.admin)
+        listed = client.get('/api/tickets/?page_size=100').data['results']
+        self.assertEqual([json.loads(line) for line in body.splitlines()], listed)
+        response, body = self.export(self.admin, '/api/tickets/export/?format=jsonl&q=brakes')
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], [self.assigned.pk])
+
+
+class TicketAnalyticsTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def rollups(self):
+        return {model.__name__: sorted(model.objects.exclude(**{name: 0 for name in counters}).values_list(*model.DIMENSIONS, *counters))
+                for model, counters in ((TicketDailyRollup, ('opened', 'closed', 'close_seconds')),
+                                        (TicketCloseTimeRollup, ('count',)), (TicketBacklogRollup, ('count',)))}
+
+    def test_counter_rows_are_updated_in_key_order(self):
+        # Every writer locks shared rows in the same order, so none can deadlock another.
+        with CaptureQueriesContext(connection) as queries:
+            TicketBacklogRollup.add({(status, 'Brakes', 'Low'): {'count': 1} for status in ('Scheduled', 'Open', 'Completed')})
+            NotificationCounter.add({self.customer.pk: 1, self.admin.pk: 1})
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        statuses = [re.search(r'"status" = \'([^\']+)\'', sql).group(1) for sql in updates if 'backlogrollup' in sql]
+        recipients = [int(re.search(r'"recipient_id" = (\d+)', sql).group(1)) for sql in updates if 'notificationcounter' in sql]
+        self.assertEqual(list(dict.fromkeys(statuses)), ['Completed', 'Open', 'Scheduled'])
+        self.assertEqual(recipients, sorted([self.customer.pk, self.admin.pk]))
+
+    def test_closed_at_follows_final_statuses(self):
+        ticket = Ticket.objects.create(title='A', description='-', created_by=self.customer)
+        self.assertIsNone(ticket.closed_at)
+        self.client.patch(f'/api/tickets/{ticket.pk}/', {'status': 'Completed'}, format='json')
+        ticket.refresh_from_db()
+        closed_at = ticket.closed_at
+        self.assertIsNotNone(closed_at)
+        self.client.patch(f'/api/tickets/{ticket.pk}/', {'status': 'Cancelled'}, format='json')
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.closed_at, closed_at)
+        self.client.post('/api/tickets/bulk/', {'ids': [ticket.pk], 'status': 'Open'}, format='json')
+        ticket.refresh_from_db()
+        self.assertIsNone(ticket.closed_at)
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        self.assert_rollups_match_a_rebuild()
+
+    def test_batched_rollup_updates_match_a_rebuild(self):
+        with mock.patch.object(Rollup, 'SMALL_BATCH', 0):
+            self.assert_rollups_match_a_rebuild()
+
+    def assert_rollups_match_a_rebuild(self):
+        tickets = [Ticket.objects.create(title=str(index), description='-', created_by=self.customer, category='Brakes') for index in range(4)]
+        self.client.patch(f'/api/tickets/{tickets[0].pk}/', {'status': 'Completed', 'priority': 'Urgent'}, format='json')
+        self.client.patch(f'/api/tickets/{tickets[1].pk}/', {'status': 'In Progress', 'category': 'Engine'}, format='json')
+        self.client.post('/api/tickets/bulk/', {'ids': [tickets[1].pk, tickets[2].pk], 'status': 'Cancelled'}, format='json')
+        tickets[3].delete()
+        incremental = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_report_reads_rollups_only(self):
+        for status in ('Open', 'Completed', 'Completed'):
+            ticket = Ticket.objects.create(title='A', description='-', created_by=self.customer, priority='Urgent')
+            self.client.patch(f'/api/tickets/{ticket.pk}/', {'status': status}, format='json')
+        # Counts and close time buckets per period, category and priority, then the backlog.
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/analytics/', {'priority': 'Urgent'})
+        self.assertEqual(len(response.data['series']), 30)
+        self.assertEqual({key: response.data['totals'][key] for key in ('opened', 'closed')}, {'opened': 3, 'closed': 2})
+        self.assertEqual(response.data['by_priority'][0]['priority'], 'Urgent')
+        self.assertEqual(response.data['backlog']['by_status']['Open'], 1)
+        self.assertEqual(self.client.get('/api/analytics/', {'start': '2020-01-01', 'end': '2026-01-01'}).status_code, 400)
+
+
+class TicketDeltaSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.first = Ticket.objects.create(title='Brakes', description='-', created_by=self.customer)
+        self.second = Ticket.objects.create(title='Oil', description='-', created_by=self.customer)
+        # An hour back, well outside the cursor overlap.
+        self.earlier = timezone.now() - timedelta(hours=1)
+        Ticket.objects.update(updated_at=self.earlier)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.customer)
+
+    def test_unchanged_poll_is_not_modified_until_a_write(self):
+        etag = self.client.get('/api/tickets/')['ETag']
+        self.assertEqual(self.client.get('/api/tickets/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = APIClient(SERVER_NAME='localhost')
+            admin.force_authenticate(self.admin)
+            admin.patch(f'/api/tickets/{self.first.pk}/', {'priority': 'Urgent'}, format='json')
+        response = self.client.get('/api/tickets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        response = self.client.get('/api/tickets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, len(response.data)), (200, 1))
+
+    def test_delta_returns_only_changed_tickets(self):
+        self.first.priority = 'Urgent'
+        self.first.save()
+        response = self.client.get('/api/tickets/', {'updated_since': (self.earlier + timedelta(minutes=1)).isoformat()})
+        self.assertEqual(([ticket['id'] for ticket in response.data['results']], response.data['count']), ([self.first.pk], 2))
+        self.first.refresh_from_db()
+        self.assertEqual(response.data['cursor'], serializers.DateTimeField().to_representation(self.first.updated_at))
+
+        response = self.client.get('/api/tickets/', {'updated_since': response.data['cursor']})
+        self.assertEqual([ticket['id'] for ticket in response.data['results']], [self.first.pk])  # within the overlap
+
+    def test_unchanged_delta_poll_does_not_count_the_scope(self):
+        params = {'updated_since': (self.earlier + timedelta(minutes=1)).isoformat()}
+        etag = self.client.get('/api/tickets/', params)['ETag']
+        with mock.patch('tickets.views.get_entry', return_value=None), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tickets/', params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+
+        # Leaving the scope changes no updated_at, but retires the list version.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        response = self.client.get('/api/tickets/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['count']), (200, 1))
+
+    def test_late_commit_behind_the_cursor_is_still_sent(self):
+        cursor = timezone.now()
+        # Stamped before the cursor was handed out, committed after.
+        Ticket.objects.filter(pk=self.second.pk).update(updated_at=cursor - timedelta(seconds=1))
+        response = self.client.get('/api/tickets/', {'updated_since': cursor.isoformat()})
+        self.assertEqual([ticket['id'] for ticket in response.data['results']], [self.second.pk])
+        self.assertEqual(response.data['cursor'], serializers.DateTimeField().to_representation(cursor))
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get('/api/tickets/', {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('updated_since', response.data)
+
+
+class NotificationStreamTests(TransactionTestCase):
+    # The stream closes its connection around each query, which a TestCase's
+    # wrapping transaction would not survive.
+    def setUp(self):
+        cache.clear()
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.ticket = Ticket.objects.create(title='Brakes', description='-', created_by=self.customer)
+        self.token = AccessToken.for_user(self.customer)
+
+    def notify(self, *messages):
+        return create_notifications([Notification(recipient=self.customer, ticket=self.ticket, message=message) for message in messages])
+
+    def stream(self, query='', headers=(), method='GET'):
+        scope = {'type': 'http', 'method': method, 'path': STREAM_PATH, 'query_string': query.encode(),
+                 'headers': [(name.encode(), value.encode()) for name, value in headers]}
+        return ApplicationCommunicator(notification_stream, scope)
+
+    async def open(self, communicator):
+        start = await communicator.receive_output(2)
+        if start['status'] == 200:
+            self.assertEqual((await communicator.receive_output(2))['body'], b'retry: 5000\n\n')
+        return start['status']
+
+    async def events(self, communicator, count):
+        messages = [(await communicator.receive_output(2))['body'].decode() for _ in range(count)]
+        return [json.loads(message.split('data: ', 1)[1])['message'] for message in messages]
+
+    async def close(self, communicator):
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(2)
+
+    async def test_requests_without_a_valid_token_are_rejected(self):
+        expired = AccessToken.for_user(self.customer)
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        for query, headers in (('', ()), ('token=garbage', ()), (f'token={expired}', ()), ('', [('authorization', 'Bearer garbage')])):
+            communicator = self.stream(query, headers)
+            self.assertEqual(await self.open(communicator), 401, query or headers)
+            await communicator.wait(2)
+        communicator = self.stream(f'token={self.token}', method='POST')
+        self.assertEqual(await self.open(communicator), 405)
+        await communicator.wait(2)
+
+    async def test_new_notifications_are_pushed(self):
+        await sync_to_async(self.notify)('Before')
+        communicator = self.stream(headers=[('authorization', f'Bearer {self.token}')])
+        self.assertEqual(await self.open(communicator), 200)
+        await sync_to_async(self.notify)('Ready')
+        self.assertEqual(await self.events(communicator, 1), ['Ready'])
+        await self.close(communicator)
+
+    async def test_reconnects_replay_what_was_missed(self):
+        first, second, third = await sync_to_async(self.notify)('One', 'Two', 'Three')
+        communicator = self.stream(f'token={self.token}', [('last-event-id', str(first.pk))])
+        await self.open(communicator)
+        self.assertEqual(await self.events(communicator, 2), ['Two', 'Three'])
+        await self.close(communicator)
+
+        communicator = self.stream(f'token={self.token}&last_event_id={second.pk}')
+        await self.open(communicator)
+        self.assertEqual(await self.events(communicator, 1), ['Three'])
+        await self.close(communicator)
+
+    @mock.patch('tickets.streams.CATCHUP_BATCH_SIZE', 2)
+    async def test_catch_up_reads_in_batches_until_current(self):
+        await sync_to_async(self.notify)(*'ABCDE')
+        communicator = self.stream(f'token={self.token}&last_event_id=0')
+        await self.open(communicator)
+        self.assertEqual(await self.events(communicator, 5), list('ABCDE'))
+        await self.close(communicator)
+
+    @override_settings(NOTIFICATION_STREAM_SIGNAL_SECONDS=0.05, NOTIFICATION_STREAM_CATCHUP_SECONDS=60)
+    async def test_notifications_created_by_the_job_worker_are_pushed(self):
+        communicator = self.stream(f'token={self.token}')
+        self.assertEqual(await self.open(communicator), 200)
+        await sync_to_async(notify_after_commit)([Notification(recipient=self.customer, ticket=self.ticket, message='Assigned')])
+        # The worker runs in another process, whose broker holds none of this process's streams.
+        with mock.patch.object(InProcessBroker, 'publish'):
+            self.assertEqual(await sync_to_async(run_due_jobs)('worker', 10), (1, 0))
+        self.assertEqual(await self.events(communicator, 1), ['Assigned'])
+        await self.close(communicator)
+
+    async def test_stream_ends_when_the_token_expires(self):
+        token = AccessToken.for_user(self.customer)
+        token.set_exp(lifetime=timedelta(seconds=1))
+        communicator = self.stream(f'token={token}')
+        self.assertEqual(await self.open(communicator), 200)
+        while (message := await communicator.receive_output(3))['more_body']:
+            self.assertEqual(message['body'], b': keepalive\n\n')
+        await communicator.wait(2)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        for status in ('Open', 'Open', 'In Progress', 'Completed'):
+            self.ticket = Ticket.objects.create(title=status, description='-', created_by=self.customer, status=status)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def test_counts_by_status_and_role(self):
+        # One query per table, plus the archive's counts.
+        with self.assertNumQueries(3):
+            stats = compute_dashboard_stats()
+        self.assertEqual(stats, {
+            'total_tickets': 4, 'open_tickets': 2, 'in_progress_tickets': 1,
+            'tickets_by_status': {'Open': 2, 'Scheduled': 0, 'In Progress': 1, 'Awaiting Parts': 0, 'Completed': 1, 'Cancelled': 0},
+            'total_customers': 1, 'total_technicians': 1, 'total_admins': 1,
+        })
+
+    def test_ticket_saves_and_deletes_drop_the_cached_stats(self):
+        self.assertFalse(self.client.get('/api/dashboard-stats/').data['cached'])
+        self.assertTrue(self.client.get('/api/dashboard-stats/').data['cached'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket.status = 'Cancelled'
+            self.ticket.save()
+        response = self.client.get('/api/dashboard-stats/')
+        self.assertFalse(response.data['cached'])
+        self.assertEqual(response.data['tickets_by_status']['Cancelled'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket.delete()
+        response = self.client.get('/api/dashboard-stats/')
+        self.assertEqual((response.data['cached'], response.data['total_tickets']), (False, 3))
+
+    def test_writes_drop_the_cached_stats_only_once_they_commit(self):
+        self.assertFalse(self.client.get('/api/dashboard-stats/').data['cached'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ticket.status = 'Cancelled'
+            self.ticket.save()
+            # A read racing the write is still served the committed counts.
+            response = self.client.get('/api/dashboard-stats/')
+            self.assertEqual((response.data['cached'], response.data['tickets_by_status']['Cancelled']), (True, 0))
+        response = self.client.get('/api/dashboard-stats/')
+        self.assertEqual((response.data['cached'], response.data['tickets_by_status']['Cancelled']), (False, 1))
+
+    def test_archived_tickets_are_counted(self):
+        Ticket.objects.filter(pk=self.ticket.pk).update(closed_at=timezone.now() - timedelta(days=400))
+        call_command('archive_tickets', stdout=StringIO())
+        stats = self.client.get('/api/dashboard-stats/').data
+        self.assertEqual((stats['total_tickets'], stats['tickets_by_status']['Completed']), (4, 1))
+        # The archive's counts stay cached across live ticket writes.
+        Ticket.objects.create(title='New', description='-', created_by=self.customer)
+        with self.assertNumQueries(2):
+            self.assertEqual(compute_dashboard_stats()['total_tickets'], 5)
+
+
+class TicketKeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        for index in range(7):
+            Ticket.objects.create(title=f'Brake job {index}', description='-', created_by=self.customer)
+        # Ties on created_at, the leading cursor column, leave only id to order them.
+        now = timezone.now()
+        tickets = Ticket.objects.order_by('id')
+        Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets[:3]]).update(created_at=now)
+        Ticket.objects.filter(pk__in=[ticket.pk for ticket in tickets[3:]]).update(created_at=now - timedelta(hours=1))
+        self.expected = list(Ticket.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.customer)
+
+    def walk(self, url, direction):
+        pages = []
+        while url:
+            page = self.client.get(url).data
+            pages.append([ticket['id'] for ticket in page['results']])
+            url = page[direction]
+        return pages
+
+    def test_pages_cover_every_ticket_once_in_both_directions(self):
+        forwards = self.walk('/api/tickets/?cursor=&page_size=2', 'next')
+        self.assertEqual([len(page) for page in forwards], [2, 2, 2, 1])
+        self.assertEqual([pk for page in forwards for pk in page], self.expected)
+
+        last = self.client.get('/api/tickets/?cursor=&page_size=2').data
+        while last['next']:
+            last = self.client.get(last['next']).data
+        backwards = self.walk(last['previous'], 'previous')
+        self.assertEqual([pk for page in reversed(backwards) for pk in page], self.expected[:-1])
+
+    def test_tampered_cursors_are_not_found(self):
+        token = self.client.get('/api/tickets/?cursor=&page_size=2').data['next'].split('cursor=')[1].split('&')[0]
+        forged = base64.urlsafe_b64encode(json.dumps({'r': 0, 'p': ['not a date', 1]}).encode()).decode()
+        for cursor in ('garbage', token[:-4], forged):
+            self.assertEqual(self.client.get('/api/tickets/', {'cursor': cursor, 'page_size': 2}).status_code, 404, cursor)
+
+    def test_pages_are_validated_without_aggregating_the_scope(self):
+        admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.client.force_authenticate(admin)
+        etag = self.client.get('/api/tickets/?cursor=&page_size=2')['ETag']
+        with mock.patch('tickets.views.get_entry', return_value=None), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tickets/?cursor=&page_size=2', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(queries), 1)  # the page itself
+        self.assertNotRegex(queries[0]['sql'].upper(), r'COUNT\(|MAX\(')
+
+        Ticket.objects.filter(pk=self.expected[1]).update(title='Brake job, redone')
+        with mock.patch('tickets.views.get_entry', return_value=None):
+            response = self.client.get('/api/tickets/?cursor=&page_size=2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.data['results'][1]['title']), (200, 'Brake job, redone'))
+
+    def test_search_pages_by_number(self):
+        page = self.client.get('/api/tickets/?cursor=&q=brake&page_size=5').data
+        self.assertEqual((page['count'], len(page['results'])), (7, 5))
+        self.assertIn('page=2', page['next'])
+
+
+class TicketRowRenderingTests(TestCase):
+    def test_rows_render_exactly_like_the_serializer(self):
+        named = CustomUser.objects.create_user('named@example.com', 'pw', first_name='Cara', last_name='Diaz')
+        unnamed = CustomUser.objects.create_user('unnamed@example.com', 'pw')
+        tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        tickets = [
+            Ticket.objects.create(title='Assigned', description='-', created_by=named, assigned_to=tech, status='Completed',
+                                  vehicle_make='Volvo', vehicle_year=2012, license_plate='AB12 CDE'),
+            Ticket.objects.create(title='Unassigned', description='-', created_by=unnamed),
+        ]
+        self.assertIsNone(tickets[1].closed_at)
+        queryset = Ticket.objects.select_related('created_by', 'assigned_to').order_by('id')
+        for ticket, row in zip(queryset, project_ticket_rows(queryset)):
+            expected = TicketSerializer(ticket).data
+            rendered = render_ticket_row(row)
+            self.assertEqual(list(rendered), list(expected), ticket.title)
+            self.assertEqual(json.dumps(rendered, cls=JSONEncoder), json.dumps(expected, cls=JSONEncoder), ticket.title)
+
+
+class TicketHistoryTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        self.ticket = Ticket.objects.create(title='Brakes', description='Squeal', created_by=self.customer)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def test_updates_record_each_changed_field_with_old_and_new_values(self):
+        self.client.patch(f'/api/tickets/{self.ticket.pk}/', {'title': 'Brakes, front', 'assigned_to': self.tech.pk,
+                                                              'description': 'Squeal'}, format='json')
+        event = TicketEvent.objects.get(ticket=self.ticket)
+        self.assertEqual((event.kind, event.actor), (TicketEvent.UPDATED, self.admin))
+        self.assertEqual(event.changes, {'title': ['Brakes', 'Brakes, front'], 'assigned_to': [None, self.tech.pk]})
+
+    def test_no_op_saves_record_nothing(self):
+        self.client.patch(f'/api/tickets/{self.ticket.pk}/', {'title': 'Brakes', 'priority': 'Standard'}, format='json')
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        ticket.save()
+        self.assertEqual(ticket.last_changes, {})
+        self.assertIsNone(TicketEvent.record(ticket))
+        self.assertFalse(TicketEvent.objects.exists())
+
+    def test_updates_diff_against_the_row_already_loaded(self):
+        # One SELECT for the ticket, then its UPDATE and the event's INSERT,
+        # inside the request's savepoint.
+        with self.assertNumQueries(5) as context:
+            self.client.patch(f'/api/tickets/{self.ticket.pk}/', {'description': 'Squeal when cold'}, format='json')
+        self.assertEqual(sum(query['sql'].startswith('SELECT') for query in context.captured_queries), 1)
+        self.assertEqual(TicketEvent.objects.get().changes, {'description': ['Squeal', 'Squeal when cold']})
+
+
+class BulkTicketUpdateTests(TestCase):
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.tech = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+        other = CustomUser.objects.create_user('other@example.com', 'pw', user_role='technician')
+
+        def ticket(status='Open', assigned_to=self.tech):
+            return Ticket.objects.create(title=status, description='-', created_by=self.customer, assigned_to=assigned_to, status=status)
+        self.first, self.second = ticket(), ticket()
+        self.unchanged = ticket('In Progress')
+        self.closed = ticket('Completed')
+        self.elsewhere = ticket(assigned_to=other)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.tech)
+
+    def test_reports_each_ticket_and_writes_the_changed_ones_at_once(self):
+        ids = [self.first.pk, self.closed.pk, self.elsewhere.pk, 999999, self.unchanged.pk, self.second.pk]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/tickets/bulk/', {'ids': ids, 'status': 'In Progress'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(outcome['id'], outcome['result']) for outcome in response.data['results']], [
+            (self.first.pk, 'updated'), (self.closed.pk, 'forbidden'), (self.elsewhere.pk, 'not_found'),
+            (999999, 'not_found'), (self.unchanged.pk, 'unchanged'), (self.second.pk, 'updated')])
+        self.assertEqual({key: response.data[key] for key in ('updated', 'unchanged', 'forbidden', 'not_found')},
+                         {'updated': 2, 'unchanged': 1, 'forbidden': 1, 'not_found': 2})
+        self.assertEqual(response.data['results'][0]['ticket']['status'], 'In Progress')
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "tickets_ticket"') for query in context.captured_queries), 1)
+
+        statuses = dict(Ticket.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[pk] for pk in (self.first.pk, self.second.pk, self.closed.pk, self.elsewhere.pk)],
+                         ['In Progress', 'In Progress', 'Completed', 'Open'])
+        self.assertEqual(sorted(TicketEvent.objects.values_list('ticket_id', 'changes')),
+                         [(pk, {'status': ['Open', 'In Progress']}) for pk in sorted((self.first.pk, self.second.pk))])
+        self.assertEqual(run_due_jobs('worker', 10), (1, 0))
+        self.assertEqual(sorted(Notification.objects.filter(recipient=self.customer).values_list('ticket_id', flat=True)),
+                         sorted((self.first.pk, self.second.pk)))
+
+
+class TicketSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.brakes = Ticket.objects.create(title='Brake pads worn', description='Grinding at low speed', created_by=customer,
+                                            license_plate='AB12CDE')
+        self.noise = Ticket.objects.create(title='Odd noise', description='Probably the brake caliper', created_by=customer,
+                                           vin='1HGCM82633A004352')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def search(self, query):
+        return [ticket['id'] for ticket in self.client.get('/api/tickets/', {'q': query}).data['results']]
+
+    def test_words_and_plate_or_vin_substrings_match(self):
+        # A title match ranks above a description match.
+        self.assertEqual(self.search('brake'), [self.brakes.pk, self.noise.pk])
+        self.assertEqual(self.search('B12C'), [self.brakes.pk])
+        self.assertEqual(self.search('633A0'), [self.noise.pk])
+
+    def test_terms_under_three_characters_match_nothing(self):
+        self.assertEqual(self.search('AB'), [])
+        self.assertEqual(self.client.get('/api/tickets/', {'q': 'AB'}).data['count'], 0)
+
+    def test_ticket_numbers_and_customer_emails_match_exactly(self):
+        other = CustomUser.objects.create_user('other@example.com', 'pw')
+        wipers = Ticket.objects.create(id=4352, title='Wipers', description='-', created_by=other)
+        Ticket.objects.filter(pk=wipers.pk).update(created_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.search(f'#{self.brakes.pk}'), [self.brakes.pk])
+        self.assertEqual(self.search('Other@Example.com'), [wipers.pk])
+        # A number still matches plate and VIN substrings, below the ticket it names.
+        self.assertEqual(self.search('4352'), [wipers.pk, self.noise.pk])
+        self.assertEqual(self.search('#4352'), [wipers.pk])
+
+    def test_index_follows_bulk_updates_and_deletes(self):
+        Ticket.objects.filter(pk=self.brakes.pk).update(title='Clutch slipping', description='-')
+        self.assertEqual(self.search('clutch'), [self.brakes.pk])
+        self.assertEqual(self.search('brake'), [self.noise.pk])
+        Ticket.objects.filter(pk=self.brakes.pk).delete()
+        self.assertEqual(self.search('clutch'), [])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                # Raises if the FTS5 index disagrees with tickets_ticket.
+                cursor.execute(f"INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rank) VALUES ('integrity-check', 1)")
+
+
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.other = CustomUser.objects.create_user('other@example.com', 'pw')
+        self.ticket = Ticket.objects.create(title='Brakes', description='-', created_by=self.customer)
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.customer)
+
+    def notify(self, recipient, count, is_read=False):
+        return create_notifications([Notification(recipient=recipient, ticket=self.ticket, message='-', is_read=is_read) for _ in range(count)])
+
+    def unread(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread']
+
+    def test_counter_follows_creates_deletes_and_mark_all_read(self):
+        self.assertEqual(self.unread(), 0)
+        created = self.notify(self.customer, 3)
+        self.notify(self.customer, 2, is_read=True)
+        self.notify(self.other, 1)
+        self.assertEqual(self.unread(), 3)
+        created[0].delete()
+        self.assertEqual(self.unread(), 2)
+        self.assertEqual(self.client.post('/api/notifications/mark_all_as_read/').status_code, 204)
+        self.assertEqual(self.unread(), 0)
+        self.notify(self.customer, 1)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(NotificationCounter.objects.get(recipient=self.other).unread, 1)
+
+    def test_repair_rewrites_drifted_and_missing_counters(self):
+        self.notify(self.customer, 2)
+        self.notify(self.other, 1)
+        NotificationCounter.objects.filter(recipient=self.customer).update(unread=7)
+        NotificationCounter.objects.filter(recipient=self.other).delete()
+
+        out = StringIO()
+        call_command('repair_notification_counters', '--dry-run', stdout=out)
+        self.assertIn(f'user #{self.customer.pk}: counter 7, actual 2', out.getvalue())
+        self.assertIn(f'user #{self.other.pk}: counter missing, actual 1', out.getvalue())
+        self.assertEqual(self.unread(), 7)
+
+        call_command('repair_notification_counters', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(dict(NotificationCounter.objects.values_list('recipient_id', 'unread')), {self.customer.pk: 2, self.other.pk: 1})
+        out = StringIO()
+        call_command('repair_notification_counters', stdout=out)
+        self.assertIn('fixed 0 counters', out.getvalue())
+
+
+class PruneNotificationsTests(TestCase):
+    def setUp(self):
+        customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        ticket = Ticket.objects.create(title='Brakes', description='-', created_by=customer)
+        notifications = create_notifications([Notification(recipient=customer, ticket=ticket, message=str(index), is_read=index != 3)
+                                              for index in range(5)])
+        # 0-2 are old and read, 3 is old but unread, 4 is read but recent.
+        Notification.objects.filter(pk__in=[n.pk for n in notifications[:4]]).update(created_at=timezone.now() - timedelta(days=120))
+        self.expired = {n.pk for n in notifications[:3]}
+        self.kept = {n.pk for n in notifications[3:]}
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('prune_notifications', '--days', '90', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_archive_mode_moves_expired_read_notifications(self):
+        self.assertIn('Archived 3 notifications in 2 batches', self.prune('--mode', 'archive'))
+        self.assertEqual(set(Notification.objects.values_list('id', flat=True)), self.kept)
+        self.assertEqual(set(NotificationArchive.objects.values_list('id', flat=True)), self.expired)
+
+    def test_delete_mode_drops_them(self):
+        self.assertIn('Deleted 3 notifications', self.prune('--mode', 'delete'))
+        self.assertEqual(set(Notification.objects.values_list('id', flat=True)), self.kept)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('Would archive 3 read notifications', self.prune('--mode', 'archive', '--dry-run'))
+        self.assertEqual(Notification.objects.count(), 5)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+
+class PollThrottlingTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        # The drained buckets would throttle the tests that run after these.
+        self.addCleanup(get_bucket_store().clear)
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.technician = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client
+
+    @mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'poll': '3/min', 'poll_total': '100/s'})
+    def test_polls_are_budgeted_per_user_but_writes_are_not(self):
+        client = self.client_for(self.customer)
+        for poll in range(3):
+            self.assertEqual(client.get('/api/notifications/unread_count/').status_code, 200)
+        self.assertEqual(client.get('/api/tickets/').status_code, 429)
+        self.assertEqual(client.post('/api/notifications/mark_all_as_read/').status_code, 204)
+        self.assertEqual(self.client_for(self.technician).get('/api/tickets/').status_code, 200)
+
+    @mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'poll': '2/min', 'poll_total': '4/min'})
+    def test_polls_over_a_users_budget_leave_the_shared_budget_alone(self):
+        client = self.client_for(self.customer)
+        statuses = [client.get('/api/notifications/unread_count/').status_code for poll in range(10)]
+        self.assertEqual(statuses, [200] * 2 + [429] * 8)
+        client = self.client_for(self.technician)
+        self.assertEqual([client.get('/api/notifications/').status_code for poll in range(2)], [200] * 2)
+
+    @mock.patch.dict(TokenBucketThrottle.THROTTLE_RATES, {'poll': '100/min', 'poll_total': '3/min'})
+    def test_a_poll_storm_is_shed_across_users(self):
+        for poll in range(3):
+            self.assertEqual(self.client_for(self.customer).get('/api/notifications/').status_code, 200)
+        response = self.client_for(self.technician).get('/api/notifications/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(self.client_for(self.technician).get('/api/users/me/').status_code, 200)
+
+
+class BenchmarkApiTests(TestCase):
+    def test_a_small_run_reports_every_endpoint_and_leaves_no_data(self):
+        out = StringIO()
+        call_command('benchmark_api', '--tickets', '50', '--customers', '10', '--technicians', '3', '--requests', '40',
+                     '--min-samples', '1', stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report), {'meta', 'endpoints'})
+        self.assertEqual(report['meta']['database'], connection.vendor)
+        self.assertEqual(report['meta']['data']['tickets'], 50)
+        scenarios = {scenario[0] for scenario in BenchmarkCommand().get_scenarios()}
+        self.assertEqual(set(report['endpoints']), scenarios)
+        for label, result in report['endpoints'].items():
+            self.assertEqual(set(result), {'method', 'path', 'role', 'samples', 'status', 'latency_ms', 'queries', 'rows'})
+            self.assertEqual(set(result['latency_ms']), {'p50', 'p95', 'mean', 'max'})
+            self.assertGreaterEqual(result['samples'], 1)
+            self.assertEqual(sum(result['status'].values()), result['samples'])
+            self.assertTrue(all(status[0] in '23' for status in result['status']), f'{label}: {result["status"]}')
+        # The seeded data is rolled back.
+        self.assertFalse(Ticket.objects.exists())
+        self.assertFalse(CustomUser.objects.exists())
+        self.assertFalse(Notification.objects.exists())
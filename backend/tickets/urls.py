@@ -4,7 +4,11 @@ from .views import (
     TicketViewSet, 
     NotificationListView, 
     MarkAllAsReadView, 
-    DashboardStatsView
+    UnreadNotificationCountView,
+    DashboardStatsView,
+    AnalyticsView,
+    CacheMetricsView,
+    TicketEventListView,
 )
 
 # The router automatically generates the URLs for the TicketViewSet
@@ -20,10 +24,22 @@ urlpatterns = [
     # Path for getting a list of notifications
     path('notifications/', NotificationListView.as_view(), name='notification-list'),
     
+    # Path for the unread-notification badge count
+    path('notifications/unread_count/', UnreadNotificationCountView.as_view(), name='notification-unread-count'),
+    
     # Path for marking all notifications as read
     path('notifications/mark_all_as_read/', MarkAllAsReadView.as_view(), name='notification-mark-all-read'),
     
     # Path for getting the admin dashboard statistics
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+
+    # Path for ticket throughput and turnaround over time (admins)
+    path('analytics/', AnalyticsView.as_view(), name='ticket-analytics'),
+
+    # Path for the ticket response cache hit/miss counters (admins)
+    path('cache-metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
+
+    # Path for following the ticket change history across all tickets (admins)
+    path('ticket-events/', TicketEventListView.as_view(), name='ticket-event-list'),
 ]
 
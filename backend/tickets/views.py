@@ -1,32 +1,99 @@
-from rest_framework import viewsets, permissions, generics, status
+import hashlib
+import json
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from rest_framework import viewsets, permissions, generics, status, serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 from rest_framework.pagination import PageNumberPagination
-from .models import Ticket, Notification
-from users.models import CustomUser # We need to import the CustomUser model
-from .serializers import TicketSerializer, NotificationSerializer
+from service_bay_api.throttling import PollingThrottle
+from .models import Ticket, TicketArchive, TicketEvent, Notification, NotificationCounter
+from .serializers import TicketSerializer, TicketEventSerializer, BulkTicketUpdateSerializer, NotificationSerializer, AnalyticsQuerySerializer, project_ticket_rows, render_ticket_rows
+from .analytics import record_ticket_changes, ticket_analytics
+from .archive import LiveAndArchived
+from .notifications import notifications_for_changes, notify_after_commit
+from .search import search_tickets
+from .stats import get_dashboard_stats, invalidate_dashboard_stats
+from .response_cache import cache_metrics, detail_cache_key, get_entry, invalidate_tickets, list_cache_key, list_version, set_entry
+from .pagination import KeysetPagination
+from .exporting import CSVRenderer, JSONLinesRenderer, export_rows
+from .work_queue import QUEUE_ORDERING, claim_next, work_queue
 
-# --- Pagination Class (No changes) ---
+# --- Pagination Classes ---
 class StandardPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-# --- Notification Views (No changes) ---
-class NotificationListView(generics.ListAPIView):
+class TicketCursorPagination(KeysetPagination):
+    # Served by the (created_by|assigned_to, -created_at, -id) access paths.
+    ordering = ('-created_at', '-id')
+    page_size = 10
+
+class WorkQueuePagination(KeysetPagination):
+    # Served by ticket_work_queue_idx.
+    ordering = QUEUE_ORDERING
+    page_size = 20
+
+class NotificationCursorPagination(KeysetPagination):
+    # Served by notif_recipient_recent_idx (recipient, -created_at, -id).
+    ordering = ('-created_at', '-id')
+    page_size = 10
+
+# --- Throttling ---
+class PollingThrottleMixin:
+    """
+    Adds the polling budgets to the default throttles of an endpoint the
+    dashboards poll on a timer.
+    """
+    def is_polled(self):
+        return True
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        if self.is_polled():
+            throttles.append(PollingThrottle())
+        return throttles
+
+# --- Notification Views ---
+class NotificationListView(PollingThrottleMixin, generics.ListAPIView):
+    """
+    The user's notifications, newest first, a page at a time (?cursor=).
+    """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    pagination_class = NotificationCursorPagination
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(recipient=self.request.user).order_by('-created_at', '-id')
+
+class UnreadNotificationCountView(PollingThrottleMixin, APIView):
+    """
+    The navbar badge: a primary-key lookup on the user's NotificationCounter.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        unread = NotificationCounter.objects.filter(recipient=request.user).values_list('unread', flat=True).first()
+        return Response({'unread': unread or 0})
 
 class MarkAllAsReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def post(self, request):
-        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        with transaction.atomic():
+            marked = Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+            # Subtract what was actually marked, so notifications created meanwhile still count.
+            NotificationCounter.add({request.user.pk: -marked})
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-# --- THIS IS THE FIX ---
 class DashboardStatsView(APIView):
     """
     A dedicated, high-performance endpoint for fetching
@@ -36,28 +103,69 @@ class DashboardStatsView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        # Calculate all stats efficiently on the server
-        total_tickets = Ticket.objects.count()
-        open_tickets = Ticket.objects.filter(status='Open').count()
-        in_progress_tickets = Ticket.objects.filter(status='In Progress').count()
-        total_customers = CustomUser.objects.filter(user_role='customer').count()
-        total_technicians = CustomUser.objects.filter(user_role='technician').count()
-        total_admins = CustomUser.objects.filter(user_role='admin').count() # <-- THIS LINE WAS MISSING
-        
-        # Return all stats as a single JSON object
-        stats = {
-            'total_tickets': total_tickets,
-            'open_tickets': open_tickets,
-            'in_progress_tickets': in_progress_tickets,
-            'total_customers': total_customers,
-            'total_technicians': total_technicians,
-            'total_admins': total_admins, # <-- THIS LINE WAS MISSING
-        }
-        return Response(stats, status=status.HTTP_200_OK)
-# --- END FIX ---
-
-
-# --- Ticket Views (No changes) ---
+        # One aggregate query per table, cached until a ticket or user changes.
+        return Response(get_dashboard_stats(), status=status.HTTP_200_OK)
+
+
+class AnalyticsView(APIView):
+    """
+    Ticket throughput and turnaround over a date range, read from the
+    rollup tables only (see analytics.py). Only accessible by admins.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(ticket_analytics(**query.validated_data))
+
+
+class CacheMetricsView(APIView):
+    """
+    Hit and miss counts of the ticket response cache in this process.
+    Only accessible by admins.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_metrics())
+
+
+# --- Conditional GET helpers ---
+def make_etag(*parts):
+    """
+    Builds a quoted, opaque ETag from the values that determine a response.
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+def apply_validators(response, etag, last_modified=None):
+    """
+    Stamps ETag/Last-Modified on a response and asks clients to revalidate
+    on every use, so browsers replay If-None-Match on the next poll.
+    """
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+def cached_response(request, entry, hit):
+    """
+    Answers from a {etag, last_modified, data} payload entry: a 304 when the
+    client already holds it, the payload otherwise. X-Cache tells whether the
+    entry came from the response cache.
+    """
+    last_modified = entry['last_modified']
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=last_modified and int(last_modified.timestamp()))
+    if response is None:
+        response = Response(entry['data'])
+    response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    return apply_validators(response, entry['etag'], last_modified)
+
+
+# --- Ticket Views ---
 class TicketPermission(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated
@@ -65,47 +173,379 @@ class TicketPermission(permissions.BasePermission):
         user = request.user
         if user.user_role == 'admin': return True
         if user.user_role == 'technician':
-            if obj.assigned_to != user: return False
+            if obj.assigned_to_id != user.pk: return False
             if request.method in permissions.SAFE_METHODS: return True
             if obj.status in ['Completed', 'Cancelled']: return False
             return True
         if user.user_role == 'customer':
-            if request.method in permissions.SAFE_METHODS: return obj.created_by == user
+            if request.method in permissions.SAFE_METHODS: return obj.created_by_id == user.pk
         return False
 
-class TicketViewSet(viewsets.ModelViewSet):
+class WorkQueuePermission(permissions.BasePermission):
+    message = 'Only technicians and admins can work the queue.'
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.user_role in ('technician', 'admin')
+
+class TicketViewSet(PollingThrottleMixin, viewsets.ModelViewSet):
     serializer_class = TicketSerializer
     permission_classes = [TicketPermission]
     pagination_class = StandardPagination
 
     def get_queryset(self):
         user = self.request.user
-        if user.user_role == 'technician' or user.user_role == 'customer':
+        # ?cursor= (empty for the first page) switches any role to keyset pages.
+        # Without it admins keep page numbers and everyone else the full list.
+        # Search results are ranked, not time-ordered, so ?q= always pages by number.
+        if self.get_search_query():
+            self.pagination_class = StandardPagination
+        elif 'cursor' in self.request.query_params:
+            self.pagination_class = TicketCursorPagination
+        elif user.user_role == 'technician' or user.user_role == 'customer':
             self.pagination_class = None
         else:
             self.pagination_class = StandardPagination
 
+        return self.scoped(Ticket.objects)
+
+    def get_archived_queryset(self):
+        # The same scope over the archive (see archive.py).
+        return self.scoped(TicketArchive.objects)
+
+    def scoped(self, manager):
+        user = self.request.user
+        # TicketSerializer reads both users, so join them instead of loading each per row.
+        tickets = manager.select_related('created_by', 'assigned_to')
         if user.user_role == 'admin':
-            return Ticket.objects.all().order_by('-created_at')
+            return tickets.order_by('-created_at', '-id')
         elif user.user_role == 'technician':
-            return Ticket.objects.filter(assigned_to=user).order_by('-created_at')
+            return tickets.filter(assigned_to=user).order_by('-created_at', '-id')
+        else:
+            return tickets.filter(created_by=user).order_by('-created_at', '-id')
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Archived tickets can still be read, but no longer changed.
+            if self.action not in ('retrieve', 'events'):
+                raise
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        ticket = generics.get_object_or_404(self.get_archived_queryset(), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, ticket)
+        return ticket
+
+    def get_search_query(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def is_polled(self):
+        # Only the lists are polled; writes and single tickets keep the default budget.
+        return self.action in ('list', 'queue')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.get_search_query()
+        if query and self.action in ('list', 'export'):
+            # Ranked and index-backed on PostgreSQL and SQLite; see tickets/search.py.
+            queryset = search_tickets(queryset, query)
+        if self.include_archived() and self.action in ('list', 'export'):
+            if query:
+                raise ValidationError({'include_archived': 'Archived tickets cannot be searched; drop either ?q= or ?include_archived=.'})
+            queryset = LiveAndArchived(queryset, self.get_archived_queryset())
+        return queryset
+
+    def include_archived(self):
+        return self.request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+    def get_updated_since(self):
+        """
+        Parses the optional ?updated_since=<ISO 8601 timestamp> delta-sync cursor.
+        """
+        raw = self.request.query_params.get('updated_since')
+        if not raw:
+            return None
+        # An unencoded '+02:00' offset arrives as ' 02:00'.
+        since = parse_datetime(raw.strip().replace(' ', '+'))
+        if since is None:
+            raise ValidationError({'updated_since': 'Expected an ISO 8601 timestamp, e.g. the cursor from a previous response.'})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, dt_timezone.utc)
+        return since
+
+    def changed_since(self, queryset, since):
+        """
+        The rows of `queryset` changed after the `since` cursor, oldest change
+        first. updated_at is stamped before its transaction commits, so a slow
+        commit can land behind a cursor a client already holds; reading
+        TICKET_DELTA_OVERLAP_SECONDS back from the cursor sends such rows on the
+        next poll. Rows in the overlap are sent again, which clients merging
+        by id absorb.
+        """
+        overlap = timedelta(seconds=settings.TICKET_DELTA_OVERLAP_SECONDS)
+        return queryset.filter(updated_at__gt=since - overlap).order_by('updated_at', 'id')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lists the caller's tickets. Every response carries an ETag, so an
+        unchanged poll is answered with a 304 after a single aggregate query.
+        Full lists derive it from the newest `updated_at` and the row count in
+        the caller's scope; ?cursor= pages from their own rows, so a page never
+        costs more than its index range.
+
+        With ?updated_since=<cursor> only tickets changed after the cursor (less
+        a small overlap, see changed_since()) are returned, together with the
+        cursor to send on the next poll and the current scope size (a mismatch
+        tells the client to resync in full). Its ETag is derived from the
+        newest `updated_at` and the caller's list version, so an unchanged
+        delta poll does not count the caller's history.
+
+        Payloads other than search results are cached under the caller's list
+        version (see response_cache.py), so a repeated poll that nothing has
+        invalidated is answered without touching the database.
+
+        Archived tickets are left out unless ?include_archived=1 is given.
+        """
+        since = self.get_updated_since()
+        cache_key = None if self.get_search_query() else list_cache_key(request.user, request.build_absolute_uri())
+        entry = get_entry('list', cache_key) if cache_key else None
+        hit = entry is not None
+        if not hit:
+            queryset = self.filter_queryset(self.get_queryset())
+            if since is None and isinstance(self.paginator, KeysetPagination):
+                entry = self.keyset_page_entry(queryset)
+            else:
+                etag, last_modified = self.list_validators(queryset, since)
+                not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified and int(last_modified.timestamp()))
+                if not_modified is not None:
+                    return apply_validators(not_modified, etag, last_modified)
+                entry = {'etag': etag, 'last_modified': last_modified, 'data': self.list_payload(queryset, since)}
+            if cache_key:
+                set_entry(cache_key, entry)
+        return cached_response(request, entry, hit)
+
+    def list_validators(self, queryset, since):
+        """
+        The ETag and Last-Modified of a full list or a delta, from one aggregate.
+        """
+        user = self.request.user
+        if since is not None:
+            # MAX(updated_at) alone is one probe of the (scope, updated_at) index.
+            # Tickets that leave the scope without a new updated_at (deleted,
+            # reassigned away, archived) retire the list version instead.
+            last_modified = queryset.aggregate(last_modified=Max('updated_at'))['last_modified']
+            scope = list_version(user)
+        else:
+            aggregates = queryset.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+            last_modified, scope = aggregates['last_modified'], aggregates['count']
+        etag = make_etag('ticket-list', user.pk, user.user_role, scope,
+                         last_modified and last_modified.isoformat(), self.request.get_full_path())
+        return etag, last_modified
+
+    def keyset_page_entry(self, queryset):
+        # The page is read before its validators, which then cover exactly the
+        # rows served; an aggregate over the whole scope would cost more than
+        # the page itself.
+        page = self.paginate_queryset(project_ticket_rows(queryset))
+        data = self.get_paginated_response(render_ticket_rows(page)).data
+        last_modified = max((row['updated_at'] for row in page), default=None)
+        etag = make_etag('ticket-page', self.request.user.pk, json.dumps(data, cls=JSONEncoder, sort_keys=True))
+        return {'etag': etag, 'last_modified': last_modified, 'data': data}
+
+    def list_payload(self, queryset, since):
+        # List rows skip model instantiation: see project_ticket_rows().
+        rows = project_ticket_rows(queryset)
+        if since is not None:
+            changed = list(self.changed_since(rows, since))
+            # Re-sent rows in the overlap must not move the cursor back.
+            cursor = max(changed[-1]['updated_at'], since) if changed else since
+            return {
+                'cursor': serializers.DateTimeField().to_representation(cursor),
+                'count': queryset.count(),
+                'results': render_ticket_rows(changed),
+            }
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(render_ticket_rows(page)).data
+        return render_ticket_rows(rows)
+
+    def in_scope(self, ticket):
+        # The row filter of get_queryset(), for a ticket that was not loaded through it.
+        user = self.request.user
+        if user.user_role == 'admin':
+            return True
+        if user.user_role == 'technician':
+            return ticket.assigned_to_id == user.pk
+        return ticket.created_by_id == user.pk
+
+    def retrieve(self, request, *args, **kwargs):
+        # Versions are bumped by ticket id, so only a plain numeric id can name an entry.
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        cache_key = detail_cache_key(int(lookup)) if lookup.isdecimal() else None
+        entry = get_entry('detail', cache_key) if cache_key else None
+        hit = entry is not None
+        if hit:
+            # Check the cached ticket exactly as get_object() would check the row.
+            data = entry['data']
+            ticket = Ticket(id=data['id'], created_by_id=data['created_by'], assigned_to_id=data['assigned_to'], status=data['status'])
+            if not self.in_scope(ticket):
+                raise Http404
+            self.check_object_permissions(request, ticket)
         else:
-            return Ticket.objects.filter(created_by=user).order_by('-created_at')
-    
+            instance = self.get_object()
+            etag = make_etag('ticket', instance.pk, instance.updated_at.isoformat())
+            entry = {'etag': etag, 'last_modified': instance.updated_at, 'data': dict(self.get_serializer(instance).data)}
+            if cache_key:
+                set_entry(cache_key, entry)
+        return cached_response(request, entry, hit)
+
+
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        with transaction.atomic():
+            ticket = serializer.save(created_by=self.request.user)
+            TicketEvent.record(ticket, actor=self.request.user, kind=TicketEvent.CREATED)
 
     def perform_update(self, serializer):
-        old_instance = self.get_object()
-        old_status = old_instance.status
-        old_assigned_to = old_instance.assigned_to
-        new_instance = serializer.save()
-        new_status = new_instance.status
-        new_assigned_to = new_instance.assigned_to
-        if old_status != new_status and new_instance.created_by != self.request.user:
-            message = f"The status of your ticket '#{new_instance.id}: {new_instance.title}' was updated to '{new_status}'."
-            Notification.objects.create(recipient=new_instance.created_by, ticket=new_instance, message=message)
-        if old_assigned_to != new_assigned_to and new_assigned_to is not None and new_assigned_to != self.request.user:
-            message = f"You have been assigned a new ticket: '#{new_instance.id}: {new_instance.title}'."
-            Notification.objects.create(recipient=new_assigned_to, ticket=new_instance, message=message)
+        # update() has already loaded the ticket; save() diffs against that
+        # snapshot, so there is no second fetch and no hand-written comparison.
+        with transaction.atomic():
+            ticket = serializer.save()
+            TicketEvent.record(ticket, actor=self.request.user)
+            notify_after_commit(notifications_for_changes(ticket, ticket.last_changes, self.request.user))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Applies one set of changes (assigned_to, status, priority) to many
+        tickets. Each ticket is checked against TicketPermission exactly as a
+        PATCH would be; the permitted ones are written with one bulk_update,
+        their events with one bulk_create, and their notifications are left
+        to one background job. The response reports the outcome per ticket,
+        in request order.
+        """
+        payload = BulkTicketUpdateSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        changes = dict(payload.validated_data)
+        ids = list(dict.fromkeys(changes.pop('ids')))
+
+        outcomes = {}
+        with transaction.atomic():
+            # Tickets outside the caller's scope are reported as not found, like a PATCH would be.
+            tickets = self.get_queryset().filter(pk__in=ids).select_for_update(of=('self',))
+            changed = []
+            for ticket in tickets:
+                try:
+                    self.check_object_permissions(request, ticket)
+                except PermissionDenied as exc:
+                    outcomes[ticket.pk] = {'id': ticket.pk, 'result': 'forbidden', 'detail': str(exc.detail)}
+                    continue
+                for name, value in changes.items():
+                    setattr(ticket, name, value)
+                if ticket.get_changes():
+                    changed.append(ticket)
+                    outcomes[ticket.pk] = {'id': ticket.pk, 'result': 'updated', 'ticket': ticket}
+                else:
+                    outcomes[ticket.pk] = {'id': ticket.pk, 'result': 'unchanged', 'ticket': ticket}
+            Ticket.bulk_save(changed, fields=list(changes))
+            TicketEvent.record_many(changed, actor=request.user)
+            record_ticket_changes(changed)
+            notify_after_commit([notification for ticket in changed
+                                 for notification in notifications_for_changes(ticket, ticket.last_changes, request.user)])
+        # bulk_update() sends no post_save, so neither signal receiver runs.
+        invalidate_tickets(changed)
+        if changed and 'status' in changes:
+            invalidate_dashboard_stats()
+
+        results = []
+        for pk in ids:
+            outcome = outcomes.get(pk, {'id': pk, 'result': 'not_found', 'detail': 'Not found.'})
+            if 'ticket' in outcome:
+                outcome['ticket'] = self.get_serializer(outcome['ticket']).data
+            results.append(outcome)
+        summary = {result: sum(1 for outcome in results if outcome['result'] == result)
+                   for result in ('updated', 'unchanged', 'forbidden', 'not_found')}
+        return Response({**summary, 'results': results}, status=status.HTTP_200_OK)
+
+    def get_queue_category(self, data):
+        category = data.get('category') or None
+        if category is not None and category not in dict(Ticket.CATEGORY_CHOICES):
+            raise ValidationError({'category': f'"{category}" is not a valid choice.'})
+        return category
+
+    @action(detail=False, methods=['get'], permission_classes=[WorkQueuePermission])
+    def queue(self, request):
+        """
+        The unassigned Open tickets, most urgent and then oldest first, a page
+        at a time (?cursor=). ?category= narrows it to one kind of work.
+        """
+        tickets = work_queue(self.get_queue_category(request.query_params))
+        paginator = WorkQueuePagination()
+        page = paginator.paginate_queryset(project_ticket_rows(tickets, 'priority_rank'), request, view=self)
+        return paginator.get_paginated_response(render_ticket_rows(page))
+
+    @action(detail=False, methods=['post'], permission_classes=[WorkQueuePermission])
+    def claim(self, request):
+        """
+        Assigns the ticket at the head of the queue (optionally of one
+        {"category"}) to the caller and returns it; 204 when there is none.
+        Concurrent claims never get the same ticket; see work_queue.py.
+        """
+        ticket = claim_next(request.user, self.get_queue_category(request.data))
+        if ticket is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(self.get_serializer(ticket).data)
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, JSONLinesRenderer])
+    def export(self, request, format=None):
+        """
+        Streams every ticket the list would show, with the same ?q=,
+        ?updated_since= and ?include_archived= filters, as CSV (the default, or ?format=csv) or JSON
+        Lines (?format=jsonl). Nothing is paginated or cached; see exporting.py.
+        """
+        since = self.get_updated_since()
+        queryset = self.filter_queryset(self.get_queryset())
+        if since is not None:
+            queryset = self.changed_since(queryset, since)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(renderer.stream(export_rows(queryset)),
+                                         content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+        response.headers['Content-Disposition'] = f'attachment; filename="tickets-{stamp}.{renderer.format}"'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
 
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """
+        The ticket's change history, oldest first. Pass ?after=<cursor> from
+        the previous response to read only newer events.
+        """
+        ticket = self.get_object()
+        # By id: the ticket may be an archived one.
+        return event_page(request, TicketEvent.objects.filter(ticket_id=ticket.pk))
+
+
+# --- Ticket Event Views ---
+EVENT_PAGE_SIZE = 100
+
+def event_page(request, events):
+    """
+    One page of events with id > ?after=, plus the cursor for the next read.
+    """
+    try:
+        after = int(request.query_params.get('after', 0))
+    except ValueError:
+        raise ValidationError({'after': 'Expected the integer cursor from a previous response.'})
+    events = list(events.filter(id__gt=after).order_by('id')[:EVENT_PAGE_SIZE])
+    return Response({
+        'cursor': events[-1].id if events else after,
+        'results': TicketEventSerializer(events, many=True).data,
+    })
+
+class TicketEventListView(APIView):
+    """
+    The append-only audit stream across all tickets, for admins and
+    downstream consumers that follow it incrementally with ?after=.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return event_page(request, TicketEvent.objects.all())
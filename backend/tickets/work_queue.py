@@ -0,0 +1,39 @@
+"""
+The technicians' work queue: Open tickets nobody is assigned to, most
+urgent first and oldest first within a priority. ticket_work_queue_idx
+holds exactly these rows in exactly this order, so reading the head of the
+queue, or a page deeper in it, is an index range scan.
+
+Technicians take work with claim_next() instead of waiting for an admin to
+assign it.
+"""
+from django.db import router, transaction
+from .locking import claimable
+from .models import Ticket, TicketEvent
+
+QUEUE_ORDERING = ('priority_rank', 'created_at', 'id')
+
+
+def work_queue(category=None):
+    tickets = Ticket.objects.filter(status='Open', assigned_to__isnull=True)
+    if category:
+        tickets = tickets.filter(category=category)
+    return tickets.order_by(*QUEUE_ORDERING)
+
+
+def claim_next(user, category=None):
+    """
+    Assigns the ticket at the head of the queue to `user`, records the
+    change, and returns the ticket (None when the queue is empty).
+
+    Concurrent claims take different tickets (see locking.claimable()).
+    """
+    using = router.db_for_write(Ticket)
+    with transaction.atomic(using=using):
+        ticket = claimable(work_queue(category).using(using)).first()
+        if ticket is None:
+            return None
+        ticket.assigned_to = user
+        ticket.save()
+        TicketEvent.record(ticket, actor=user)
+    return ticket
@@ -0,0 +1,135 @@
+"""
+JWT authentication that remembers the users it has loaded.
+
+Every API request used to fetch its user by primary key. CachedJWTAuthentication
+keeps the column values of recently authenticated users in a bounded,
+per-process LRU map with a short TTL, so a warm request authenticates without
+touching the database. Saving or deleting a user evicts it in this process
+(see users/signals.py) and retires the user's version in the default cache.
+Every hit is checked against that version, so other worker processes stop
+serving the old row on their next request wherever the cache is shared; with
+the per-process locmem cache they notice within AUTH_USER_CACHE_SECONDS.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Thread-safe LRU map of user id -> (expiry, shared version, db alias, column values).
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load that raced with one is not stored.
+        self.generation = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1:]
+
+    def set(self, user_id, version, db, values, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, version, db, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache(getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+                                        getattr(settings, 'AUTH_USER_CACHE_SECONDS', 30))
+    return _user_cache
+
+
+def _version_key(user_id):
+    return f'auth:user:v:{user_id}'
+
+
+def get_user_version(user_id):
+    key = _version_key(user_id)
+    version = shared_cache.get(key)
+    if version is None:
+        # add() so that concurrent first readers settle on the same version.
+        shared_cache.add(key, uuid.uuid4().hex, None)
+        version = shared_cache.get(key) or uuid.uuid4().hex
+    return version
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops a user from this process's authentication cache and retires its
+    shared version, so every other process misses on its next lookup.
+    """
+    shared_cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+    get_user_cache().invalidate(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, with users served from the per-process cache when
+    possible. Only active users are ever cached, and the revoke-token check
+    still runs on every request.
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = get_user_cache()
+        attnames = [field.attname for field in self.user_model._meta.concrete_fields]
+        # Read before any load, so a save racing the load leaves the entry stale.
+        version = get_user_version(user_id)
+        cached = cache.get(user_id)
+        if cached is None or cached[0] != version:
+            generation = cache.generation
+            user = super().get_user(validated_token)
+            cache.set(user_id, version, user._state.db, [getattr(user, name) for name in attnames], generation)
+            return user
+
+        # A fresh instance per request, so nothing a view does to it is shared.
+        _, db, values = cached
+        user = self.user_model.from_db(db, attnames, list(values))
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,91 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations
+from django.db.models import Index, TextField
+from django.db.models.functions import Cast, Upper
+
+# The search indexes as they stood when this migration was written, copied
+# rather than imported from users/search.py: what an applied migration did
+# must not change when that module does. A change to the indexes there needs
+# a new migration that recreates them.
+POSTGRESQL_INDEXES = [
+    index
+    for field in ('email', 'first_name', 'last_name')
+    for index in (
+        GinIndex(OpClass(Upper(Cast(field, TextField())), name='gin_trgm_ops'), name=f'user_{field}_trgm_idx'),
+        Index(OpClass(Upper(Cast(field, TextField())), name='text_pattern_ops'), name=f'user_{field}_prefix_idx'),
+    )
+]
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_customuser_search USING fts5("
+    "email, first_name, last_name, content='users_customuser', content_rowid='id', tokenize='trigram')",
+
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_search_ai AFTER INSERT ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_search(rowid, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_search_ad AFTER DELETE ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_search(users_customuser_search, rowid, email, first_name, last_name) "
+    "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); END",
+
+    "CREATE TRIGGER IF NOT EXISTS users_customuser_search_au "
+    "AFTER UPDATE OF email, first_name, last_name ON users_customuser BEGIN "
+    "INSERT INTO users_customuser_search(users_customuser_search, rowid, email, first_name, last_name) "
+    "VALUES ('delete', old.id, old.email, old.first_name, old.last_name); "
+    "INSERT INTO users_customuser_search(rowid, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+
+    # Index the users that already exist.
+    "INSERT INTO users_customuser_search(users_customuser_search) VALUES ('rebuild')",
+
+    # NOCASE indexes let SQLite answer the case-insensitive LIKE 'ab%' of short terms by range.
+    'CREATE INDEX IF NOT EXISTS user_email_prefix_idx ON users_customuser (email COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS user_first_name_prefix_idx ON users_customuser (first_name COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS user_last_name_prefix_idx ON users_customuser (last_name COLLATE NOCASE)',
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS users_customuser_search_ai',
+    'DROP TRIGGER IF EXISTS users_customuser_search_ad',
+    'DROP TRIGGER IF EXISTS users_customuser_search_au',
+    'DROP TABLE IF EXISTS users_customuser_search',
+    'DROP INDEX IF EXISTS user_email_prefix_idx',
+    'DROP INDEX IF EXISTS user_first_name_prefix_idx',
+    'DROP INDEX IF EXISTS user_last_name_prefix_idx',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        CustomUser = apps.get_model('users', 'CustomUser')
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in POSTGRESQL_INDEXES:
+            schema_editor.add_index(CustomUser, index)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_INSTALL:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        CustomUser = apps.get_model('users', 'CustomUser')
+        for index in POSTGRESQL_INDEXES:
+            schema_editor.remove_index(CustomUser, index)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_UNINSTALL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # Backend-specific search indexes (pg_trgm/text_pattern_ops, or FTS5 and
+    # NOCASE indexes), so they live outside CustomUser.Meta.indexes.
+
+    dependencies = [
+        ('users', '0002_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -44,5 +44,11 @@ class CustomUser(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # The admin user list filters by role and pages in id order.
+            models.Index(fields=['user_role', 'id'], name='user_role_idx'),
+        ]
+
     def __str__(self):
         return self.email
\ No newline at end of file
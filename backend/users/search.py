@@ -0,0 +1,118 @@
+"""
+Index-backed search for the admin user manager (?search= on /api/users/).
+
+Every term of the query has to match the email, first name or last name.
+Terms of three or more characters match anywhere in a field, through pg_trgm
+GIN indexes on PostgreSQL or an FTS5 trigram table on SQLite; shorter terms
+match field prefixes through case-insensitive btree indexes. Matching stops
+after SEARCH_CANDIDATE_LIMIT users, and only those are ranked, so the cost
+does not grow with the number of accounts.
+"""
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import connections
+from django.db.models import Case, IntegerField, Index, Q, TextField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Concat, Upper
+from service_bay_api.sqlite_fts import fts5_expression, install_fts5_index, uninstall_fts5_index
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+MIN_TERM_LENGTH = 3  # the trigram indexes cannot serve shorter substrings
+SEARCH_CANDIDATE_LIMIT = 1000
+
+SQLITE_TABLE = 'users_customuser_search'
+
+
+# --- Indexes ---
+def _normalized(field):
+    # Matches the left-hand side Django compiles for icontains/istartswith on PostgreSQL.
+    return Upper(Cast(field, TextField()))
+
+
+def postgresql_indexes():
+    indexes = []
+    for field in SEARCH_FIELDS:
+        indexes.append(GinIndex(OpClass(_normalized(field), name='gin_trgm_ops'), name=f'user_{field}_trgm_idx'))
+        indexes.append(Index(OpClass(_normalized(field), name='text_pattern_ops'), name=f'user_{field}_prefix_idx'))
+    return indexes
+
+
+def install_sqlite_indexes(connection):
+    """
+    The FTS5 table for substring terms plus NOCASE indexes, which let
+    SQLite answer the case-insensitive LIKE 'ab%' of short terms by range.
+    Idempotent; also run after every migrate (see users/signals.py).
+    """
+    install_fts5_index(connection, SQLITE_TABLE, 'users_customuser', SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        for field in SEARCH_FIELDS:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS user_{field}_prefix_idx ON users_customuser ({field} COLLATE NOCASE)')
+
+
+def uninstall_sqlite_indexes(connection):
+    uninstall_fts5_index(connection, SQLITE_TABLE)
+    with connection.cursor() as cursor:
+        for field in SEARCH_FIELDS:
+            cursor.execute(f'DROP INDEX IF EXISTS user_{field}_prefix_idx')
+
+
+# --- Matching ---
+def _any_field(lookup, value):
+    match = Q()
+    for field in SEARCH_FIELDS:
+        match |= Q(**{f'{field}__{lookup}': value})
+    return match
+
+
+def _matching(queryset, query):
+    terms = query.split()
+    short_terms = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    long_terms = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    for term in short_terms:
+        queryset = queryset.filter(_any_field('istartswith', term))
+    if not long_terms:
+        return queryset
+    if connections[queryset.db].vendor == 'sqlite':
+        expression = fts5_expression(' '.join(long_terms), MIN_TERM_LENGTH)
+        return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [expression]))
+    for term in long_terms:
+        queryset = queryset.filter(_any_field('icontains', term))
+    return queryset
+
+
+def matching_user_ids(queryset, query, limit):
+    """
+    Ids of up to `limit` users matching every term. Users with a field that
+    starts with the whole query come first, so the strongest matches are
+    never cut off by the limit.
+    """
+    prefix = queryset.filter(_any_field('istartswith', query)).order_by().values_list('id', flat=True)[:limit]
+    rest = _matching(queryset, query).order_by().values_list('id', flat=True)[:limit]
+    return list(dict.fromkeys([*prefix, *rest]))[:limit]
+
+
+def rank_users(queryset, query):
+    """
+    Annotates search_rank: 4 exact email, 3 a field or the full name starts
+    with the query, 2 the email or full name contains it, 1 the terms only
+    match separately.
+    """
+    queryset = queryset.alias(search_full_name=Concat('first_name', Value(' '), 'last_name'))
+    return queryset.annotate(search_rank=Case(
+        When(email__iexact=query, then=Value(4)),
+        When(_any_field('istartswith', query) | Q(search_full_name__istartswith=query), then=Value(3)),
+        When(Q(email__icontains=query) | Q(search_full_name__icontains=query), then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    ))
+
+
+def search_users(queryset, query):
+    """
+    Returns the users matching `query`, best match first, and whether
+    matching stopped at SEARCH_CANDIDATE_LIMIT (so any count is a floor).
+    """
+    query = query.strip()
+    ids = matching_user_ids(queryset, query, SEARCH_CANDIDATE_LIMIT + 1)
+    truncated = len(ids) > SEARCH_CANDIDATE_LIMIT
+    candidates = queryset.filter(id__in=ids[:SEARCH_CANDIDATE_LIMIT])
+    return rank_users(candidates, query).order_by('-search_rank', 'email'), truncated
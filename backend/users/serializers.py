@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.exceptions import AuthenticationFailed
+from service_bay_api.metrics import TimedSerializerMixin
 from .models import CustomUser
 from rest_framework.validators import UniqueValidator # <-- THIS IS THE CRITICAL FIX (Import)
 
@@ -23,7 +24,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
             ) from e
         return data
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     email = serializers.EmailField(
         required=True,
         # --- THIS IS THE CRITICAL FIX (Usage) ---
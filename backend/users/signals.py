@@ -0,0 +1,24 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+from .models import CustomUser
+from .search import SQLITE_TABLE, install_sqlite_indexes
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    # Any save may change is_active, user_role or the password, and
+    # UserDetailView.update saves through here too.
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_migrate)
+def repair_search_indexes(sender, using, **kwargs):
+    # SQLite migrations that rebuild users_customuser drop the FTS5 triggers
+    # and the NOCASE indexes with the old table; put them back after migrate.
+    if sender.name != 'users' or connections[using].vendor != 'sqlite':
+        return
+    if SQLITE_TABLE in connections[using].introspection.table_names():
+        install_sqlite_indexes(connections[using])
@@ -1,3 +1,112 @@
+from unittest import mock
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from service_bay_api.throttling import get_bucket_store
+from .authentication import UserCache, get_user_cache, invalidate_cached_user
+from .models import CustomUser
+from .search import SEARCH_CANDIDATE_LIMIT
 
-# Create your tests here.
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        get_user_cache().clear()
+        get_bucket_store().clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_warm_requests_skip_the_user_query(self):
+        client = self.client_for(self.customer)
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], 'customer@example.com')
+
+    def test_deactivation_takes_effect_on_the_next_request(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+        response = self.client_for(self.admin).patch(f'/api/users/{self.customer.pk}/', {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+    def test_role_change_takes_effect_on_the_next_request(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/users/me/').data['user_role'], 'customer')
+        self.client_for(self.admin).patch(f'/api/users/{self.customer.pk}/', {'user_role': 'technician'}, format='json')
+        self.assertEqual(client.get('/api/users/me/').data['user_role'], 'technician')
+
+    def test_a_save_in_another_process_takes_effect_on_the_next_request(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/users/me/').data['user_role'], 'customer')
+        # Another worker saves its own instance: its receiver evicts from its
+        # own LRU, which here must not reach ours, and retires the shared version.
+        other = CustomUser.objects.get(pk=self.customer.pk)
+        other.user_role = 'technician'
+        with mock.patch.object(UserCache, 'invalidate'):
+            other.save()
+        self.assertIsNotNone(get_user_cache().get(str(self.customer.pk)))
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get('/api/users/me/').data['user_role'], 'technician')
+
+        # A queryset update sends no signal, so its caller retires the version itself.
+        CustomUser.objects.filter(pk=self.customer.pk).update(is_active=False)
+        with mock.patch.object(UserCache, 'invalidate'):
+            invalidate_cached_user(self.customer.pk)
+        self.assertEqual(client.get('/api/users/me/').status_code, 401)
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.customer = CustomUser.objects.create_user('customer@example.com', 'pw')
+        self.technician = CustomUser.objects.create_user('tech@example.com', 'pw', user_role='technician')
+
+    def client_for(self, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        return client
+
+    def test_login_attempts_are_budgeted_per_account(self):
+        client = APIClient(SERVER_NAME='localhost')
+        for attempt in range(5):
+            response = client.post('/api/token/', {'email': 'customer@example.com', 'password': 'wrong'}, format='json')
+            self.assertEqual(response.status_code, 401)
+        response = client.post('/api/token/', {'email': 'Customer@Example.com', 'password': 'pw'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.admin = CustomUser.objects.create_superuser('admin@example.com', 'pw')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.admin)
+
+    def add_users(self, *users):
+        CustomUser.objects.bulk_create([CustomUser(email=email, first_name=first, last_name=last, password='!') for email, first, last in users])
+
+    def search(self, query, **params):
+        return self.client.get('/api/users/', {'search': query, 'page_size': 100, **params}).data
+
+    def test_exact_then_prefix_then_substring_then_separate_terms(self):
+        self.add_users(('marylee@example.com', '', ''), ('lee@example.com.au', '', ''), ('lee@example.com', '', ''),
+                       ('a@example.com', 'Ann', 'Smith-Lee'), ('b@example.com', 'Joann', 'Lee'), ('c@example.com', 'Ann', 'Lee'))
+        self.assertEqual([user['email'] for user in self.search('lee@example.com')['results']],
+                         ['lee@example.com', 'lee@example.com.au', 'marylee@example.com'])
+        # The full name starts with the query, contains it, or only matches term by term.
+        self.assertEqual([user['email'] for user in self.search('ann lee')['results']], ['c@example.com', 'b@example.com', 'a@example.com'])
+
+    def test_matching_stops_at_the_candidate_limit_without_losing_prefix_matches(self):
+        self.add_users(*((f'x{index}.fleet@example.com', '', '') for index in range(SEARCH_CANDIDATE_LIMIT + 1)))
+        self.add_users(('fleet@example.com', '', ''))
+        page = self.search('fleet')
+        self.assertEqual((page['count'], page['count_is_estimate']), (SEARCH_CANDIDATE_LIMIT, True))
+        self.assertEqual(page['results'][0]['email'], 'fleet@example.com')
+        self.assertNotIn('count_is_estimate', self.search('x1.fleet@'))
@@ -1,11 +1,17 @@
+import json
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework_simplejwt.views import TokenObtainPairView
+from service_bay_api.throttling import LoginAccountThrottle, LoginThrottle
 from .serializers import CustomUserSerializer
 from .models import CustomUser
-from django.db.models import Q # Import Q for complex 'OR' queries
+from .search import search_users
 
 # --- Pagination Class ---
 class StandardPagination(PageNumberPagination):
@@ -13,6 +19,65 @@ class StandardPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+# Below this many rows an exact COUNT(*) is cheap and more useful than an estimate.
+ESTIMATE_EXACT_BELOW = 10000
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate for `queryset`, or None where there is none
+    (SQLite) or it is small enough to count exactly.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    return rows if rows >= ESTIMATE_EXACT_BELOW else None
+
+class EstimatedCountPaginator(DjangoPaginator):
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None:
+            return super().count
+        self.is_estimate = True
+        return estimate
+
+class UserPagination(StandardPagination):
+    """
+    Page numbers without an exact COUNT(*) over the whole table where it
+    would hurt: ?count=estimate uses the planner's estimate, and searches
+    count their capped candidate set. Either way the response then says
+    `count_is_estimate: true`.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_is_estimate = getattr(view, 'search_truncated', False)
+        if request.query_params.get('count') == 'estimate' and not self.count_is_estimate:
+            self.django_paginator_class = EstimatedCountPaginator
+        page = super().paginate_queryset(queryset, request, view)
+        self.count_is_estimate = self.count_is_estimate or getattr(self.page.paginator, 'is_estimate', False)
+        return page
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count_is_estimate:
+            response.data['count_is_estimate'] = True
+        return response
+
+class LoginView(TokenObtainPairView):
+    """
+    TokenObtainPairView with its password check budgeted per address and
+    per account.
+    """
+    throttle_classes = [LoginThrottle, LoginAccountThrottle]
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
@@ -29,11 +94,13 @@ def get_user_profile(request):
 class UserListView(generics.ListCreateAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = [IsAdminUser]
-    pagination_class = StandardPagination
+    pagination_class = UserPagination
+    search_truncated = False
 
     def get_queryset(self):
         """
         This view returns a list of users, filterable by role AND search term.
+        Search results come best match first; see users/search.py.
         """
         queryset = CustomUser.objects.all()
         
@@ -42,16 +109,11 @@ class UserListView(generics.ListCreateAPIView):
         if role is not None:
             queryset = queryset.filter(user_role=role)
         
-        # --- THIS IS THE DEFINITIVE FIX ---
         # 2. Filter by Search Term
-        search = self.request.query_params.get('search')
-        if search is not None and search != '':
-            queryset = queryset.filter(
-                Q(email__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search)
-            )
-        # --- END FIX ---
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset, self.search_truncated = search_users(queryset, search)
+            return queryset
         
         return queryset.order_by('id')
 
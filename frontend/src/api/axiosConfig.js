@@ -28,8 +28,19 @@ const axiosInstance = axios.create({
 });
 
 // --- Interceptors (No changes needed below) ---
+
+// When the API answers 429 it says, in Retry-After, how long to back off.
+// GETs to that endpoint (dashboard polls included) fail fast until then
+// instead of adding to the load.
+const backoffUntil = new Map();
+const endpointOf = (config) => `${config.method}:${(config.url || '').split('?')[0]}`;
+
 axiosInstance.interceptors.request.use(
   (config) => {
+    const until = backoffUntil.get(endpointOf(config));
+    if (config.method === 'get' && until && until > Date.now()) {
+      return Promise.reject(new axios.Cancel(`Backing off until ${new Date(until).toISOString()}`));
+    }
     const authTokens = localStorage.getItem('authTokens') ? JSON.parse(localStorage.getItem('authTokens')) : null;
     if (authTokens?.access) {
       config.headers.Authorization = `Bearer ${authTokens.access}`;
@@ -45,6 +56,11 @@ axiosInstance.interceptors.response.use(
   (response) => response,
   async (error) => {
     const originalRequest = error.config;
+    if (error.response && error.response.status === 429 && originalRequest) {
+      const seconds = parseInt(error.response.headers['retry-after'], 10);
+      backoffUntil.set(endpointOf(originalRequest), Date.now() + (Number.isNaN(seconds) ? 5 : seconds) * 1000);
+      return Promise.reject(error);
+    }
     const authTokens = localStorage.getItem('authTokens') ? JSON.parse(localStorage.getItem('authTokens')) : null;
 
     if (error.response && error.response.status === 401 && !originalRequest._retry && !originalRequest.url.includes('/token/')) {
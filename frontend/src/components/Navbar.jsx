@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useContext, useMemo, useRef } from 'react';
+import React, { useState, useEffect, useContext, useRef } from 'react';
 import { NavLink as RouterNavLink, Link } from 'react-router-dom';
 import styled from 'styled-components';
 import AuthContext from '../context/AuthContext';
@@ -149,27 +149,63 @@ const MobileNavLink = styled(RouterNavLink)`
 const Navbar = () => {
   const { user, logoutUser } = useContext(AuthContext);
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [isDropdownOpen, setIsDropdownOpen] = useState(false);
   const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
   
   const prevUnreadCount = useRef(0);
 
+  // Only the latest page is shown; older notifications stay on the server.
+  const fetchNotifications = async () => {
+    try {
+      const response = await axiosInstance.get('/notifications/');
+      setNotifications(response.data.results);
+    } catch (err) {
+      console.error("Failed to fetch notifications:", err);
+    }
+  };
+
   useEffect(() => {
     if (!user) return;
-    const fetchNotifications = async () => {
+    let source = null;
+    let intervalId = null;
+    // The badge poll is a single counter lookup, not the notification history.
+    const fetchUnreadCount = async () => {
       try {
-        const response = await axiosInstance.get('/notifications/');
-        setNotifications(response.data);
+        const response = await axiosInstance.get('/notifications/unread_count/');
+        setUnreadCount(response.data.unread);
       } catch (err) {
-        console.error("Failed to fetch notifications:", err);
+        console.error("Failed to fetch unread count:", err);
       }
     };
+    const startPolling = () => {
+      if (!intervalId) intervalId = setInterval(fetchUnreadCount, 20000);
+    };
+    fetchUnreadCount();
     fetchNotifications();
-    const intervalId = setInterval(fetchNotifications, 20000);
-    return () => clearInterval(intervalId);
-  }, [user]);
 
-  const unreadCount = useMemo(() => notifications.filter(n => !n.is_read).length, [notifications]);
+    // New notifications are pushed over server-sent events. The effect re-runs
+    // whenever the token is refreshed (user changes), reopening the stream.
+    // If the stream is unavailable (e.g. a WSGI deployment) we fall back to polling.
+    const authTokens = JSON.parse(localStorage.getItem('authTokens') || 'null');
+    if (window.EventSource && authTokens?.access) {
+      source = new EventSource(`${axiosInstance.defaults.baseURL}/notifications/stream/?token=${encodeURIComponent(authTokens.access)}`);
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        setNotifications(prev => (prev.some(n => n.id === notification.id) ? prev : [notification, ...prev].slice(0, 10)));
+        if (!notification.is_read) setUnreadCount(count => count + 1);
+      });
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) startPolling();
+      };
+    } else {
+      startPolling();
+    }
+    return () => {
+      if (source) source.close();
+      if (intervalId) clearInterval(intervalId);
+    };
+  }, [user]);
 
   useEffect(() => {
     if (unreadCount > prevUnreadCount.current) {
@@ -178,10 +214,16 @@ const Navbar = () => {
     prevUnreadCount.current = unreadCount;
   }, [unreadCount]);
 
+  const handleToggleDropdown = () => {
+    if (!isDropdownOpen) fetchNotifications();
+    setIsDropdownOpen(!isDropdownOpen);
+  };
+
   const handleMarkAllRead = async () => {
     try {
       await axiosInstance.post('/notifications/mark_all_as_read/');
       setNotifications(notifications.map(n => ({ ...n, is_read: true })));
+      setUnreadCount(0);
     } catch (err) {
       console.error("Failed to mark notifications as read:", err);
     }
@@ -208,7 +250,7 @@ const Navbar = () => {
               <NavLinkBase to={dashboardPath}>Dashboard</NavLinkBase>
             </LinksContainer>
             <NotificationWrapper>
-              <NotificationButton onClick={() => setIsDropdownOpen(!isDropdownOpen)}>
+              <NotificationButton onClick={handleToggleDropdown}>
                 <svg width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2" strokeLinecap="round" strokeLinejoin="round"><path d="M18 8A6 6 0 0 0 6 8c0 7-3 9-3 9h18s-3-2-3-9"></path><path d="M13.73 21a2 2 0 0 1-3.46 0"></path></svg>
                 {unreadCount > 0 && <UnreadIndicator />}
               </NotificationButton>
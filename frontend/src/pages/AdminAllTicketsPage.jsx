@@ -136,26 +136,21 @@ const AdminAllTicketsPage = () => {
   };
 
   useEffect(() => {
-    // Fetch the first page on initial load
-    fetchPage('/tickets/');
-  }, []); // Only run on mount
+    // Search runs on the server (ranked, across every page), so wait for the
+    // user to stop typing. An empty term fetches the first page straight away.
+    const query = searchTerm.trim();
+    const timer = setTimeout(() => {
+      fetchPage(query ? `/tickets/?q=${encodeURIComponent(query)}` : '/tickets/');
+    }, query ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   const filteredAndSortedTickets = useMemo(() => {
     // This logic now runs on the 'data.results' array (the current page)
     let filteredItems = [...data.results];
     
-    if (searchTerm) {
-      const lowercasedFilter = searchTerm.toLowerCase();
-      filteredItems = filteredItems.filter(ticket => 
-        ticket.title.toLowerCase().includes(lowercasedFilter) ||
-        ticket.created_by_email.toLowerCase().includes(lowercasedFilter) ||
-        (ticket.vehicle_make && ticket.vehicle_make.toLowerCase().includes(lowercasedFilter)) ||
-        (ticket.license_plate && ticket.license_plate.toLowerCase().includes(lowercasedFilter)) ||
-        String(ticket.id).includes(lowercasedFilter)
-      );
-    }
-    
-    if (sortConfig !== null) {
+    // Search results arrive best match first; keep that order.
+    if (sortConfig !== null && !searchTerm.trim()) {
       filteredItems.sort((a, b) => {
         if (a[sortConfig.key] < b[sortConfig.key]) return sortConfig.direction === 'ascending' ? -1 : 1;
         if (a[sortConfig.key] > b[sortConfig.key]) return sortConfig.direction === 'ascending' ? 1 : -1;
@@ -185,7 +180,7 @@ const AdminAllTicketsPage = () => {
       <FilterBar>
         <SearchInput 
           type="text"
-          placeholder="Search by ID, title, customer, vehicle, plate..."
+          placeholder="Search title, description, vehicle, plate, VIN, ticket # or customer email..."
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
         />
@@ -69,6 +69,13 @@ const Select = styled.select`
   color: ${tokens.colors.textPrimary};
 `;
 
+const BulkBar = styled.div`
+  display: flex;
+  align-items: center;
+  gap: 1rem;
+  margin-bottom: 1rem;
+`;
+
 const StyledLink = styled(Link)`
   color: ${tokens.colors.primary};
   text-decoration: none;
@@ -84,6 +91,7 @@ const AdminDashboard = () => {
   const [recentTickets, setRecentTickets] = useState([]);
   const [technicians, setTechnicians] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [selectedIds, setSelectedIds] = useState([]);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -121,6 +129,27 @@ const AdminDashboard = () => {
     }
   };
 
+  const toggleSelected = (ticketId) => {
+    setSelectedIds(ids => ids.includes(ticketId) ? ids.filter(id => id !== ticketId) : [...ids, ticketId]);
+  };
+
+  // Assigns every selected ticket in one request instead of one PATCH per ticket.
+  const handleBulkAssign = async (technicianId) => {
+    if (selectedIds.length === 0) return;
+    const assigned_to = technicianId === 'none' ? null : parseInt(technicianId);
+    try {
+      const response = await axiosInstance.post('/tickets/bulk/', { ids: selectedIds, assigned_to });
+      const updated = new Map(response.data.results.filter(r => r.ticket).map(r => [r.id, r.ticket]));
+      setRecentTickets(recentTickets.map(t => updated.get(t.id) || t));
+      setSelectedIds([]);
+      const failed = response.data.forbidden + response.data.not_found;
+      if (failed > 0) alert(`${failed} ticket(s) could not be reassigned.`);
+    } catch (err) {
+      console.error("Failed to update assignments", err);
+      alert("Could not update assignments.");
+    }
+  };
+
   // This check is now safe because 'stats' is correctly fetched
   if (loading || !stats) return <p>Loading Dashboard Overview...</p>;
 
@@ -136,16 +165,37 @@ const AdminDashboard = () => {
       </StatsGrid>
 
       <h2 style={{ fontSize: '1.8rem', fontWeight: 'bold' }}>Manage Recent Tickets</h2>
+      <BulkBar>
+        <span>{selectedIds.length} selected</span>
+        <Select
+          value=""
+          disabled={selectedIds.length === 0}
+          onChange={(e) => handleBulkAssign(e.target.value)}
+        >
+          <option value="" disabled>Assign selected to...</option>
+          <option value="none">-- Unassigned --</option>
+          {technicians.map(tech => (
+            <option key={tech.id} value={tech.id}>{tech.first_name}</option>
+          ))}
+        </Select>
+      </BulkBar>
       <TicketTable>
         <thead>
           <tr>
-            <th>ID</th><th>Title</th><th>Customer</th><th>Status</th><th>Assigned To</th>
+            <th></th><th>ID</th><th>Title</th><th>Customer</th><th>Status</th><th>Assigned To</th>
           </tr>
         </thead>
         <tbody>
           {/* This .map() is now safe because 'recentTickets' is a guaranteed array */}
           {recentTickets.map(ticket => (
             <tr key={ticket.id}>
+              <td>
+                <input
+                  type="checkbox"
+                  checked={selectedIds.includes(ticket.id)}
+                  onChange={() => toggleSelected(ticket.id)}
+                />
+              </td>
               <td><StyledLink to={`/tickets/${ticket.id}`}>#{ticket.id}</StyledLink></td>
               <td>{ticket.title}</td>
               <td>{ticket.created_by_email}</td>
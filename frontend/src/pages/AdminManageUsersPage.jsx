@@ -187,17 +187,22 @@ const AdminManageUsersPage = () => {
     fetchStats();
   }, []);
   
+  // Large customer bases make an exact count expensive; an estimate is enough for paging.
+  const usersUrl = (page) => `/users/?page=${page}&role=${activeTab}&search=${encodeURIComponent(searchTerm.trim())}&count=estimate`;
+
   // Fetch users when component mounts or when tab or search terms change
   useEffect(() => {
-    // When tab or search term changes, always reset to page 1
-    fetchUsers(`/users/?page=1&role=${activeTab}&search=${searchTerm}`);
+    // When tab or search term changes, always reset to page 1.
+    // Wait for a pause in typing instead of querying on every keystroke.
+    const timer = setTimeout(() => fetchUsers(usersUrl(1)), searchTerm ? 250 : 0);
+    return () => clearTimeout(timer);
   }, [activeTab, searchTerm]); // Removed currentPage from here
 
   const handleSaveUser = async (updatedUser) => {
     try {
       await axiosInstance.patch(`/users/${updatedUser.id}/`, updatedUser);
       setEditingUser(null);
-      fetchUsers(`/users/?page=${currentPage}&role=${activeTab}&search=${searchTerm}`); // Refresh data
+      fetchUsers(usersUrl(currentPage)); // Refresh data
     } catch (err) { alert("Failed to save changes."); }
   };
 
@@ -279,7 +284,7 @@ const AdminManageUsersPage = () => {
       </UserTable>
       
       <PaginationControls>
-        <PageInfo>Page {currentPage} of {totalPages || 1} (Total: {userData.count} users)</PageInfo>
+        <PageInfo>Page {currentPage} of {totalPages || 1} (Total: {userData.count_is_estimate ? 'about ' : ''}{userData.count} users)</PageInfo>
         <div>
           <Button $variant="secondary" onClick={() => fetchUsers(userData.previous)} disabled={!userData.previous}>Previous</Button>
           <Button $variant="secondary" style={{marginLeft: '0.5rem'}} onClick={() => fetchUsers(userData.next)} disabled={!userData.next}>Next</Button>
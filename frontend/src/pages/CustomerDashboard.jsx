@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useContext, useMemo } from 'react';
+import React, { useState, useEffect, useContext, useMemo, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import styled from 'styled-components';
 import axiosInstance from '../api/axiosConfig';
@@ -244,20 +244,37 @@ const CustomerDashboard = () => {
   const { user } = useContext(AuthContext);
   const [tickets, setTickets] = useState([]);
   const [loading, setLoading] = useState(true);
+  const syncRef = useRef({ cursor: null, byId: new Map() });
 
   useEffect(() => {
-    const fetchTickets = async () => {
+    // Delta sync: the first call pulls everything, later polls only fetch
+    // tickets changed since the server's cursor. If the server-side count no
+    // longer matches what we hold, something left our scope, so resync in full.
+    const fetchTickets = async (allowResync = true) => {
+      const sync = syncRef.current;
       try {
-        const response = await axiosInstance.get('/tickets/');
-        setTickets(response.data);
-      } catch (err) { console.error('Failed to fetch tickets', err); } 
-      finally { if (loading) setLoading(false); }
+        const since = sync.cursor || '1970-01-01T00:00:00Z';
+        const response = await axiosInstance.get('/tickets/', { params: { updated_since: since } });
+        const { cursor, count, results } = response.data;
+        results.forEach(ticket => sync.byId.set(ticket.id, ticket));
+        sync.cursor = cursor;
+        if (sync.byId.size !== count && allowResync) {
+          sync.byId = new Map();
+          sync.cursor = null;
+          return fetchTickets(false);
+        }
+        if (results.length > 0 || !sync.initialized) {
+          sync.initialized = true;
+          setTickets(Array.from(sync.byId.values()));
+        }
+      } catch (err) { console.error('Failed to fetch tickets', err); }
+      finally { setLoading(false); }
     };
 
     fetchTickets();
     const intervalId = setInterval(fetchTickets, 10000);
     return () => clearInterval(intervalId);
-  }, [loading]);
+  }, []);
 
   const { activeTicket, historicalTickets } = useMemo(() => {
     const sorted = [...tickets].sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
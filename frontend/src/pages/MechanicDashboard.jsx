@@ -154,6 +154,12 @@ const ReportButton = styled.button`
     align-self: auto;
   }
 `;
+const HeaderActions = styled.div` display: flex; flex-wrap: wrap; gap: 0.75rem; `;
+const ClaimButton = styled(ReportButton)`
+  background: ${tokens.colors.primary};
+  border-color: ${tokens.colors.primary};
+  &:disabled { opacity: 0.6; cursor: default; }
+`;
 
 const HistorySection = styled.div`
   margin-top: 3rem;
@@ -238,6 +244,16 @@ const MechanicDashboard = () => {
   const [tickets, setTickets] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showAllHistory, setShowAllHistory] = useState(false);
+  const [waitingCount, setWaitingCount] = useState(null);
+  const [claiming, setClaiming] = useState(false);
+
+  // Unassigned Open tickets anyone can claim; one row plus the total is enough here.
+  const fetchWaitingCount = async () => {
+    try {
+      const response = await axiosInstance.get('/tickets/queue/', { params: { page_size: 1, count: 1 } });
+      setWaitingCount(response.data.count);
+    } catch (err) { console.error('Failed to fetch the work queue', err); }
+  };
 
   useEffect(() => {
     const fetchTickets = async () => {
@@ -248,8 +264,26 @@ const MechanicDashboard = () => {
       finally { setLoading(false); }
     };
     fetchTickets();
+    fetchWaitingCount();
   }, []);
 
+  const handleClaimNext = async () => {
+    setClaiming(true);
+    try {
+      // The server hands out the most urgent, oldest unassigned ticket; 204 means none is waiting.
+      const response = await axiosInstance.post('/tickets/claim/');
+      if (response.status === 204) {
+        alert('There are no unassigned tickets waiting.');
+      } else {
+        setTickets(prev => [response.data, ...prev]);
+      }
+    } catch (err) { console.error('Failed to claim a ticket', err); }
+    finally {
+      setClaiming(false);
+      fetchWaitingCount();
+    }
+  };
+
   const { nextUpTicket, queuedTickets, allCompletedTickets } = useMemo(() => {
     const active = tickets.filter(t => t.status !== 'Completed' && t.status !== 'Cancelled');
     const completed = tickets.filter(t => t.status === 'Completed' || t.status === 'Cancelled').sort((a,b) => new Date(b.updated_at) - new Date(a.updated_at));
@@ -298,7 +332,12 @@ const MechanicDashboard = () => {
           <Title>Mechanic Workbench</Title>
           <Subtitle>Welcome back, {user?.first_name || user?.email}!</Subtitle>
         </div>
-        <ReportButton onClick={handleDownloadReport}>Download Today's Report</ReportButton>
+        <HeaderActions>
+          <ClaimButton onClick={handleClaimNext} disabled={claiming || waitingCount === 0}>
+            {claiming ? 'Claiming...' : `Claim Next Job${waitingCount ? ` (${waitingCount} waiting)` : ''}`}
+          </ClaimButton>
+          <ReportButton onClick={handleDownloadReport}>Download Today's Report</ReportButton>
+        </HeaderActions>
       </Header>
 
       <JobBoardLayout>